@@ -0,0 +1,52 @@
+import asyncio
+import functools
+from concurrent.futures import ThreadPoolExecutor
+from .config import DB_THREADS, HASH_POOL_SIZE
+from . import database
+
+# SQLite and bcrypt calls block, so async routes hand them to dedicated
+# executors and await the futures; the event loop itself never blocks and
+# in-flight requests are no longer capped by the threadpool size.
+_db_executor = ThreadPoolExecutor(max_workers=DB_THREADS, thread_name_prefix="sso-db")
+_hash_executor = ThreadPoolExecutor(max_workers=HASH_POOL_SIZE, thread_name_prefix="sso-hash")
+
+async def run_db(func, *args, **kwargs):
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_db_executor, functools.partial(func, *args, **kwargs))
+
+async def run_hash(func, *args, **kwargs):
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_hash_executor, functools.partial(func, *args, **kwargs))
+
+def submit_hash(func, *args, **kwargs):
+    """Queue work on the hash pool from synchronous code (e.g. startup)."""
+    return _hash_executor.submit(func, *args, **kwargs)
+
+def _mirror(func):
+    @functools.wraps(func)
+    async def wrapper(*args, **kwargs):
+        return await run_db(func, *args, **kwargs)
+    wrapper.__name__ = f"{func.__name__}_async"
+    wrapper.__qualname__ = wrapper.__name__
+    return wrapper
+
+# Async mirrors of backend/database.py
+ensure_user_app_access_async = _mirror(database.ensure_user_app_access)
+load_authorization_context_async = _mirror(database.load_authorization_context)
+get_user_by_email_async = _mirror(database.get_user_by_email)
+update_password_hash_async = _mirror(database.update_password_hash)
+get_application_by_client_id_async = _mirror(database.get_application_by_client_id)
+get_application_by_id_async = _mirror(database.get_application_by_id)
+save_user_consent_async = _mirror(database.save_user_consent)
+create_pending_consent_async = _mirror(database.create_pending_consent)
+get_pending_consent_async = _mirror(database.get_pending_consent)
+delete_pending_consent_async = _mirror(database.delete_pending_consent)
+create_authorization_code_async = _mirror(database.create_authorization_code)
+consume_authorization_code_async = _mirror(database.consume_authorization_code)
+create_refresh_token_async = _mirror(database.create_refresh_token)
+load_refresh_token_async = _mirror(database.load_refresh_token)
+revoke_refresh_token_async = _mirror(database.revoke_refresh_token)
+
+def shutdown_executors() -> None:
+    _db_executor.shutdown(wait=True)
+    _hash_executor.shutdown(wait=True)
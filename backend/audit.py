@@ -0,0 +1,183 @@
+import json
+from datetime import datetime
+from typing import Iterator, List, Optional
+from fastapi import Request
+from .batch_writer import BatchWriter
+from .config import AUDIT_BATCH_SIZE, AUDIT_QUEUE_SIZE, AUDIT_BLOCK_TIMEOUT
+from .database import get_db_connection
+
+audit_writer = BatchWriter(
+    "audit_events",
+    """
+        INSERT INTO audit_events
+            (action, actor_id, actor_email, target_type, target_id, details,
+             ip_address, created_at)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+    """,
+    max_batch=AUDIT_BATCH_SIZE,
+    max_queue=AUDIT_QUEUE_SIZE,
+    block_timeout=AUDIT_BLOCK_TIMEOUT,
+)
+
+removal_writer = BatchWriter(
+    "app_removal_logs",
+    """
+        INSERT INTO app_removal_logs (user_email, user_name, app_id, app_name, removed_at)
+        VALUES (?, ?, ?, ?, ?)
+    """,
+    max_batch=AUDIT_BATCH_SIZE,
+    max_queue=AUDIT_QUEUE_SIZE,
+    block_timeout=AUDIT_BLOCK_TIMEOUT,
+)
+
+AUDIT_COLUMNS = "id, action, actor_id, actor_email, target_type, target_id, details, ip_address, created_at"
+
+def _timestamp() -> str:
+    return datetime.utcnow().isoformat(sep=" ", timespec="seconds")
+
+def record_audit_event(
+    action: str,
+    actor: Optional[dict],
+    target_type: str,
+    target_id=None,
+    details: Optional[dict] = None,
+    request: Optional[Request] = None,
+) -> None:
+    """Queue an audit event; the row is written in the background."""
+    ip_address = request.client.host if request is not None and request.client else None
+    audit_writer.submit((
+        action,
+        actor.get("id") if actor else None,
+        actor.get("email") if actor else None,
+        target_type,
+        str(target_id) if target_id is not None else None,
+        json.dumps(details, default=str) if details else None,
+        ip_address,
+        _timestamp(),
+    ))
+
+def log_app_removal(user_email: str, user_name: str, app_id: str, app_name: str):
+    removal_writer.submit((user_email, user_name, app_id, app_name, _timestamp()))
+    record_audit_event(
+        "user.app_removed",
+        {"email": user_email},
+        "application",
+        app_id,
+        {"app_name": app_name},
+    )
+
+def _audit_filters(
+    action: Optional[str],
+    actor_email: Optional[str],
+    target_type: Optional[str],
+    target_id: Optional[str],
+    since: Optional[str],
+    until: Optional[str],
+):
+    clauses = []
+    params: list = []
+    if action:
+        # "app.*" matches every action in the app namespace
+        if action.endswith("*"):
+            clauses.append("action LIKE ?")
+            params.append(action[:-1] + "%")
+        else:
+            clauses.append("action = ?")
+            params.append(action)
+    if actor_email:
+        clauses.append("actor_email = ?")
+        params.append(actor_email)
+    if target_type:
+        clauses.append("target_type = ?")
+        params.append(target_type)
+    if target_id:
+        clauses.append("target_id = ?")
+        params.append(target_id)
+    if since:
+        clauses.append("created_at >= ?")
+        params.append(since)
+    if until:
+        clauses.append("created_at < ?")
+        params.append(until)
+    return clauses, params
+
+def _row_to_event(row) -> dict:
+    event = dict(row)
+    if event.get("details"):
+        try:
+            event["details"] = json.loads(event["details"])
+        except ValueError:
+            pass
+    return event
+
+def query_audit_events(
+    action: Optional[str] = None,
+    actor_email: Optional[str] = None,
+    target_type: Optional[str] = None,
+    target_id: Optional[str] = None,
+    since: Optional[str] = None,
+    until: Optional[str] = None,
+    before_id: Optional[int] = None,
+    limit: int = 100,
+) -> List[dict]:
+    """Newest-first page of audit events; pass the last id as `before_id` for the next page."""
+    clauses, params = _audit_filters(action, actor_email, target_type, target_id, since, until)
+    if before_id is not None:
+        clauses.append("id < ?")
+        params.append(before_id)
+    where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+    params.append(limit)
+
+    conn = get_db_connection()
+    cursor = conn.cursor()
+    cursor.execute(f"""
+        SELECT {AUDIT_COLUMNS} FROM audit_events
+        {where}
+        ORDER BY id DESC
+        LIMIT ?
+    """, params)
+    events = [_row_to_event(row) for row in cursor.fetchall()]
+    conn.close()
+    return events
+
+def iter_audit_events(
+    action: Optional[str] = None,
+    actor_email: Optional[str] = None,
+    target_type: Optional[str] = None,
+    target_id: Optional[str] = None,
+    since: Optional[str] = None,
+    until: Optional[str] = None,
+    chunk_size: int = 1000,
+) -> Iterator[dict]:
+    """Oldest-first iteration over matching events, fetched in keyset-paged chunks."""
+    clauses, params = _audit_filters(action, actor_email, target_type, target_id, since, until)
+    last_id = 0
+    while True:
+        where = " AND ".join(clauses + ["id > ?"])
+        conn = get_db_connection()
+        cursor = conn.cursor()
+        cursor.execute(f"""
+            SELECT {AUDIT_COLUMNS} FROM audit_events
+            WHERE {where}
+            ORDER BY id
+            LIMIT ?
+        """, params + [last_id, chunk_size])
+        rows = cursor.fetchall()
+        conn.close()
+        if not rows:
+            return
+        for row in rows:
+            yield _row_to_event(row)
+        last_id = rows[-1]["id"]
+        if len(rows) < chunk_size:
+            return
+
+def export_audit_ndjson(**filters) -> Iterator[str]:
+    for event in iter_audit_events(**filters):
+        yield json.dumps(event, default=str) + "\n"
+
+def audit_pipeline_stats() -> dict:
+    return {
+        "audit_events": audit_writer.stats(),
+        "app_removal_logs": removal_writer.stats(),
+    }
@@ -0,0 +1,107 @@
+import hmac
+import threading
+import time
+from collections import OrderedDict
+from typing import Callable, Optional
+from .config import TOKEN_CACHE_SECONDS, TOKEN_CACHE_SIZE, USER_CACHE_SECONDS, USER_CACHE_SIZE
+from .metrics import record_cache
+
+
+class TTLCache:
+    """Thread-safe LRU mapping; every entry carries its own expiry (a time.time() value)."""
+
+    def __init__(self, name: str, max_size: int):
+        self.name = name
+        self.max_size = max_size
+        self._entries: "OrderedDict[object, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[1] <= time.time():
+                del self._entries[key]
+                entry = None
+            elif entry is not None:
+                self._entries.move_to_end(key)
+        record_cache(self.name, entry is not None)
+        return entry[0] if entry is not None else None
+
+    def set(self, key, value, expires_at: float) -> None:
+        if self.max_size <= 0 or expires_at <= time.time():
+            return
+        with self._lock:
+            self._entries[key] = (value, expires_at)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def pop(self, key) -> None:
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def discard_where(self, predicate: Callable[[object], bool]) -> None:
+        with self._lock:
+            for key in [key for key, (value, _) in self._entries.items() if predicate(value)]:
+                del self._entries[key]
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+# ACCESS TOKEN CLAIMS
+# Keyed by the JWT signature segment. The whole token is stored alongside
+# and compared on lookup, so only a byte-identical token reuses the claims.
+# Revocation is still checked on every request (see revocation.py).
+_claims = TTLCache("token_claims", TOKEN_CACHE_SIZE)
+
+def cached_token_claims(token: str) -> Optional[dict]:
+    entry = _claims.get(token.rpartition(".")[2])
+    if entry is None or not hmac.compare_digest(entry[0].encode("utf-8"), token.encode("utf-8")):
+        return None
+    return entry[1]
+
+def remember_token_claims(token: str, payload: dict) -> None:
+    expires_at = time.time() + TOKEN_CACHE_SECONDS
+    if isinstance(payload.get("exp"), (int, float)):
+        expires_at = min(expires_at, payload["exp"])
+    _claims.set(token.rpartition(".")[2], (token, payload), expires_at)
+
+# USER ROWS
+# Keyed by email and stored with the user's version when the row was read
+# (see versions.py); a row is served only while that version is current.
+_users = TTLCache("user_row", USER_CACHE_SIZE)
+
+def cached_user(email: str, version: int) -> Optional[dict]:
+    entry = _users.get(email)
+    if entry is None or entry[1] < version:
+        return None
+    return dict(entry[0])
+
+def remember_user(user: dict, version: int) -> None:
+    _users.set(user["email"], (dict(user), version), time.time() + USER_CACHE_SECONDS)
+
+def forget_user(email: Optional[str] = None, user_id: Optional[int] = None) -> None:
+    if email is not None:
+        _users.pop(email)
+    if user_id is not None:
+        _users.discard_where(lambda entry: entry[0]["id"] == user_id)
+
+# APP-SCOPED AUTHORIZATIONS
+# Keyed by (email, app_id, ScopeSet); only outcomes where every check passed
+# are stored, with the (user, application) versions read before the checks.
+# Every change that could fail a check bumps one of the two (see versions.py).
+_authorizations = TTLCache("authorization", USER_CACHE_SIZE)
+
+def cached_authorization(email: str, app_id: str, scopes, versions: tuple) -> Optional[dict]:
+    entry = _authorizations.get((email, app_id, scopes))
+    if entry is None or entry[1] != versions:
+        return None
+    return dict(entry[0])
+
+def remember_authorization(email: str, app_id: str, scopes, user: dict, versions: tuple) -> None:
+    _authorizations.set((email, app_id, scopes), (dict(user), versions), time.time() + USER_CACHE_SECONDS)
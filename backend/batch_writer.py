@@ -0,0 +1,143 @@
+import queue
+import threading
+import time
+from typing import List, Optional, Sequence
+from .database import get_db_connection
+from .storage import OperationalError
+
+
+class BatchWriter:
+    """
+    Background writer that drains a bounded in-memory queue into the database
+    with `executemany`, so request handlers never wait on an INSERT.
+    When the queue is full the caller waits at most `block_timeout` seconds
+    (back-pressure) before the row is dropped and counted. A batch that hits
+    a transient error (e.g. "database is locked") is retried with backoff
+    before its rows are counted as failed.
+    """
+
+    def __init__(self, name: str, insert_sql: str, max_batch: int = 500,
+                 flush_interval: float = 0.5, max_queue: int = 10000,
+                 block_timeout: float = 0.0, max_attempts: int = 5,
+                 retry_backoff: float = 0.1):
+        self.name = name
+        self.insert_sql = insert_sql
+        self.max_batch = max_batch
+        self.flush_interval = flush_interval
+        self.block_timeout = block_timeout
+        self.max_attempts = max_attempts
+        self.retry_backoff = retry_backoff
+        self.queue: "queue.Queue[Optional[Sequence]]" = queue.Queue(maxsize=max_queue)
+        self.submitted = 0
+        self.written = 0
+        self.dropped = 0
+        self.blocked = 0
+        self.failed = 0
+        self.retried = 0
+        self._thread: Optional[threading.Thread] = None
+        # Guards thread start-up and the counters, which request threads and the writer both update
+        self._lock = threading.Lock()
+
+    def _count(self, counter: str, amount: int = 1) -> None:
+        with self._lock:
+            setattr(self, counter, getattr(self, counter) + amount)
+
+    def _ensure_started(self) -> None:
+        if self._thread is not None and self._thread.is_alive():
+            return
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name=f"{self.name}-writer", daemon=True)
+                self._thread.start()
+
+    def submit(self, row: Sequence) -> bool:
+        self._ensure_started()
+        try:
+            self.queue.put_nowait(row)
+        except queue.Full:
+            if self.block_timeout <= 0:
+                self._count("dropped")
+                return False
+            self._count("blocked")
+            try:
+                self.queue.put(row, timeout=self.block_timeout)
+            except queue.Full:
+                self._count("dropped")
+                return False
+        self._count("submitted")
+        return True
+
+    def depth(self) -> int:
+        return self.queue.qsize()
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "queued": self.depth(),
+                "submitted": self.submitted,
+                "written": self.written,
+                "dropped": self.dropped,
+                "blocked": self.blocked,
+                "retried": self.retried,
+                "failed": self.failed,
+            }
+
+    def _insert(self, batch: List[Sequence]) -> None:
+        conn = get_db_connection()
+        try:
+            conn.executemany(self.insert_sql, batch)
+            conn.commit()
+        finally:
+            conn.close()
+
+    def _write_batch(self, batch: List[Sequence]) -> None:
+        for attempt in range(1, self.max_attempts + 1):
+            try:
+                self._insert(batch)
+            except OperationalError as exc:
+                # Locked or briefly unavailable database: wait and write the same batch again
+                if attempt < self.max_attempts:
+                    self._count("retried")
+                    time.sleep(self.retry_backoff * 2 ** (attempt - 1))
+                    continue
+                error = exc
+            except Exception as exc:
+                error = exc
+            else:
+                self._count("written", len(batch))
+                return
+            break
+        self._count("failed", len(batch))
+        print(f"[SSO] {self.name} writer lost {len(batch)} rows after {attempt} attempt(s): {error}")
+
+    def _run(self) -> None:
+        stopping = False
+        while not stopping:
+            try:
+                first = self.queue.get(timeout=self.flush_interval)
+            except queue.Empty:
+                continue
+            batch: List[Sequence] = []
+            if first is None:
+                stopping = True
+            else:
+                batch.append(first)
+            while len(batch) < self.max_batch:
+                try:
+                    item = self.queue.get_nowait()
+                except queue.Empty:
+                    break
+                if item is None:
+                    stopping = True
+                    break
+                batch.append(item)
+            if batch:
+                self._write_batch(batch)
+
+    def flush(self, timeout: float = 5.0) -> None:
+        """Write everything queued so far and stop the writer thread."""
+        thread = self._thread
+        if thread is None or not thread.is_alive():
+            return
+        self.queue.put(None)
+        thread.join(timeout)
@@ -0,0 +1,406 @@
+"""
+End-to-end load test for the SSO flows.
+
+Seeds a synthetic database, starts uvicorn against it and drives each
+scenario with a pool of keep-alive HTTP clients for a fixed duration.
+Results (throughput, p50/p95/p99 latency, errors) are written as JSON so
+runs can be compared across commits:
+
+    python -m backend.benchmarks.loadtest --users 5000 --duration 15 --output new.json
+    python -m backend.benchmarks.loadtest --compare old.json new.json --max-regression 10
+"""
+import argparse
+import base64
+import hashlib
+import http.client
+import json
+import math
+import os
+import platform
+import random
+import re
+import secrets
+import socket
+import sqlite3
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime, timedelta
+from typing import Callable, Dict, List, Optional
+from urllib.parse import urlencode, urlparse, parse_qs
+from .seed import seed_database, add_seed_arguments, bench_user_email, bench_client_id, bench_redirect_uri
+
+SCENARIOS = ["login", "sso_flow", "code_exchange", "client_credentials", "sdk_verify", "admin_listing"]
+CONSENT_TOKEN_PATTERN = re.compile(r'name="consent_token" value="([^"]+)"')
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+def percentile(sorted_values: List[float], fraction: float) -> float:
+    if not sorted_values:
+        return 0.0
+    # Nearest rank: the smallest value with at least `fraction` of the samples at or below it
+    rank = math.ceil(round(fraction * len(sorted_values), 9))
+    index = min(len(sorted_values) - 1, max(0, rank - 1))
+    return sorted_values[index]
+
+def summarize(latencies: List[float], errors: int, elapsed: float) -> dict:
+    ordered = sorted(latencies)
+    return {
+        "requests": len(ordered),
+        "errors": errors,
+        "throughput_rps": round(len(ordered) / elapsed, 2) if elapsed else 0.0,
+        "p50_ms": round(percentile(ordered, 0.50) * 1000, 3),
+        "p95_ms": round(percentile(ordered, 0.95) * 1000, 3),
+        "p99_ms": round(percentile(ordered, 0.99) * 1000, 3),
+        "max_ms": round(ordered[-1] * 1000, 3) if ordered else 0.0,
+    }
+
+
+class Recorder:
+    def __init__(self):
+        self.latencies: Dict[str, List[float]] = {}
+        self.errors: Dict[str, int] = {}
+        self.lock = threading.Lock()
+
+    def record(self, name: str, seconds: float, ok: bool) -> None:
+        with self.lock:
+            if ok:
+                self.latencies.setdefault(name, []).append(seconds)
+            else:
+                self.errors[name] = self.errors.get(name, 0) + 1
+                self.latencies.setdefault(name, [])
+
+
+class Client:
+    """One keep-alive connection; each worker thread owns one."""
+
+    def __init__(self, base_url: str, recorder: Recorder):
+        parsed = urlparse(base_url)
+        self.host = parsed.hostname
+        self.port = parsed.port or 80
+        self.recorder = recorder
+        self.conn = http.client.HTTPConnection(self.host, self.port, timeout=30)
+
+    def request(self, name: str, method: str, path: str, body=None, headers=None, ok_status=(200,)):
+        headers = dict(headers or {})
+        start = time.perf_counter()
+        try:
+            self.conn.request(method, path, body=body, headers=headers)
+            response = self.conn.getresponse()
+            data = response.read()
+        except (OSError, http.client.HTTPException):
+            self.conn.close()
+            self.conn = http.client.HTTPConnection(self.host, self.port, timeout=30)
+            self.recorder.record(name, time.perf_counter() - start, False)
+            return None, None, b""
+        elapsed = time.perf_counter() - start
+        ok = response.status in ok_status
+        self.recorder.record(name, elapsed, ok)
+        return response.status, response, data
+
+    def post_json(self, name: str, path: str, payload: dict, headers=None, ok_status=(200,)):
+        headers = dict(headers or {})
+        headers["Content-Type"] = "application/json"
+        return self.request(name, "POST", path, json.dumps(payload), headers, ok_status)
+
+    def post_form(self, name: str, path: str, fields: dict, ok_status=(200, 302)):
+        headers = {"Content-Type": "application/x-www-form-urlencoded"}
+        return self.request(name, "POST", path, urlencode(fields), headers, ok_status)
+
+
+class CodePool:
+    """Authorization codes inserted straight into the benchmark database for /oauth/token."""
+
+    def __init__(self, db_path: str, info: dict, rng: random.Random):
+        self.db_path = db_path
+        self.info = info
+        self.rng = rng
+        self.codes: List[tuple] = []
+        self.lock = threading.Lock()
+
+    def _refill(self, count: int = 2000) -> None:
+        expires_at = (datetime.utcnow() + timedelta(minutes=5)).isoformat()
+        rows = []
+        for _ in range(count):
+            app_index = self.rng.randrange(len(self.info["app_ids"]))
+            user_index = self.rng.randrange(self.info["users"])
+            code = secrets.token_urlsafe(40)
+            rows.append((
+                code,
+                self.info["first_user_id"] + user_index,
+                self.info["app_ids"][app_index],
+                "profile email",
+                bench_redirect_uri(app_index),
+                expires_at,
+            ))
+            self.codes.append((code, app_index))
+        conn = sqlite3.connect(self.db_path, timeout=30)
+        conn.executemany("""
+            INSERT INTO authorization_codes (code, user_id, app_id, scopes, redirect_uri, expires_at)
+            VALUES (?, ?, ?, ?, ?, ?)
+        """, rows)
+        conn.commit()
+        conn.close()
+
+    def take(self) -> tuple:
+        with self.lock:
+            if not self.codes:
+                self._refill()
+            return self.codes.pop()
+
+
+class Scenarios:
+    def __init__(self, info: dict, code_pool: Optional[CodePool], rng_seed: int):
+        self.info = info
+        self.code_pool = code_pool
+        self.rng_seed = rng_seed
+        self.admin_token: Optional[str] = None
+        self.tokens: List[str] = []
+
+    def _random_user(self, rng: random.Random) -> str:
+        return bench_user_email(rng.randrange(self.info["users"]))
+
+    def prepare(self, client: Client) -> None:
+        _, _, data = client.post_json("setup", "/api/auth/login", {
+            "email": self.info["admin_email"],
+            "password": self.info["admin_password"],
+        })
+        self.admin_token = json.loads(data)["access_token"]
+        # A pool of app-scoped tokens for the verify scenario
+        rng = random.Random(self.rng_seed)
+        for _ in range(20):
+            token = self._sso_flow(client, rng, "setup")
+            if token:
+                self.tokens.append(token)
+
+    def _sso_flow(self, client: Client, rng: random.Random, label: Optional[str] = None) -> Optional[str]:
+        """/login -> consent if needed -> ?code= -> /oauth/token with the PKCE verifier; returns the access token."""
+        app_index = rng.randrange(len(self.info["app_ids"]))
+        redirect_uri = bench_redirect_uri(app_index)
+        verifier = secrets.token_urlsafe(48)
+        challenge = base64.urlsafe_b64encode(hashlib.sha256(verifier.encode("ascii")).digest()).rstrip(b"=").decode("ascii")
+        status, response, data = client.post_form(label or "sso_login", "/login", {
+            "email": self._random_user(rng),
+            "password": self.info["password"],
+            "redirect_uri": redirect_uri,
+            "client_id": bench_client_id(app_index),
+            "scope": "profile email",
+            "response_type": "code",
+            "code_challenge": challenge,
+            "code_challenge_method": "S256",
+        })
+        if status == 200:
+            match = CONSENT_TOKEN_PATTERN.search(data.decode("utf-8", "replace"))
+            if not match:
+                return None
+            status, response, data = client.post_form(label or "consent_decision", "/consent/decision", {
+                "consent_token": match.group(1),
+                "decision": "approve",
+            })
+        if status != 302:
+            return None
+        query = parse_qs(urlparse(response.getheader("Location", "")).query)
+        code = (query.get("code") or [None])[0]
+        if not code:
+            return None
+        status, _, data = client.post_json(label or "sso_code_exchange", "/oauth/token", {
+            "grant_type": "authorization_code",
+            "code": code,
+            "redirect_uri": redirect_uri,
+            "client_id": bench_client_id(app_index),
+            "code_verifier": verifier,
+        })
+        if status != 200:
+            return None
+        return json.loads(data)["access_token"]
+
+    def login(self, client: Client, rng: random.Random) -> None:
+        client.post_json("login", "/api/auth/login", {
+            "email": self._random_user(rng),
+            "password": self.info["password"],
+        })
+
+    def sso_flow(self, client: Client, rng: random.Random) -> None:
+        start = time.perf_counter()
+        token = self._sso_flow(client, rng)
+        client.recorder.record("sso_flow_total", time.perf_counter() - start, token is not None)
+
+    def code_exchange(self, client: Client, rng: random.Random) -> None:
+        code, app_index = self.code_pool.take()
+        client.post_json("code_exchange", "/oauth/token", {
+            "grant_type": "authorization_code",
+            "code": code,
+            "redirect_uri": bench_redirect_uri(app_index),
+            "client_id": bench_client_id(app_index),
+            "client_secret": self.info["client_secret"],
+        })
+
+    def client_credentials(self, client: Client, rng: random.Random) -> None:
+        app_index = rng.randrange(len(self.info["app_ids"]))
+        client.post_json("client_credentials", "/oauth/token", {
+            "grant_type": "client_credentials",
+            "client_id": bench_client_id(app_index),
+            "client_secret": self.info["client_secret"],
+        })
+
+    def sdk_verify(self, client: Client, rng: random.Random) -> None:
+        token = rng.choice(self.tokens)
+        client.request("sdk_verify", "GET", f"/api/sdk/verify?{urlencode({'token': token})}",
+                       headers={"X-API-Key": self.info["api_key"]})
+
+    def admin_listing(self, client: Client, rng: random.Random) -> None:
+        headers = {"Authorization": f"Bearer {self.admin_token}"}
+        path = rng.choice(["/api/users", "/api/applications", "/api/admin/removals"])
+        client.request(f"admin {path}", "GET", path, headers=headers)
+
+
+def run_phase(base_url: str, action: Callable, concurrency: int, duration: float, seed: int) -> tuple:
+    recorder = Recorder()
+    deadline = time.perf_counter() + duration
+
+    def worker(worker_index: int):
+        client = Client(base_url, recorder)
+        rng = random.Random(seed * 1000 + worker_index)
+        while time.perf_counter() < deadline:
+            action(client, rng)
+
+    threads = [threading.Thread(target=worker, args=(i,), daemon=True) for i in range(concurrency)]
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return recorder, time.perf_counter() - started
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+def start_server(db_path: str, port: int) -> subprocess.Popen:
+    # Every simulated user comes from one IP; measure the service, not the limiter
+    env = dict(os.environ, SSO_DB_PATH=db_path, SSO_RATE_LIMIT_ENABLED="0")
+    process = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "backend.main:app", "--host", "127.0.0.1",
+         "--port", str(port), "--log-level", "warning"],
+        cwd=REPO_ROOT,
+        env=env,
+    )
+    deadline = time.time() + 30
+    while time.time() < deadline:
+        try:
+            conn = http.client.HTTPConnection("127.0.0.1", port, timeout=1)
+            conn.request("GET", "/health/live")
+            if conn.getresponse().status == 200:
+                return process
+        except OSError:
+            time.sleep(0.2)
+    process.terminate()
+    raise RuntimeError("uvicorn did not become ready within 30s")
+
+def git_revision() -> Optional[str]:
+    try:
+        return subprocess.check_output(["git", "rev-parse", "HEAD"], cwd=REPO_ROOT, text=True, stderr=subprocess.DEVNULL).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def run_benchmark(args) -> dict:
+    workdir = tempfile.mkdtemp(prefix="sso_bench_")
+    db_path = args.db or os.path.join(workdir, "sso_bench.db")
+    info = seed_database(
+        db_path,
+        users=args.users,
+        apps=args.apps,
+        mappings_per_user=args.mappings_per_user,
+        consent_ratio=args.consent_ratio,
+        seed=args.seed,
+    )
+    port = free_port()
+    server = start_server(db_path, port)
+    base_url = f"http://127.0.0.1:{port}"
+    try:
+        scenarios = Scenarios(info, CodePool(db_path, info, random.Random(args.seed)), args.seed)
+        scenarios.prepare(Client(base_url, Recorder()))
+        results = {}
+        for name in args.scenarios:
+            recorder, elapsed = run_phase(base_url, getattr(scenarios, name), args.concurrency, args.duration, args.seed)
+            for step, latencies in sorted(recorder.latencies.items()):
+                results[f"{name}/{step}" if step != name else name] = summarize(
+                    latencies, recorder.errors.get(step, 0), elapsed
+                )
+    finally:
+        server.terminate()
+        server.wait(10)
+
+    return {
+        "meta": {
+            "git_revision": git_revision(),
+            "timestamp": datetime.utcnow().isoformat() + "Z",
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+            "params": {
+                "users": args.users,
+                "apps": args.apps,
+                "mappings_per_user": args.mappings_per_user,
+                "consent_ratio": args.consent_ratio,
+                "concurrency": args.concurrency,
+                "duration": args.duration,
+                "seed": args.seed,
+            },
+        },
+        "results": results,
+    }
+
+def compare(baseline: dict, current: dict, max_regression: float) -> int:
+    """Print per-scenario p95/throughput deltas; return the number of regressions."""
+    regressions = 0
+    for name, now in sorted(current["results"].items()):
+        before = baseline["results"].get(name)
+        if not before or not before["p95_ms"]:
+            print(f"{name:45s} (new)")
+            continue
+        p95_delta = (now["p95_ms"] - before["p95_ms"]) / before["p95_ms"] * 100
+        rps_delta = ((now["throughput_rps"] - before["throughput_rps"]) / before["throughput_rps"] * 100
+                     if before["throughput_rps"] else 0.0)
+        flag = ""
+        if p95_delta > max_regression:
+            flag = "  REGRESSION"
+            regressions += 1
+        print(f"{name:45s} p95 {before['p95_ms']:9.2f} -> {now['p95_ms']:9.2f} ms ({p95_delta:+6.1f}%)"
+              f"  rps {rps_delta:+6.1f}%{flag}")
+    return regressions
+
+def main(argv: Optional[list] = None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    add_seed_arguments(parser)
+    parser.add_argument("--db", help="Database file to seed (default: a fresh temporary file)")
+    parser.add_argument("--scenarios", nargs="+", choices=SCENARIOS, default=SCENARIOS)
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--duration", type=float, default=10.0, help="Seconds per scenario")
+    parser.add_argument("--output", help="Write JSON results to this file")
+    parser.add_argument("--compare", nargs=2, metavar=("BASELINE", "CURRENT"),
+                        help="Compare two result files instead of running")
+    parser.add_argument("--max-regression", type=float, default=10.0,
+                        help="Allowed p95 increase in percent before --compare fails")
+    args = parser.parse_args(argv)
+
+    if args.compare:
+        with open(args.compare[0]) as handle:
+            baseline = json.load(handle)
+        with open(args.compare[1]) as handle:
+            current = json.load(handle)
+        sys.exit(1 if compare(baseline, current, args.max_regression) else 0)
+
+    report = run_benchmark(args)
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w") as handle:
+            handle.write(output)
+    else:
+        print(output)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,195 @@
+"""
+Micro-benchmarks for the hot helpers in database.py, sso_helpers.py and
+security.py, measured against seeded databases of increasing size so each
+function's scaling curve is visible.
+
+    python -m backend.benchmarks.micro --sizes 1000 100000 --output micro.json
+    python -m backend.benchmarks.micro --sizes 1000 100000 1000000 --workdir /var/tmp/sso_micro
+    python -m backend.benchmarks.micro --baseline micro.json --max-regression 25
+
+Seeded databases are kept in --workdir and reused by later runs.
+"""
+import argparse
+import json
+import os
+import platform
+import random
+import secrets
+import sqlite3
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+from typing import Callable, Dict, List, Optional
+from .. import database
+from ..config import DEFAULT_SSO_SCOPES
+from ..scopes import scope_set, projection_plan
+from ..security import create_access_token, filter_user_data_by_scopes
+from ..sso_helpers import parse_redirect_entries, normalize_scopes, is_redirect_allowed
+from .loadtest import git_revision
+from .seed import seed_database, bench_user_email, bench_redirect_uri
+
+DEFAULT_SIZES = [1000, 100000]
+REDIRECT_BLOB = "\n".join(f"http://127.0.0.1:{5500 + i}/app/index.html#/sso-success" for i in range(8))
+
+
+def measure(func: Callable[[int], object], number: int, repeat: int) -> dict:
+    """Run `func(i)` `number` times per round; report per-call nanoseconds."""
+    per_call = []
+    calls = 0
+    for _ in range(repeat):
+        start = time.perf_counter_ns()
+        for _ in range(number):
+            func(calls)
+            calls += 1
+        per_call.append((time.perf_counter_ns() - start) / number)
+    return {
+        "min_ns": round(min(per_call), 1),
+        "median_ns": round(statistics.median(per_call), 1),
+        "calls": calls,
+    }
+
+def prepare_database(workdir: str, size: int, apps: int) -> dict:
+    db_path = os.path.join(workdir, f"micro_{size}.db")
+    info_path = os.path.join(workdir, f"micro_{size}.json")
+    if os.path.exists(db_path) and os.path.exists(info_path):
+        with open(info_path) as handle:
+            info = json.load(handle)
+        database.DB_FILE_PATH = db_path
+        return info
+    if os.path.exists(db_path):
+        os.remove(db_path)
+    print(f"[micro] seeding {size} users into {db_path}", file=sys.stderr)
+    info = seed_database(db_path, users=size, apps=apps)
+    with open(info_path, "w") as handle:
+        json.dump(info, handle)
+    return info
+
+def insert_codes(info: dict, count: int) -> List[str]:
+    expires_at = (datetime.utcnow() + timedelta(minutes=30)).isoformat()
+    codes = [secrets.token_urlsafe(40) for _ in range(count)]
+    rows = [
+        (code, info["first_user_id"], info["app_ids"][0], "profile email", bench_redirect_uri(0), expires_at)
+        for code in codes
+    ]
+    conn = sqlite3.connect(database.DB_FILE_PATH)
+    conn.executemany("""
+        INSERT INTO authorization_codes (code, user_id, app_id, scopes, redirect_uri, expires_at)
+        VALUES (?, ?, ?, ?, ?, ?)
+    """, rows)
+    conn.commit()
+    conn.close()
+    return codes
+
+def database_benchmarks(info: dict, number: int, repeat: int) -> Dict[str, dict]:
+    rng = random.Random(7)
+    users = info["users"]
+    app_ids = info["app_ids"]
+    probes = [
+        (info["first_user_id"] + index, bench_user_email(index), rng.choice(app_ids))
+        for index in (rng.randrange(users) for _ in range(1024))
+    ]
+    codes = insert_codes(info, number * repeat)
+    user_row = database.get_user_by_email(bench_user_email(0))
+
+    cases = {
+        "user_has_consent": lambda i: database.user_has_consent(
+            probes[i % 1024][0], probes[i % 1024][2], DEFAULT_SSO_SCOPES
+        ),
+        "is_user_blocked_for_app": lambda i: database.is_user_blocked_for_app(
+            probes[i % 1024][1], probes[i % 1024][2]
+        ),
+        "load_authorization_context": lambda i: database.load_authorization_context(
+            email=probes[i % 1024][1], app_id=probes[i % 1024][2], scopes=DEFAULT_SSO_SCOPES
+        ),
+        "consume_authorization_code": lambda i: database.consume_authorization_code(codes[i]),
+        "filter_user_data_by_scopes": lambda i: filter_user_data_by_scopes(user_row, DEFAULT_SSO_SCOPES),
+        "get_user_by_email+filter": lambda i: filter_user_data_by_scopes(
+            database.get_user_by_email(probes[i % 1024][1]), DEFAULT_SSO_SCOPES
+        ),
+        "load_authorization_context+projection": lambda i: database.load_authorization_context(
+            email=probes[i % 1024][1], app_id=probes[i % 1024][2], scopes=DEFAULT_SSO_SCOPES,
+            user_columns=projection_plan(scope_set(DEFAULT_SSO_SCOPES)).columns
+        ),
+    }
+    return {name: measure(func, number, repeat) for name, func in cases.items()}
+
+def pure_benchmarks(number: int, repeat: int) -> Dict[str, dict]:
+    cases = {
+        "parse_redirect_entries": lambda i: parse_redirect_entries(REDIRECT_BLOB),
+        "normalize_scopes": lambda i: normalize_scopes("profile, email student_academics ROLE"),
+        "is_redirect_allowed": lambda i: is_redirect_allowed(
+            "http://127.0.0.1:5501/app/index.html?state=xyz", "http://127.0.0.1:5501/app/index.html"
+        ),
+        "create_access_token": lambda i: create_access_token(
+            {"sub": "bench0@example.com", "aud": "app", "scopes": DEFAULT_SSO_SCOPES}
+        ),
+    }
+    return {name: measure(func, number * 10, repeat) for name, func in cases.items()}
+
+def check_regressions(baseline: dict, current: dict, max_regression: float) -> List[str]:
+    failures = []
+    for key, result in current["results"].items():
+        before = baseline.get("results", {}).get(key)
+        if not before or not before["median_ns"]:
+            continue
+        change = (result["median_ns"] - before["median_ns"]) / before["median_ns"] * 100
+        line = f"{key:45s} {before['median_ns']:12.0f} -> {result['median_ns']:12.0f} ns/call ({change:+6.1f}%)"
+        if change > max_regression:
+            failures.append(line)
+            line += "  REGRESSION"
+        print(line, file=sys.stderr)
+    return failures
+
+def main(argv: Optional[list] = None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=DEFAULT_SIZES, help="User counts to benchmark against")
+    parser.add_argument("--apps", type=int, default=50)
+    parser.add_argument("--number", type=int, default=200, help="Calls per round for DB-backed functions")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--workdir", help="Directory for seeded databases (default: a temporary directory)")
+    parser.add_argument("--output", help="Write JSON results to this file")
+    parser.add_argument("--baseline", help="Earlier results file to compare medians against")
+    parser.add_argument("--max-regression", type=float, default=25.0,
+                        help="Allowed median slowdown in percent before the run fails")
+    args = parser.parse_args(argv)
+
+    workdir = args.workdir or tempfile.mkdtemp(prefix="sso_micro_")
+    os.makedirs(workdir, exist_ok=True)
+
+    results = {}
+    for name, result in pure_benchmarks(args.number, args.repeat).items():
+        results[name] = result
+    for size in args.sizes:
+        info = prepare_database(workdir, size, args.apps)
+        for name, result in database_benchmarks(info, args.number, args.repeat).items():
+            results[f"{name}@{size}"] = result
+
+    report = {
+        "meta": {
+            "git_revision": git_revision(),
+            "timestamp": datetime.utcnow().isoformat() + "Z",
+            "python": platform.python_version(),
+            "sqlite": sqlite3.sqlite_version,
+            "sizes": args.sizes,
+            "number": args.number,
+            "repeat": args.repeat,
+        },
+        "results": results,
+    }
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w") as handle:
+            handle.write(output)
+    else:
+        print(output)
+
+    if args.baseline:
+        with open(args.baseline) as handle:
+            baseline = json.load(handle)
+        if check_regressions(baseline, report, args.max_regression):
+            sys.exit(1)
+
+if __name__ == "__main__":
+    main()
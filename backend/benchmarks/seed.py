@@ -0,0 +1,259 @@
+"""
+Generate a synthetic SSO database for benchmarks and load tests.
+
+    python -m backend.benchmarks.seed --db /tmp/sso_bench.db --users 10000 --apps 50
+    python -m backend.benchmarks.seed --db /var/tmp/sso_1m.db --users 1000000 --apps 2000 \\
+        --mappings-per-user 5 --refresh-tokens-per-user 2 --codes-per-user 1
+
+Rows are streamed into `executemany` inside large transactions with the
+journal switched off, and every user shares one pre-computed bcrypt hash,
+so a million-user database builds in minutes.
+"""
+import argparse
+import json
+import os
+import random
+import sqlite3
+import sys
+import time
+import uuid
+from datetime import datetime, timedelta
+from typing import Iterator, List, Optional
+from .. import database
+from ..config import SCOPE_FIELD_MAP
+from ..scopes import scope_set
+from ..security import hash_password, hash_client_secret_value
+
+BENCH_PASSWORD = "bench-password"
+BENCH_CLIENT_SECRET = "bench-client-secret"
+BENCH_API_KEY = "sso_live_bench_primary_key"
+BENCH_ADMIN_EMAIL = "admin@example.com"
+BENCH_ADMIN_PASSWORD = "admin123"
+BRANCHES = ["CSE", "ECE", "ME", "CE", "EE", "IT"]
+REDIRECT_HOSTS = ["127.0.0.1:9000", "localhost:9000", "apps.campus.example", "portal.campus.example"]
+REDIRECT_PATHS = ["/callback", "/auth/sso", "/index.html#/sso-success", "/oauth/return"]
+SCOPE_NAMES = sorted(SCOPE_FIELD_MAP)
+
+
+def bench_user_email(index: int) -> str:
+    return f"bench{index}@example.com"
+
+def bench_client_id(index: int) -> str:
+    return f"bench-client-{index}"
+
+def bench_redirect_uri(index: int) -> str:
+    return f"http://127.0.0.1:9000/app{index}/callback"
+
+def _redirect_list(rng: random.Random, index: int) -> str:
+    # The first entry is always the one the load tests use
+    entries = [bench_redirect_uri(index)]
+    for _ in range(rng.randint(0, 3)):
+        scheme = "http" if rng.random() < 0.5 else "https"
+        entries.append(f"{scheme}://{rng.choice(REDIRECT_HOSTS)}/app{index}{rng.choice(REDIRECT_PATHS)}")
+    return "\n".join(dict.fromkeys(entries))
+
+def _consent_scopes(rng: random.Random) -> str:
+    scopes = {"profile"}
+    scopes.update(scope for scope in SCOPE_NAMES if rng.random() < 0.6)
+    return " ".join(sorted(scopes))
+
+def _timestamp(moment: datetime) -> str:
+    return moment.isoformat(sep=" ", timespec="seconds")
+
+
+class _Progress:
+    def __init__(self, enabled: bool):
+        self.enabled = enabled
+        self.started = time.perf_counter()
+
+    def report(self, label: str, done: int, total: int) -> None:
+        if not self.enabled:
+            return
+        elapsed = time.perf_counter() - self.started
+        rate = done / elapsed if elapsed else 0.0
+        print(f"[seed] {label}: {done}/{total} ({rate:,.0f}/s, {elapsed:.1f}s)", file=sys.stderr)
+
+
+def seed_database(
+    db_path: str,
+    users: int = 1000,
+    apps: int = 10,
+    mappings_per_user: int = 2,
+    consent_ratio: float = 0.5,
+    refresh_tokens_per_user: int = 0,
+    codes_per_user: int = 0,
+    seed: int = 42,
+    batch_size: int = 50000,
+    progress: bool = False,
+) -> dict:
+    """Create the schema at `db_path` and bulk-load synthetic rows. Returns the benchmark credentials."""
+    rng = random.Random(seed)
+    database.DB_FILE_PATH = db_path
+    database.init_db()
+
+    password_hash = hash_password(BENCH_PASSWORD)
+    secret_hash = hash_client_secret_value(BENCH_CLIENT_SECRET)
+    tracker = _Progress(progress)
+    now = datetime.utcnow()
+
+    conn = sqlite3.connect(db_path, isolation_level=None)
+    cursor = conn.cursor()
+    cursor.execute("PRAGMA journal_mode = OFF")
+    cursor.execute("PRAGMA synchronous = OFF")
+    cursor.execute("PRAGMA cache_size = -262144")
+    cursor.execute("PRAGMA temp_store = MEMORY")
+
+    app_ids = [str(uuid.UUID(int=rng.getrandbits(128))) for _ in range(apps)]
+    cursor.execute("BEGIN")
+    cursor.executemany("""
+        INSERT OR IGNORE INTO applications (id, name, url, client_id, client_secret, redirect_url)
+        VALUES (?, ?, ?, ?, ?, ?)
+    """, (
+        (
+            app_id,
+            f"Bench App {index}",
+            f"http://127.0.0.1:9000/app{index}",
+            bench_client_id(index),
+            secret_hash,
+            _redirect_list(rng, index),
+        )
+        for index, app_id in enumerate(app_ids)
+    ))
+    cursor.execute("COMMIT")
+
+    cursor.execute("SELECT COALESCE(MAX(id), 0) FROM users")
+    first_user_id = cursor.fetchone()[0] + 1
+    per_user = min(mappings_per_user, len(app_ids))
+
+    for start in range(0, users, batch_size):
+        stop = min(start + batch_size, users)
+        access_rows: List[tuple] = []
+        consent_rows: List[tuple] = []
+        refresh_rows: List[tuple] = []
+        code_rows: List[tuple] = []
+
+        def user_rows() -> Iterator[tuple]:
+            for index in range(start, stop):
+                user_id = first_user_id + index
+                email = bench_user_email(index)
+                mapped = rng.sample(app_ids, per_user) if per_user else []
+                for app_id in mapped:
+                    access_rows.append((email, app_id))
+                    if rng.random() < consent_ratio:
+                        granted = scope_set(_consent_scopes(rng))
+                        consent_rows.append((user_id, app_id, granted.text, granted.mask))
+                for _ in range(refresh_tokens_per_user):
+                    issued = now - timedelta(days=rng.randint(0, 60))
+                    refresh_rows.append((
+                        f"{rng.getrandbits(256):064x}",
+                        user_id,
+                        (issued + timedelta(days=30)).isoformat(),
+                        _timestamp(issued),
+                        rng.random() < 0.3,
+                    ))
+                for _ in range(codes_per_user):
+                    if not mapped:
+                        break
+                    issued = now - timedelta(days=rng.randint(0, 60), minutes=rng.randint(0, 1440))
+                    code_rows.append((
+                        f"{rng.getrandbits(240):060x}",
+                        user_id,
+                        rng.choice(mapped),
+                        _consent_scopes(rng),
+                        (issued + timedelta(minutes=5)).isoformat(),
+                        _timestamp(issued + timedelta(seconds=rng.randint(1, 60))),
+                        _timestamp(issued),
+                    ))
+                yield (
+                    f"Bench User {index}",
+                    email,
+                    password_hash,
+                    f"BENCH{index:07d}",
+                    rng.choice(BRANCHES),
+                    str(rng.randint(1, 8)),
+                )
+
+        cursor.execute("BEGIN")
+        cursor.executemany("""
+            INSERT INTO users (name, email, password_hash, roll_no, branch, semester, role)
+            VALUES (?, ?, ?, ?, ?, ?, 'student')
+        """, user_rows())
+        cursor.executemany("""
+            INSERT INTO user_app_access (user_email, app_id, blocked)
+            VALUES (?, ?, FALSE)
+        """, access_rows)
+        cursor.executemany("""
+            INSERT INTO user_consents (user_id, app_id, scopes, scope_mask)
+            VALUES (?, ?, ?, ?)
+        """, consent_rows)
+        cursor.executemany("""
+            INSERT INTO refresh_tokens (token, user_id, expires_at, created_at, revoked)
+            VALUES (?, ?, ?, ?, ?)
+        """, refresh_rows)
+        cursor.executemany("""
+            INSERT INTO authorization_codes (code, user_id, app_id, scopes, expires_at, used, used_at, created_at)
+            VALUES (?, ?, ?, ?, ?, TRUE, ?, ?)
+        """, code_rows)
+        cursor.execute("COMMIT")
+        tracker.report("users", stop, users)
+
+    cursor.execute("SELECT id FROM users WHERE email = ?", (BENCH_ADMIN_EMAIL,))
+    admin_id = cursor.fetchone()[0]
+    cursor.execute("""
+        INSERT OR IGNORE INTO api_keys (key_value, user_id, name)
+        VALUES (?, ?, ?)
+    """, (BENCH_API_KEY, admin_id, "Benchmark Key"))
+    cursor.execute("ANALYZE")
+    cursor.execute("PRAGMA journal_mode = WAL")
+    conn.close()
+
+    return {
+        "db_path": db_path,
+        "users": users,
+        "apps": apps,
+        "app_ids": app_ids,
+        "first_user_id": first_user_id,
+        "password": BENCH_PASSWORD,
+        "client_secret": BENCH_CLIENT_SECRET,
+        "api_key": BENCH_API_KEY,
+        "admin_email": BENCH_ADMIN_EMAIL,
+        "admin_password": BENCH_ADMIN_PASSWORD,
+    }
+
+def add_seed_arguments(parser: argparse.ArgumentParser) -> None:
+    parser.add_argument("--users", type=int, default=1000)
+    parser.add_argument("--apps", type=int, default=10)
+    parser.add_argument("--mappings-per-user", type=int, default=2)
+    parser.add_argument("--consent-ratio", type=float, default=0.5)
+    parser.add_argument("--refresh-tokens-per-user", type=int, default=0)
+    parser.add_argument("--codes-per-user", type=int, default=0, help="Historical (used) authorization codes")
+    parser.add_argument("--seed", type=int, default=42)
+
+def main(argv: Optional[list] = None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--db", required=True, help="Path of the database file to create")
+    parser.add_argument("--batch-size", type=int, default=50000, help="Users per transaction")
+    add_seed_arguments(parser)
+    args = parser.parse_args(argv)
+    if os.path.exists(args.db):
+        parser.error(f"{args.db} already exists")
+
+    started = time.perf_counter()
+    info = seed_database(
+        args.db,
+        users=args.users,
+        apps=args.apps,
+        mappings_per_user=args.mappings_per_user,
+        consent_ratio=args.consent_ratio,
+        refresh_tokens_per_user=args.refresh_tokens_per_user,
+        codes_per_user=args.codes_per_user,
+        seed=args.seed,
+        batch_size=args.batch_size,
+        progress=True,
+    )
+    info.pop("app_ids")
+    info["seconds"] = round(time.perf_counter() - started, 1)
+    print(json.dumps(info, indent=2))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,118 @@
+"""
+Serialization share of the admin listings (/api/users, /api/applications).
+
+Each listing is timed in stages against a seeded database: fetching the
+rows into response shapes, then turning them into JSON bytes the way
+FastAPI does for a `response_model` route (pydantic validation, a JSON-mode
+dump, stdlib json) and the way the fast path does (TypedDict shapes handed
+straight to stdlib json or orjson).
+
+    python -m backend.benchmarks.serialization --users 20000 --apps 50
+    python -m backend.benchmarks.serialization --users 20000 --output serialization.json
+"""
+import argparse
+import json
+import os
+import platform
+import statistics
+import sqlite3
+import tempfile
+import time
+from datetime import datetime
+from typing import Callable, Dict, List, Optional
+from pydantic import TypeAdapter
+from .. import main as routes
+from ..schemas import Application, User
+from .loadtest import git_revision
+from .micro import prepare_database
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+def median_ms(func: Callable[[], object], repeat: int) -> float:
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        timings.append((time.perf_counter() - start) * 1000)
+    return statistics.median(timings)
+
+def stdlib_dumps(content) -> bytes:
+    return json.dumps(content, ensure_ascii=False, allow_nan=False, separators=(",", ":")).encode("utf-8")
+
+def response_model_path(adapter: TypeAdapter) -> Callable[[list], bytes]:
+    """What FastAPI 0.100+ does with a returned list: validate, dump in JSON mode, json.dumps."""
+    def encode(rows: list) -> bytes:
+        return stdlib_dumps(adapter.dump_python(adapter.validate_python(rows), mode="json"))
+    return encode
+
+def listing_report(name: str, fetch: Callable[[], list], adapter: TypeAdapter, repeat: int) -> dict:
+    rows = fetch()
+    fetch_ms = median_ms(fetch, repeat)
+    encoders = {
+        "response_model+json": response_model_path(adapter),
+        "typeddict+json": stdlib_dumps,
+    }
+    if orjson is not None:
+        encoders["typeddict+orjson"] = orjson.dumps
+
+    paths = {}
+    for label, encode in encoders.items():
+        encode_ms = median_ms(lambda: encode(rows), repeat)
+        paths[label] = {
+            "serialize_ms": round(encode_ms, 3),
+            "total_ms": round(fetch_ms + encode_ms, 3),
+            "serialize_share": round(encode_ms / (fetch_ms + encode_ms), 3),
+            "bytes": len(encode(rows)),
+        }
+    return {"rows": len(rows), "fetch_ms": round(fetch_ms, 3), "paths": paths}
+
+def print_report(results: Dict[str, dict]) -> None:
+    for name, result in results.items():
+        print(f"{name}: {result['rows']} rows, fetch {result['fetch_ms']:.2f} ms")
+        for label, path in result["paths"].items():
+            print(f"  {label:22s} serialize {path['serialize_ms']:8.2f} ms  "
+                  f"total {path['total_ms']:8.2f} ms  share {path['serialize_share'] * 100:5.1f}%")
+
+def main(argv: Optional[list] = None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--users", type=int, default=20000)
+    parser.add_argument("--apps", type=int, default=50)
+    parser.add_argument("--repeat", type=int, default=15)
+    parser.add_argument("--workdir", help="Directory for the seeded database (default: a temporary directory)")
+    parser.add_argument("--output", help="Also write JSON results to this file")
+    args = parser.parse_args(argv)
+
+    workdir = args.workdir or tempfile.mkdtemp(prefix="sso_serialization_")
+    os.makedirs(workdir, exist_ok=True)
+    prepare_database(workdir, args.users, args.apps)
+
+    results = {
+        "/api/users": listing_report("/api/users", routes._users_listing, TypeAdapter(List[User]), args.repeat),
+        "/api/applications": listing_report(
+            "/api/applications", routes._applications_listing, TypeAdapter(List[Application]), args.repeat
+        ),
+    }
+    print_report(results)
+
+    if args.output:
+        report = {
+            "meta": {
+                "git_revision": git_revision(),
+                "timestamp": datetime.utcnow().isoformat() + "Z",
+                "python": platform.python_version(),
+                "sqlite": sqlite3.sqlite_version,
+                "users": args.users,
+                "apps": args.apps,
+                "repeat": args.repeat,
+            },
+            "results": results,
+        }
+        with open(args.output, "w") as handle:
+            json.dump(report, handle, indent=2)
+
+if __name__ == "__main__":
+    main()
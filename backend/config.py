@@ -1,23 +1,160 @@
 import os
+import tempfile
 from typing import List, Tuple
 
 # CORE CONFIGURATION
 SECRET_KEY = os.getenv("SECRET_KEY", "your-secret-key-change-in-production")
 ALGORITHM = "HS256"
 
+# Storage
+# "sqlite" (default, file at SSO_DB_PATH) or "postgres" (see storage.py)
+DB_BACKEND = os.getenv("SSO_DB_BACKEND", "sqlite").lower()
+DATABASE_URL = os.getenv("SSO_DATABASE_URL", "")
+PG_POOL_MIN_SIZE = int(os.getenv("SSO_PG_POOL_MIN", "2"))
+PG_POOL_MAX_SIZE = int(os.getenv("SSO_PG_POOL_MAX", "20"))
+
+# Worker Initialisation
+# What app startup does to the database: "full" migrates the schema and seeds
+# the demo data, "schema" only migrates (a single version read when current;
+# seed with `python -m backend.manage seed`), "skip" does nothing. serve.py
+# initialises once and starts its workers with "skip".
+INIT_MODE = os.getenv("SSO_INIT_MODE", "full").lower()
+# Print an import/startup timing line when a worker starts
+STARTUP_PROFILE = os.getenv("SSO_STARTUP_PROFILE", "0") != "0"
+# Uvicorn workers started by serve.py; 0 means one per CPU core
+WORKERS = int(os.getenv("SSO_WORKERS", "0"))
+
+# Migrations
+# Rows updated per transaction by migrations.backfill()
+MIGRATION_BATCH_SIZE = int(os.getenv("SSO_MIGRATION_BATCH_SIZE", "5000"))
+
 # Token Expiry
 ACCESS_TOKEN_EXPIRE_MINUTES = 30
 REFRESH_TOKEN_EXPIRE_DAYS = 30
 AUTH_CODE_EXPIRY_MINUTES = 5
 
+# Access Token Revocation
+# Revoked jtis are kept until the token would have expired anyway. Each worker
+# keeps a Bloom filter in front of the table and pulls new revocations from
+# the database every REVOCATION_SYNC_SECONDS.
+REVOCATION_FILTER_CAPACITY = int(os.getenv("REVOCATION_FILTER_CAPACITY", "100000"))
+REVOCATION_FILTER_ERROR_RATE = 0.001
+REVOCATION_SYNC_SECONDS = float(os.getenv("REVOCATION_SYNC_SECONDS", "5"))
+REVOCATION_PRUNE_SECONDS = 300
+
+# Authentication Caches (see auth_cache.py)
+# Token verifiers keep decoded access-token claims (never past the token's
+# exp), user rows and the SDK endpoints' passing authorization checks per
+# worker. Cached rows and checks are used only while the user's (and
+# application's) version is unchanged (see versions.py); 0 disables a cache.
+TOKEN_CACHE_SECONDS = int(os.getenv("SSO_TOKEN_CACHE_SECONDS", "300"))
+TOKEN_CACHE_SIZE = int(os.getenv("SSO_TOKEN_CACHE_SIZE", "10000"))
+# Kept below the access token lifetime, after which version_changes are pruned
+USER_CACHE_SECONDS = int(os.getenv("SSO_USER_CACHE_SECONDS", "300"))
+USER_CACHE_SIZE = int(os.getenv("SSO_USER_CACHE_SIZE", "10000"))
+
+# User and Application Versions (see versions.py)
+# Changes that affect cached users and authorizations are logged in
+# version_changes; each worker pulls new entries every VERSION_SYNC_SECONDS
+# before trusting its caches.
+VERSION_SYNC_SECONDS = float(os.getenv("SSO_VERSION_SYNC_SECONDS", "2"))
+VERSION_PRUNE_SECONDS = 300
+
+# Session Logging (written in the background, see session_log.py)
+SESSION_LOG_BATCH_SIZE = 500
+SESSION_LOG_QUEUE_SIZE = 10000
+
+# Metrics (see metrics.py). Per-statement SQL timing wraps every cursor and
+# can be switched off with METRICS_QUERY_TIMING=0.
+METRICS_QUERY_TIMING = os.getenv("METRICS_QUERY_TIMING", "1") != "0"
+
+# Health and Readiness (see health.py)
+HEALTH_CACHE_SECONDS = float(os.getenv("HEALTH_CACHE_SECONDS", "2"))
+HEALTH_DB_TIMEOUT_SECONDS = 1.0
+HEALTH_DB_LATENCY_DEGRADED_MS = 250
+HEALTH_MIN_FREE_DISK_MB = int(os.getenv("HEALTH_MIN_FREE_DISK_MB", "100"))
+HEALTH_QUEUE_DEGRADED_RATIO = 0.8
+HEALTH_HASH_DEGRADED_RATIO = 0.9
+# Async routes run bcrypt on a dedicated pool (see async_database.py); bcrypt
+# releases the GIL, so one thread per core keeps every core busy.
+HASH_POOL_SIZE = int(os.getenv("HASH_POOL_SIZE", str(os.cpu_count() or 4)))
+# Threads serving SQLite calls for async routes
+DB_THREADS = int(os.getenv("DB_THREADS", "8"))
+# Paths refused with 503 while the service reports itself degraded
+NON_CRITICAL_PATH_PREFIXES = (
+    "/api/admin/",
+    "/api/users",
+    "/api/applications",
+    "/api/keys",
+)
+
+# Audit Pipeline (see audit.py). When the queue is full, request handlers wait
+# at most AUDIT_BLOCK_TIMEOUT seconds before the event is dropped and counted.
+AUDIT_BATCH_SIZE = 500
+AUDIT_QUEUE_SIZE = 20000
+AUDIT_BLOCK_TIMEOUT = 0.05
+
+# Rate Limiting (see rate_limit.py)
+# Per-rule token buckets as (burst capacity, tokens regained per second).
+# "memory" keeps buckets per process; "sqlite" shares them between the worker
+# processes on one host (serve.py switches to it when starting several).
+RATE_LIMIT_ENABLED = os.getenv("SSO_RATE_LIMIT_ENABLED", "1") != "0"
+RATE_LIMIT_STORE = os.getenv("SSO_RATE_LIMIT_STORE", "memory").lower()
+RATE_LIMIT_DB_PATH = os.getenv("SSO_RATE_LIMIT_DB_PATH") or os.path.join(tempfile.gettempdir(), "sso_rate_limit.db")
+RATE_LIMIT_SHARDS = 16
+RATE_LIMIT_IDLE_SECONDS = 3600
+RATE_LIMITS = {
+    "login_ip": (20, 20 / 60),
+    "login_email": (10, 2 / 60),
+    "token_ip": (60, 1.0),
+    "client_id": (120, 20.0),
+    "api_key": (300, 50.0),
+}
+
+# Password Hashing
+# Pick BCRYPT_ROUNDS for this hardware with `python -m backend.manage calibrate-hashing`.
+# Stored hashes at a different cost, or bcrypt hashes once argon2 (argon2id,
+# needs argon2-cffi) is selected, are upgraded when the user next logs in.
+PASSWORD_SCHEME = os.getenv("SSO_PASSWORD_SCHEME", "bcrypt").lower()
+BCRYPT_ROUNDS = int(os.getenv("SSO_BCRYPT_ROUNDS", "12"))
+CLIENT_SECRET_BCRYPT_ROUNDS = int(os.getenv("SSO_CLIENT_SECRET_BCRYPT_ROUNDS", str(BCRYPT_ROUNDS)))
+ARGON2_MEMORY_KIB = int(os.getenv("SSO_ARGON2_MEMORY_KIB", "65536"))
+ARGON2_TIME_COST = int(os.getenv("SSO_ARGON2_TIME_COST", "3"))
+ARGON2_PARALLELISM = int(os.getenv("SSO_ARGON2_PARALLELISM", "4"))
+
 # API Keys and Secrets
 API_KEY_PREFIX = "sso_live_"
 CLIENT_SECRET_BYTES = 32
+# Verified client secrets are remembered per worker so /oauth/token skips
+# bcrypt for repeat calls; an entry stops matching once the secret is rotated.
+CLIENT_AUTH_CACHE_SECONDS = int(os.getenv("SSO_CLIENT_AUTH_CACHE_SECONDS", "3600"))
+CLIENT_AUTH_CACHE_SIZE = int(os.getenv("SSO_CLIENT_AUTH_CACHE_SIZE", "1024"))
+# Scopes an application may request for itself with client_credentials
+# (space or comma separated). Scopes that release user data are never granted
+# to client tokens, whether listed here or not.
+CLIENT_CREDENTIALS_SCOPES = frozenset(os.getenv("SSO_CLIENT_CREDENTIALS_SCOPES", "").replace(",", " ").lower().split())
 
 # Frontend URLs (Used for redirects)
 FRONTEND_BASE_URL = os.getenv("FRONTEND_BASE_URL", "http://localhost:3000")
 FRONTEND_REGISTER_URL = os.getenv("FRONTEND_REGISTER_URL", f"{FRONTEND_BASE_URL}?view=register")
 
+# Pages and Static Assets (see pages.py)
+# Consent page fragments kept per (application name, scope set)
+CONSENT_PAGE_CACHE_SIZE = int(os.getenv("SSO_CONSENT_PAGE_CACHE_SIZE", "1024"))
+STATIC_MAX_AGE_SECONDS = 31536000
+
+# JSON Encoding (see serialization.py)
+# "json" (stdlib) or "orjson" (needs the orjson package) for the responses
+# hot routes build directly from database rows.
+JSON_ENCODER = os.getenv("SSO_JSON_ENCODER", "json").lower()
+
+# Response Compression (see compression.py)
+# JSON and text responses of at least COMPRESSION_MIN_BYTES are gzip- or
+# brotli-encoded when the client accepts it.
+COMPRESSION_MIN_BYTES = int(os.getenv("SSO_COMPRESSION_MIN_BYTES", "1024"))
+COMPRESSION_GZIP_LEVEL = int(os.getenv("SSO_COMPRESSION_GZIP_LEVEL", "6"))
+COMPRESSION_BROTLI_QUALITY = int(os.getenv("SSO_COMPRESSION_BROTLI_QUALITY", "5"))
+
 # SSO & SCOPE CONFIGURATION
 SCOPE_FIELD_MAP = {
     "profile": ["name"],
@@ -1,190 +1,144 @@
 import sqlite3, secrets
 import uuid
-from typing import List, Optional
+import re
+import threading
+import time
+try:
+    import fcntl
+except ImportError:  # Windows: single-process development only
+    fcntl = None
+from typing import List, Optional, Tuple
 from datetime import datetime, timedelta
 from fastapi import HTTPException
 import os
 import inspect
-from .sso_helpers import serialize_redirect_entries, normalize_scopes
-from .config import seeded_client_secrets, AUTH_CODE_EXPIRY_MINUTES, REFRESH_TOKEN_EXPIRE_DAYS
+from contextlib import contextmanager
+from functools import lru_cache
+from .sso_helpers import serialize_redirect_entries
+from .scopes import scope_set
+from .config import (
+    seeded_client_secrets,
+    AUTH_CODE_EXPIRY_MINUTES,
+    REFRESH_TOKEN_EXPIRE_DAYS,
+    METRICS_QUERY_TIMING,
+    DB_BACKEND,
+    DATABASE_URL,
+    PG_POOL_MIN_SIZE,
+    PG_POOL_MAX_SIZE
+)
+from .metrics import observe, inc
+from .auth_cache import forget_user
+from .storage import PostgresStorage
 
 # CONNECTION AND INITIALISATION
-DB_FILE_PATH = os.path.join(
+DB_FILE_PATH = os.getenv("SSO_DB_PATH") or os.path.join(
     os.path.dirname(os.path.abspath(inspect.getfile(inspect.currentframe()))),
     "sso_database.db"
 )
-def get_db_connection():
-    conn = sqlite3.connect(DB_FILE_PATH)
-    conn.row_factory = sqlite3.Row
+
+# Arbitrary key for the Postgres advisory lock taken by init_lock()
+INIT_LOCK_KEY = 7306312
+
+QUERY_TABLE_PATTERN = re.compile(r"\b(?:FROM|INTO|UPDATE|TABLE(?:\s+IF\s+NOT\s+EXISTS)?|ON)\s+(?!ON\b)(\w+)", re.IGNORECASE)
+_query_labels = {}
+
+def _query_label(sql: str) -> tuple:
+    """Low-cardinality (statement, table) label for a SQL string, cached per statement text."""
+    label = _query_labels.get(sql)
+    if label is None:
+        stripped = sql.lstrip()
+        verb = stripped.split(None, 1)[0].upper() if stripped else "UNKNOWN"
+        match = QUERY_TABLE_PATTERN.search(stripped)
+        label = (("statement", verb), ("table", match.group(1) if match else ""))
+        _query_labels[sql] = label
+    return label
+
+class TimedCursor(sqlite3.Cursor):
+    def execute(self, sql, parameters=()):
+        start = time.perf_counter()
+        try:
+            return super().execute(sql, parameters)
+        finally:
+            observe("sso_db_query_seconds", time.perf_counter() - start, _query_label(sql))
+
+    def executemany(self, sql, seq_of_parameters):
+        start = time.perf_counter()
+        try:
+            return super().executemany(sql, seq_of_parameters)
+        finally:
+            observe("sso_db_query_seconds", time.perf_counter() - start, _query_label(sql))
+
+class TimedConnection(sqlite3.Connection):
+    def cursor(self, factory=TimedCursor):
+        return super().cursor(factory)
+
+    def execute(self, sql, parameters=()):
+        return self.cursor().execute(sql, parameters)
+
+    def executemany(self, sql, seq_of_parameters):
+        return self.cursor().executemany(sql, seq_of_parameters)
+
+def _observe_query(sql: str, seconds: float) -> None:
+    observe("sso_db_query_seconds", seconds, _query_label(sql))
+
+_postgres: Optional[PostgresStorage] = None
+_postgres_lock = threading.Lock()
+
+def get_storage() -> Optional[PostgresStorage]:
+    """The Postgres pool when SSO_DB_BACKEND=postgres, created on first use; None for SQLite."""
+    global _postgres
+    if DB_BACKEND != "postgres":
+        return None
+    if _postgres is None:
+        with _postgres_lock:
+            if _postgres is None:
+                _postgres = PostgresStorage(
+                    DATABASE_URL,
+                    PG_POOL_MIN_SIZE,
+                    PG_POOL_MAX_SIZE,
+                    on_query=_observe_query if METRICS_QUERY_TIMING else None,
+                )
+    return _postgres
+
+def get_db_connection(timeout: float = 5.0):
+    start = time.perf_counter()
+    storage = get_storage()
+    if storage is not None:
+        conn = storage.connect(timeout)
+    else:
+        if METRICS_QUERY_TIMING:
+            conn = sqlite3.connect(DB_FILE_PATH, timeout=timeout, factory=TimedConnection)
+        else:
+            conn = sqlite3.connect(DB_FILE_PATH, timeout=timeout)
+        conn.row_factory = sqlite3.Row
+    observe("sso_db_connect_seconds", time.perf_counter() - start)
     return conn
 
-def init_db():
-    from .security import pwd_context, generate_client_secret_value, hash_client_secret_value
-    conn = get_db_connection()
-    cursor = conn.cursor()
-    
-    # Table Creations
-    cursor.execute("""
-        CREATE TABLE IF NOT EXISTS users (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            name TEXT NOT NULL,
-            email TEXT UNIQUE NOT NULL,
-            password_hash TEXT NOT NULL,
-            roll_no TEXT,
-            branch TEXT,
-            semester TEXT,
-            role TEXT DEFAULT 'student',
-            status TEXT DEFAULT 'active',
-            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-        )
-    """)
-    
-    cursor.execute("""
-        CREATE TABLE IF NOT EXISTS applications (
-            id TEXT PRIMARY KEY,
-            name TEXT NOT NULL,
-            url TEXT NOT NULL,
-            client_id TEXT,
-            client_secret TEXT,
-            redirect_url TEXT,
-            blocked BOOLEAN DEFAULT FALSE,
-            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-        )
-    """)
-
-    # Add redirect_url column if the table existed previously without it
-    try:
-        cursor.execute("ALTER TABLE applications ADD COLUMN redirect_url TEXT")
-    except sqlite3.OperationalError:
-        pass
-    try:
-        cursor.execute("ALTER TABLE applications ADD COLUMN blocked BOOLEAN DEFAULT FALSE")
-    except sqlite3.OperationalError:
-        pass
-    
-    cursor.execute("""
-        CREATE TABLE IF NOT EXISTS user_app_access (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            user_email TEXT NOT NULL,
-            app_id TEXT NOT NULL,
-            blocked BOOLEAN DEFAULT FALSE,
-            granted_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-            FOREIGN KEY (app_id) REFERENCES applications(id)
-        )
-    """)
-    try:
-        cursor.execute("ALTER TABLE user_app_access ADD COLUMN blocked BOOLEAN DEFAULT FALSE")
-    except sqlite3.OperationalError:
-        pass
-    
-    cursor.execute("""
-        CREATE TABLE IF NOT EXISTS refresh_tokens (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            token TEXT UNIQUE NOT NULL,
-            user_id INTEGER NOT NULL,
-            expires_at TIMESTAMP NOT NULL,
-            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-            revoked BOOLEAN DEFAULT FALSE,
-            FOREIGN KEY (user_id) REFERENCES users(id)
-        )
-    """)
-    
-    cursor.execute("""
-        CREATE TABLE IF NOT EXISTS api_keys (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            key_value TEXT UNIQUE NOT NULL,
-            user_id INTEGER NOT NULL,
-            name TEXT NOT NULL,
-            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-            last_used TIMESTAMP,
-            revoked BOOLEAN DEFAULT FALSE,
-            app_id TEXT,
-            FOREIGN KEY (user_id) REFERENCES users(id)
-        )
-    """)
+# Demo client applications: (name, base URL, client_id, allowed redirect URLs).
+# Seeding creates them; migrations.py keeps the redirect URLs of existing ones
+# in step with this list.
+DEMO_APPLICATIONS = (
+    ("CampusConnect Demo", "http://127.0.0.1:8080", "campusconnect-client", (
+        "http://127.0.0.1:5501/third_party_app/index.html",
+        "http://127.0.0.1:5501/sso_app/third_party_app/index.html",
+    )),
+    # Served on 5500, from the repo root or from its own folder (hash-routed callback)
+    ("CampusConnect Plus Demo", "http://127.0.0.1:8081", "campusconnect-client-2", (
+        "http://127.0.0.1:5500/index2.html#/sso-success",
+        "http://127.0.0.1:5500/third_party_app_2/index2.html",
+        "http://127.0.0.1:5500/sso_app/third_party_app_2/index2.html",
+    )),
+)
 
-    # Ensure legacy databases have app_id column
-    try:
-        cursor.execute("ALTER TABLE api_keys ADD COLUMN app_id TEXT")
-    except sqlite3.OperationalError:
-        pass
-    
-    cursor.execute("""
-        CREATE TABLE IF NOT EXISTS session_logs (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            user_id INTEGER NOT NULL,
-            access_token_jti TEXT,
-            refresh_token_id INTEGER,
-            ip_address TEXT,
-            user_agent TEXT,
-            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-            expires_at TIMESTAMP,
-            FOREIGN KEY (user_id) REFERENCES users(id)
-        )
-    """)
-    
-    cursor.execute("""
-        CREATE TABLE IF NOT EXISTS user_consents (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            user_id INTEGER NOT NULL,
-            app_id TEXT NOT NULL,
-            scopes TEXT NOT NULL,
-            granted_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-            revoked BOOLEAN DEFAULT FALSE,
-            FOREIGN KEY (user_id) REFERENCES users(id),
-            FOREIGN KEY (app_id) REFERENCES applications(id)
-        )
-    """)
-    
-    cursor.execute("""
-        CREATE TABLE IF NOT EXISTS app_removal_logs (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            user_email TEXT NOT NULL,
-            user_name TEXT,
-            app_id TEXT NOT NULL,
-            app_name TEXT,
-            removed_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-        )
-    """)
-    
-    cursor.execute("""
-        CREATE TABLE IF NOT EXISTS pending_consents (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            token TEXT UNIQUE NOT NULL,
-            user_id INTEGER NOT NULL,
-            app_id TEXT NOT NULL,
-            redirect_uri TEXT NOT NULL,
-            scopes TEXT NOT NULL,
-            expires_at TIMESTAMP NOT NULL,
-            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-            FOREIGN KEY (user_id) REFERENCES users(id),
-            FOREIGN KEY (app_id) REFERENCES applications(id)
-        )
-    """)
+def _seed_defaults(cursor) -> None:
+    from .security import hash_password, generate_client_secret_value, hash_client_secret_value
 
-    cursor.execute("""
-        CREATE TABLE IF NOT EXISTS authorization_codes (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            code TEXT UNIQUE NOT NULL,
-            user_id INTEGER NOT NULL,
-            app_id TEXT NOT NULL,
-            scopes TEXT,
-            redirect_uri TEXT,
-            expires_at TIMESTAMP NOT NULL,
-            used BOOLEAN DEFAULT FALSE,
-            used_at TIMESTAMP,
-            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-            FOREIGN KEY (user_id) REFERENCES users(id),
-            FOREIGN KEY (app_id) REFERENCES applications(id)
-        )
-    """)
-    
     # Seed Default Users
     admin_email = "admin@example.com"
     cursor.execute("SELECT id FROM users WHERE email = ?", (admin_email,))
     admin_row = cursor.fetchone()
     if not admin_row:
-        admin_password = pwd_context.hash("admin123")
+        admin_password = hash_password("admin123")
         cursor.execute("""
             INSERT INTO users (name, email, password_hash, role, roll_no, branch, semester)
             VALUES (?, ?, ?, ?, ?, ?, ?)
@@ -196,7 +150,7 @@ def init_db():
     student_email = "student@example.com"
     cursor.execute("SELECT id FROM users WHERE email = ?", (student_email,))
     if not cursor.fetchone():
-        student_password = pwd_context.hash("student123")
+        student_password = hash_password("student123")
         cursor.execute("""
             INSERT INTO users (name, email, password_hash, role, roll_no, branch, semester)
             VALUES (?, ?, ?, ?, ?, ?, ?)
@@ -239,25 +193,8 @@ def init_db():
                 """, (client_secret_hashed, existing["id"]))
                 seeded_client_secrets.append((name, client_id_value, client_secret_plain))
 
-    ensure_seed_application(
-        "CampusConnect Demo",
-        "http://127.0.0.1:8080",
-        "campusconnect-client",
-        [
-            "http://127.0.0.1:5501/third_party_app/index.html",
-            "http://127.0.0.1:5501/sso_app/third_party_app/index.html",
-        ],
-    )
-
-    ensure_seed_application(
-        "CampusConnect Plus Demo",
-        "http://127.0.0.1:8081",
-        "campusconnect-client-2",
-        [
-            "http://127.0.0.1:5500/third_party_app_2/index2.html",
-            "http://127.0.0.1:5500/sso_app/third_party_app_2/index2.html",
-        ],
-    )
+    for name, base_url, client_id_value, redirect_urls in DEMO_APPLICATIONS:
+        ensure_seed_application(name, base_url, client_id_value, list(redirect_urls))
 
     # Seed demo API keys for both applications (owned by admin for convenience)
     if admin_id:
@@ -274,9 +211,43 @@ def init_db():
                     INSERT INTO api_keys (key_value, user_id, name)
                     VALUES (?, ?, ?)
                 """, (key_value, admin_id, name))
-    
-    conn.commit()
-    conn.close()
+
+@contextmanager
+def init_lock():
+    """Serialises schema creation and seeding across worker processes (and hosts, on Postgres)."""
+    storage = get_storage()
+    if storage is not None:
+        conn = storage.connect()
+        try:
+            conn.execute(f"SELECT pg_advisory_lock({INIT_LOCK_KEY})")
+            yield
+        finally:
+            conn.execute(f"SELECT pg_advisory_unlock({INIT_LOCK_KEY})")
+            conn.close()
+        return
+
+    with open(DB_FILE_PATH + ".init.lock", "a") as handle:
+        if fcntl is not None:
+            fcntl.flock(handle, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            if fcntl is not None:
+                fcntl.flock(handle, fcntl.LOCK_UN)
+
+def init_db(seed: bool = True):
+    """Apply pending migrations and, when `seed` is set, create the default users, apps and API keys."""
+    from .migrations import migrate, schema_is_current
+    if not seed and schema_is_current():
+        return
+    with init_lock():
+        conn = get_db_connection()
+        migrate(conn)
+        if seed:
+            cursor = conn.cursor()
+            _seed_defaults(cursor)
+            conn.commit()
+        conn.close()
 
     if seeded_client_secrets:
         print("\n[SSO] Generated client secrets for seeded applications (store these securely):")
@@ -314,6 +285,84 @@ def is_user_blocked_for_app(user_email: str, app_id: str) -> bool:
         return False
     return bool(row["blocked"])
 
+# Authorization Context
+# Everything the SSO flows (/login, /consent/decision, /oauth/token) check
+# about a (user, application) pair, read with one query: the user, the
+# application, the user_app_access row and, given scopes, whether consent
+# covers them. Callers that need less of the user (the SDK endpoints) pass
+# their own user_columns, which must include "id".
+CONTEXT_USER_COLUMNS = ("id", "name", "email", "password_hash", "roll_no", "branch", "semester", "role", "status")
+CONTEXT_APP_COLUMNS = ("id", "name", "url", "client_id", "client_secret", "redirect_url", "blocked")
+
+
+class AuthorizationContext:
+    __slots__ = ("user", "application", "has_access", "access_blocked", "has_consent")
+
+    def __init__(self, user: Optional[dict], application: Optional[dict], has_access: bool,
+                 access_blocked: bool, has_consent: Optional[bool]):
+        self.user = user
+        self.application = application
+        self.has_access = has_access
+        self.access_blocked = access_blocked
+        self.has_consent = has_consent
+
+
+@lru_cache(maxsize=None)
+def _context_sql(user_key: str, app_key: str, with_consent: bool, user_columns: Tuple[str, ...]) -> str:
+    columns = [f"u.{column} AS u_{column}" for column in user_columns]
+    columns += [f"a.{column} AS a_{column}" for column in CONTEXT_APP_COLUMNS]
+    columns += ["uaa.id AS access_id", "uaa.blocked AS access_blocked"]
+    if with_consent:
+        columns.append("""EXISTS (
+            SELECT 1 FROM user_consents c
+            WHERE c.user_id = u.id AND c.app_id = a.id AND c.revoked = FALSE AND (c.scope_mask & ?) = ?
+        ) AS has_consent""")
+    # The one-row anchor keeps a row even when the user or application is missing
+    return f"""
+        SELECT {", ".join(columns)}
+        FROM (SELECT 1 AS anchor) AS anchor
+        LEFT JOIN users u ON u.{user_key} = ?
+        LEFT JOIN applications a ON a.{app_key} = ?
+        LEFT JOIN user_app_access uaa ON uaa.user_email = u.email AND uaa.app_id = a.id
+        LIMIT 1
+    """
+
+def load_authorization_context(email: Optional[str] = None, user_id: Optional[int] = None,
+                               client_id: Optional[str] = None, app_id: Optional[str] = None,
+                               scopes: Optional[List[str]] = None,
+                               user_columns: Tuple[str, ...] = CONTEXT_USER_COLUMNS) -> AuthorizationContext:
+    """Look the user up by `email` or `user_id` and the application by `client_id` or `app_id`."""
+    user_key, user_value = ("email", email) if user_id is None else ("id", user_id)
+    app_key, app_value = ("client_id", client_id) if app_id is None else ("id", app_id)
+    requested = scope_set(scopes) if scopes is not None else None
+    # Scopes outside the bitmask registry are checked by user_has_consent() instead
+    with_consent = requested is not None and not requested.extra
+
+    params = (requested.mask, requested.mask) if with_consent else ()
+    conn = get_db_connection()
+    cursor = conn.cursor()
+    cursor.execute(_context_sql(user_key, app_key, with_consent, user_columns), (*params, user_value, app_value))
+    row = cursor.fetchone()
+    conn.close()
+
+    user = {column: row[f"u_{column}"] for column in user_columns} if row["u_id"] is not None else None
+    application = {column: row[f"a_{column}"] for column in CONTEXT_APP_COLUMNS} if row["a_id"] is not None else None
+    has_consent = None
+    if requested is not None and user and application:
+        if not requested:
+            has_consent = True
+        elif with_consent:
+            has_consent = bool(row["has_consent"])
+        else:
+            has_consent = user_has_consent(user["id"], application["id"], list(requested.names))
+    return AuthorizationContext(
+        user=user,
+        application=application,
+        has_access=row["access_id"] is not None,
+        access_blocked=bool(row["access_blocked"]),
+        has_consent=has_consent,
+    )
+
 # User Lookup Functions
 def get_user_by_email(email: str) -> Optional[sqlite3.Row]:
     conn = get_db_connection()
@@ -323,6 +372,14 @@ def get_user_by_email(email: str) -> Optional[sqlite3.Row]:
     conn.close()
     return user
 
+def update_password_hash(user_id: int, password_hash: str) -> None:
+    conn = get_db_connection()
+    cursor = conn.cursor()
+    cursor.execute("UPDATE users SET password_hash = ? WHERE id = ?", (password_hash, user_id))
+    conn.commit()
+    conn.close()
+    forget_user(user_id=user_id)
+
 def get_user_by_id(user_id: int) -> Optional[sqlite3.Row]:
     conn = get_db_connection()
     cursor = conn.cursor()
@@ -352,28 +409,34 @@ def get_application_by_id(app_id: str) -> Optional[sqlite3.Row]:
 
 # Consent Functions
 def user_has_consent(user_id: int, app_id: str, requested_scopes: List[str]) -> bool:
-    if not requested_scopes:
+    requested = scope_set(requested_scopes)
+    if not requested:
         return True
 
     conn = get_db_connection()
     cursor = conn.cursor()
+    if not requested.extra:
+        cursor.execute("""
+            SELECT 1 FROM user_consents
+            WHERE user_id = ? AND app_id = ? AND revoked = FALSE AND (scope_mask & ?) = ?
+            LIMIT 1
+        """, (user_id, app_id, requested.mask, requested.mask))
+        granted = cursor.fetchone() is not None
+        conn.close()
+        return granted
+
+    # Scopes outside the registry: compare against the stored text
     cursor.execute("""
-        SELECT id, scopes FROM user_consents
-        WHERE user_id = ? AND app_id = ? AND revoked = FALSE
-    """, (user_id, app_id))
+        SELECT scopes FROM user_consents
+        WHERE user_id = ? AND app_id = ? AND revoked = FALSE AND (scope_mask & ?) = ?
+    """, (user_id, app_id, requested.mask, requested.mask))
     consents = cursor.fetchall()
     conn.close()
-
-    requested = set(requested_scopes)
-    for consent in consents:
-        existing = set(normalize_scopes(consent["scopes"]))
-        if requested.issubset(existing):
-            return True
-    return False
+    return any(requested.issubset(scope_set(consent["scopes"])) for consent in consents)
 
 def save_user_consent(user_id: int, app_id: str, scopes: List[str]) -> None:
-    normalized = normalize_scopes(" ".join(scopes))
-    if not normalized:
+    granted = scope_set(scopes)
+    if not granted:
         return
 
     conn = get_db_connection()
@@ -386,18 +449,17 @@ def save_user_consent(user_id: int, app_id: str, scopes: List[str]) -> None:
     existing = cursor.fetchone()
 
     if existing:
-        existing_scopes = set(normalize_scopes(existing["scopes"]))
-        merged = sorted(existing_scopes.union(normalized))
+        merged = scope_set(existing["scopes"]).union(granted)
         cursor.execute("""
             UPDATE user_consents
-            SET scopes = ?, revoked = FALSE, granted_at = CURRENT_TIMESTAMP
+            SET scopes = ?, scope_mask = ?, revoked = FALSE, granted_at = CURRENT_TIMESTAMP
             WHERE id = ?
-        """, (" ".join(merged), existing["id"]))
+        """, (merged.text, merged.mask, existing["id"]))
     else:
         cursor.execute("""
-            INSERT INTO user_consents (user_id, app_id, scopes)
-            VALUES (?, ?, ?)
-        """, (user_id, app_id, " ".join(normalized)))
+            INSERT INTO user_consents (user_id, app_id, scopes, scope_mask)
+            VALUES (?, ?, ?, ?)
+        """, (user_id, app_id, granted.text, granted.mask))
 
     conn.commit()
     cursor.execute("SELECT email FROM users WHERE id = ?", (user_id,))
@@ -408,16 +470,22 @@ def save_user_consent(user_id: int, app_id: str, scopes: List[str]) -> None:
         ensure_user_app_access(user_row["email"], app_id)
 
 # Pending Consent Functions
-def create_pending_consent(user_id: int, app_id: str, redirect_uri: str, scopes: List[str]) -> str:
+def create_pending_consent(user_id: int, app_id: str, redirect_uri: str, scopes: List[str],
+                           response_type: str = "token", state: Optional[str] = None,
+                           code_challenge: Optional[str] = None, code_challenge_method: Optional[str] = None) -> str:
     token = secrets.token_urlsafe(48)
     expires_at = (datetime.utcnow() + timedelta(minutes=10)).isoformat()
 
     conn = get_db_connection()
     cursor = conn.cursor()
     cursor.execute("""
-        INSERT INTO pending_consents (token, user_id, app_id, redirect_uri, scopes, expires_at)
-        VALUES (?, ?, ?, ?, ?, ?)
-    """, (token, user_id, app_id, redirect_uri, " ".join(scopes), expires_at))
+        INSERT INTO pending_consents (
+            token, user_id, app_id, redirect_uri, scopes, expires_at,
+            response_type, state, code_challenge, code_challenge_method
+        )
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+    """, (token, user_id, app_id, redirect_uri, " ".join(scopes), expires_at,
+          response_type, state, code_challenge, code_challenge_method))
     conn.commit()
     conn.close()
 
@@ -449,18 +517,22 @@ def delete_pending_consent(token: str) -> None:
     conn.close()
 
 # Authorization Code Functions
-def create_authorization_code(user_id: int, app_id: str, scopes: List[str], redirect_uri: str) -> str:
+def create_authorization_code(user_id: int, app_id: str, scopes: List[str], redirect_uri: str,
+                              code_challenge: Optional[str] = None, code_challenge_method: Optional[str] = None) -> str:
     code = secrets.token_urlsafe(40)
     expires_at = (datetime.utcnow() + timedelta(minutes=AUTH_CODE_EXPIRY_MINUTES)).isoformat()
 
     conn = get_db_connection()
     cursor = conn.cursor()
     cursor.execute("""
-        INSERT INTO authorization_codes (code, user_id, app_id, scopes, redirect_uri, expires_at)
-        VALUES (?, ?, ?, ?, ?, ?)
-    """, (code, user_id, app_id, " ".join(scopes), redirect_uri, expires_at))
+        INSERT INTO authorization_codes (
+            code, user_id, app_id, scopes, redirect_uri, expires_at, code_challenge, code_challenge_method
+        )
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+    """, (code, user_id, app_id, " ".join(scopes), redirect_uri, expires_at, code_challenge, code_challenge_method))
     conn.commit()
     conn.close()
+    inc("sso_tokens_issued_total", (("type", "authorization_code"),))
     return code
 
 def consume_authorization_code(code: str) -> Optional[sqlite3.Row]:
@@ -495,34 +567,38 @@ def consume_authorization_code(code: str) -> Optional[sqlite3.Row]:
     return record
 
 # Refresh Tokens Functions
-def create_refresh_token(user_id: int):
+def create_refresh_token(user_id: int, app_id: Optional[str] = None, scopes: Optional[List[str]] = None):
+    """Issue a refresh token; /oauth/token binds it to the client application and granted scopes."""
     token_value = secrets.token_urlsafe(64)
     expires_at = datetime.utcnow() + timedelta(days=REFRESH_TOKEN_EXPIRE_DAYS)
     
     conn = get_db_connection()
     cursor = conn.cursor()
     cursor.execute("""
-        INSERT INTO refresh_tokens (token, user_id, expires_at)
-        VALUES (?, ?, ?)
-    """, (token_value, user_id, expires_at))
+        INSERT INTO refresh_tokens (token, user_id, expires_at, app_id, scopes)
+        VALUES (?, ?, ?, ?, ?)
+    """, (token_value, user_id, expires_at, app_id, " ".join(scopes) if scopes is not None else None))
     conn.commit()
     token_id = cursor.lastrowid
     conn.close()
+    inc("sso_tokens_issued_total", (("type", "refresh"),))
     
     return token_value, token_id
 
-def verify_refresh_token(token: str):
+def load_refresh_token(token: str, app_id: Optional[str] = None):
+    """The valid refresh token row issued to `app_id` (None for first-party tokens)."""
     conn = get_db_connection()
     cursor = conn.cursor()
     cursor.execute("""
-        SELECT user_id, expires_at, revoked 
+        SELECT id, user_id, expires_at, revoked, app_id, scopes
         FROM refresh_tokens 
         WHERE token = ?
     """, (token,))
     result = cursor.fetchone()
     conn.close()
     
-    if not result:
+    # A token bound to an application is never accepted elsewhere, including /api/auth/refresh
+    if not result or result["app_id"] != app_id:
         raise HTTPException(status_code=401, detail="Invalid refresh token")
     
     if result["revoked"]:
@@ -533,18 +609,30 @@ def verify_refresh_token(token: str):
     if datetime.utcnow() > expires_at:
         raise HTTPException(status_code=401, detail="Refresh token expired")
     
-    return result["user_id"]
+    return result
 
-# Logging Functions
-def log_app_removal(user_email: str, user_name: str, app_id: str, app_name: str):
+def verify_refresh_token(token: str):
+    return load_refresh_token(token)["user_id"]
+
+def revoke_refresh_token(token_id: int) -> bool:
+    """Revoke one refresh token; False when it was already revoked (a concurrent rotation won)."""
     conn = get_db_connection()
     cursor = conn.cursor()
-    cursor.execute("""
-        INSERT INTO app_removal_logs (user_email, user_name, app_id, app_name)
-        VALUES (?, ?, ?, ?)
-    """, (user_email, user_name, app_id, app_name))
+    cursor.execute("UPDATE refresh_tokens SET revoked = TRUE WHERE id = ? AND revoked = FALSE", (token_id,))
+    revoked = cursor.rowcount == 1
     conn.commit()
     conn.close()
+    return revoked
 
 
+# Change Counters (kept by triggers, see migrations.VERSIONED_TABLES)
+def get_table_versions(tables: Tuple[str, ...]) -> Tuple[int, ...]:
+    conn = get_db_connection()
+    cursor = conn.cursor()
+    placeholders = ", ".join("?" for _ in tables)
+    cursor.execute(f"SELECT table_name, version FROM table_versions WHERE table_name IN ({placeholders})", tables)
+    versions = {row[0]: row[1] for row in cursor.fetchall()}
+    conn.close()
+    return tuple(versions.get(table, 0) for table in tables)
+
 # init_db()
\ No newline at end of file
@@ -0,0 +1,167 @@
+import os
+import shutil
+import threading
+import time
+from typing import List, Optional
+from fastapi.responses import JSONResponse
+from .config import (
+    HEALTH_CACHE_SECONDS,
+    HEALTH_DB_TIMEOUT_SECONDS,
+    HEALTH_DB_LATENCY_DEGRADED_MS,
+    HEALTH_MIN_FREE_DISK_MB,
+    HEALTH_QUEUE_DEGRADED_RATIO,
+    HEALTH_HASH_DEGRADED_RATIO,
+    NON_CRITICAL_PATH_PREFIXES
+)
+from .database import DB_FILE_PATH, get_db_connection, get_storage
+from .storage import DatabaseError
+from .security import hashing_pool_usage
+from . import revocation
+
+STATUS_OK = "ok"
+STATUS_DEGRADED = "degraded"
+STATUS_UNAVAILABLE = "unavailable"
+
+_writers: List = []
+_cached_report: Optional[dict] = None
+_cached_at = 0.0
+_probe_lock = threading.Lock()
+
+def register_writer(writer) -> None:
+    _writers.append(writer)
+
+def _probe_db_read() -> dict:
+    start = time.perf_counter()
+    try:
+        conn = get_db_connection(timeout=HEALTH_DB_TIMEOUT_SECONDS)
+        try:
+            conn.execute("SELECT 1 FROM users LIMIT 1").fetchone()
+        finally:
+            conn.close()
+    except DatabaseError as exc:
+        return {"status": STATUS_UNAVAILABLE, "error": str(exc)}
+    latency_ms = (time.perf_counter() - start) * 1000
+    status = STATUS_DEGRADED if latency_ms > HEALTH_DB_LATENCY_DEGRADED_MS else STATUS_OK
+    return {"status": status, "latency_ms": round(latency_ms, 3)}
+
+def _probe_db_write() -> dict:
+    # Take and release the write lock without modifying anything
+    start = time.perf_counter()
+    try:
+        conn = get_db_connection(timeout=HEALTH_DB_TIMEOUT_SECONDS)
+        try:
+            if get_storage() is not None:
+                # Postgres has no database-wide write lock; check we reach a writable primary
+                if conn.execute("SELECT pg_is_in_recovery()").fetchone()[0]:
+                    return {"status": STATUS_DEGRADED, "error": "connected to a read-only replica"}
+            else:
+                conn.execute("BEGIN IMMEDIATE")
+            conn.rollback()
+        finally:
+            conn.close()
+    except DatabaseError as exc:
+        return {"status": STATUS_DEGRADED, "error": str(exc)}
+    latency_ms = (time.perf_counter() - start) * 1000
+    status = STATUS_DEGRADED if latency_ms > HEALTH_DB_LATENCY_DEGRADED_MS else STATUS_OK
+    return {"status": status, "latency_ms": round(latency_ms, 3)}
+
+def _probe_disk() -> dict:
+    if get_storage() is not None:
+        return {"status": STATUS_OK, "skipped": "database is not a local file"}
+    try:
+        usage = shutil.disk_usage(os.path.dirname(DB_FILE_PATH))
+    except OSError as exc:
+        return {"status": STATUS_DEGRADED, "error": str(exc)}
+    free_mb = usage.free // (1024 * 1024)
+    status = STATUS_DEGRADED if free_mb < HEALTH_MIN_FREE_DISK_MB else STATUS_OK
+    return {"status": status, "free_mb": free_mb}
+
+def _probe_writers() -> dict:
+    queues = {}
+    status = STATUS_OK
+    for writer in _writers:
+        capacity = writer.queue.maxsize or 1
+        depth = writer.depth()
+        if depth / capacity >= HEALTH_QUEUE_DEGRADED_RATIO:
+            status = STATUS_DEGRADED
+        queues[writer.name] = {"depth": depth, "capacity": capacity, "dropped": writer.dropped}
+    return {"status": status, "queues": queues}
+
+def _probe_hashing() -> dict:
+    usage = hashing_pool_usage()
+    status = STATUS_DEGRADED if usage["saturation"] >= HEALTH_HASH_DEGRADED_RATIO else STATUS_OK
+    return {"status": status, **usage}
+
+def _probe_caches() -> dict:
+    bloom = revocation._filter
+    return {
+        "status": STATUS_OK,
+        "revocation_filter": {
+            "entries": bloom.count,
+            "bits": bloom.size,
+            "hash_count": bloom.hash_count,
+        },
+    }
+
+def _run_probes() -> dict:
+    checks = {
+        "db_read": _probe_db_read(),
+        "db_write": _probe_db_write(),
+        "disk": _probe_disk(),
+        "writer_queues": _probe_writers(),
+        "hashing": _probe_hashing(),
+        "caches": _probe_caches(),
+    }
+    statuses = {check["status"] for check in checks.values()}
+    if checks["db_read"]["status"] == STATUS_UNAVAILABLE:
+        overall = STATUS_UNAVAILABLE
+    elif statuses - {STATUS_OK}:
+        overall = STATUS_DEGRADED
+    else:
+        overall = STATUS_OK
+    return {"status": overall, "checks": checks}
+
+def readiness_report() -> dict:
+    """Probe results, re-run at most once per HEALTH_CACHE_SECONDS across all callers."""
+    global _cached_report, _cached_at
+    now = time.monotonic()
+    if _cached_report is not None and now - _cached_at < HEALTH_CACHE_SECONDS:
+        return _cached_report
+    # Only one caller probes; concurrent callers get the previous report
+    if not _probe_lock.acquire(blocking=_cached_report is None):
+        return _cached_report
+    try:
+        if _cached_report is None or time.monotonic() - _cached_at >= HEALTH_CACHE_SECONDS:
+            report = _run_probes()
+            report["checked_at"] = time.time()
+            _cached_report = report
+            _cached_at = time.monotonic()
+        return _cached_report
+    finally:
+        _probe_lock.release()
+
+def current_status() -> Optional[str]:
+    """Last known status without probing; None when no recent report exists."""
+    if _cached_report is None or time.monotonic() - _cached_at > HEALTH_CACHE_SECONDS * 5:
+        return None
+    return _cached_report["status"]
+
+
+class LoadSheddingMiddleware:
+    """Refuses non-critical paths with 503 while the last readiness report is degraded."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] == "http" and scope["path"].startswith(NON_CRITICAL_PATH_PREFIXES):
+            status = current_status()
+            if status in (STATUS_DEGRADED, STATUS_UNAVAILABLE):
+                response = JSONResponse(
+                    {"detail": "Service degraded, try again later"},
+                    status_code=503,
+                    headers={"Retry-After": str(int(HEALTH_CACHE_SECONDS * 5))},
+                )
+                await response(scope, receive, send)
+                return
+        await self.app(scope, receive, send)
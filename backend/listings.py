@@ -0,0 +1,27 @@
+from typing import Callable, Dict, Tuple
+from fastapi import Request, Response
+from .config import COMPRESSION_GZIP_LEVEL, COMPRESSION_BROTLI_QUALITY
+from .database import get_table_versions
+from .pages import Asset, asset_response, not_modified
+from .serialization import dumps
+
+# Admin dashboard listings. The ETag is built from the table_versions
+# counters the listing reads from, so a poll with a current If-None-Match
+# costs one small query and gets a 304. The last serialized (and compressed)
+# body of each listing is kept per process and reused until a counter moves.
+
+LISTING_CACHE_CONTROL = "private, no-cache"
+_listings: Dict[str, Asset] = {}
+
+def listing_response(request: Request, name: str, tables: Tuple[str, ...], build: Callable[[], list]) -> Response:
+    versions = ".".join(str(version) for version in get_table_versions(tables))
+    etag = f'W/"{name}-{versions}"'
+    cached = not_modified(request, etag, LISTING_CACHE_CONTROL)
+    if cached is not None:
+        return cached
+    asset = _listings.get(name)
+    if asset is None or asset.etag != etag:
+        asset = Asset(dumps(build()), "application/json", LISTING_CACHE_CONTROL, etag=etag,
+                      gzip_level=COMPRESSION_GZIP_LEVEL, brotli_quality=COMPRESSION_BROTLI_QUALITY)
+        _listings[name] = asset
+    return asset_response(request, asset)
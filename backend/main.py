@@ -1,6 +1,10 @@
-from fastapi.responses import HTMLResponse, RedirectResponse
-from fastapi import FastAPI, HTTPException, Depends, status, Header, Form
+import time
+STARTUP_STARTED = time.perf_counter()
+
+from fastapi.responses import HTMLResponse, RedirectResponse, StreamingResponse, PlainTextResponse, JSONResponse
+from fastapi import FastAPI, HTTPException, Depends, status, Header, Form, Request
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.security import HTTPAuthorizationCredentials
 from typing import Optional, List
 import secrets
 from datetime import datetime, timedelta, timezone
@@ -25,17 +29,33 @@ from .schemas import (
     ApplicationUserBlockRequest, 
     ApplicationAPIKeyCreate,   
     Application,
-    MapRequest
+    MapRequest,
+    UserListItem,
+    ApplicationListItem,
+    TokenResponse,
+    token_user,
+    user_list_item
 )
 from .security import (
     get_current_user,
-    security, pwd_context,
+    decode_token_claims,
+    authorize_app_user,
+    DENIED_USER_NOT_FOUND,
+    DENIED_NO_CONSENT,
+    DENIED_APP_NOT_FOUND,
+    DENIED_APP_BLOCKED,
+    DENIED_USER_BLOCKED,
+    security,
     create_access_token,
-    verify_password,
-    verify_client_secret_value,
+    hash_password,
+    verify_password_and_update,
+    warm_password_hashing,
+    authenticate_client_secret,
+    forget_client_secret,
     JWT_DECODE_OPTIONS,
-    verify_api_key,
-    filter_user_data_by_scopes,
+    verify_api_key_async,
+    verify_code_verifier,
+    PKCE_METHODS,
     require_admin,
     generate_client_secret_value,
     hash_client_secret_value,
@@ -46,27 +66,66 @@ from .config import (
     SECRET_KEY,
     ALGORITHM,
     API_KEY_PREFIX,
-    FRONTEND_REGISTER_URL
+    CLIENT_CREDENTIALS_SCOPES,
+    SCOPE_FIELD_MAP,
+    INIT_MODE,
+    STARTUP_PROFILE
 )
 from .database import (
     init_db,
+    get_storage,
     get_db_connection, 
     create_refresh_token, 
-    get_application_by_client_id, 
-    ensure_user_app_access,
-    is_user_blocked_for_app,
-    user_has_consent,
-    create_pending_consent,
-    get_pending_consent, 
-    delete_pending_consent,
     get_user_by_email, 
     get_application_by_id,
-    save_user_consent,
-    consume_authorization_code, 
-    get_user_by_id,
-    verify_refresh_token,
-    log_app_removal
+    verify_refresh_token
+)
+from .async_database import (
+    run_db,
+    run_hash,
+    submit_hash,
+    shutdown_executors,
+    ensure_user_app_access_async,
+    load_authorization_context_async,
+    get_user_by_email_async,
+    update_password_hash_async,
+    get_application_by_client_id_async,
+    get_application_by_id_async,
+    save_user_consent_async,
+    create_pending_consent_async,
+    get_pending_consent_async,
+    delete_pending_consent_async,
+    create_authorization_code_async,
+    consume_authorization_code_async,
+    create_refresh_token_async,
+    load_refresh_token_async,
+    revoke_refresh_token_async
+)
+from .rate_limit import enforce as enforce_rate_limit, limit_login_ip, limit_token_ip, limit_api_key
+from .revocation import revoke_access_token, is_access_token_revoked
+from .versions import USER, APP, bump_version, publish_version
+from .session_log import record_session_event, query_session_logs, session_writer
+from .audit import (
+    audit_writer,
+    removal_writer,
+    record_audit_event,
+    log_app_removal,
+    query_audit_events,
+    export_audit_ndjson,
+    audit_pipeline_stats
 )
+from .metrics import MetricsMiddleware, register_gauge, render_prometheus
+from .health import (
+    LoadSheddingMiddleware,
+    register_writer,
+    readiness_report,
+    STATUS_UNAVAILABLE
+)
+from .compression import CompressionMiddleware
+from .listings import listing_response
+from .serialization import FastJSONResponse
+from .scopes import scope_set
+from .pages import login_page, static_assets, asset_response, render_consent_page
 from .sso_helpers import (
     REDIRECT_SPLIT_PATTERN, 
     append_query_params_to_url, 
@@ -78,7 +137,6 @@ from .sso_helpers import (
     urls_match,                   
     is_redirect_allowed,          
     get_allowed_redirects_for_app,
-    build_consent_page,
     serialize_redirect_entries
 )
 
@@ -93,6 +151,52 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+app.add_middleware(CompressionMiddleware)
+app.add_middleware(LoadSheddingMiddleware)
+app.add_middleware(MetricsMiddleware)
+
+for writer in (session_writer, audit_writer, removal_writer):
+    register_writer(writer)
+
+register_gauge(
+    "sso_background_queue_depth",
+    "Rows waiting in background writer queues.",
+    lambda: {(("writer", w.name),): w.depth() for w in (session_writer, audit_writer, removal_writer)},
+)
+register_gauge(
+    "sso_background_rows_dropped",
+    "Rows dropped by background writers because their queue was full.",
+    lambda: {(("writer", w.name),): w.dropped for w in (session_writer, audit_writer, removal_writer)},
+)
+
+IMPORT_SECONDS = time.perf_counter() - STARTUP_STARTED
+
+@app.on_event("startup")
+def initialise():
+    started = time.perf_counter()
+    if INIT_MODE != "skip":
+        init_db(seed=INIT_MODE == "full")
+    init_seconds = time.perf_counter() - started
+    # bcrypt backend detection takes tens of milliseconds; keep it off the startup path
+    # On the hash pool rather than a daemon thread, so exit waits for it
+    submit_hash(warm_password_hashing)
+    if STARTUP_PROFILE:
+        print(
+            f"[SSO] Startup: import {IMPORT_SECONDS * 1000:.0f} ms, "
+            f"init_db ({INIT_MODE}) {init_seconds * 1000:.0f} ms, "
+            f"total {(time.perf_counter() - STARTUP_STARTED) * 1000:.0f} ms"
+        )
+
+@app.on_event("shutdown")
+def flush_background_writers():
+    shutdown_executors()
+    session_writer.flush()
+    audit_writer.flush()
+    removal_writer.flush()
+    storage = get_storage()
+    if storage is not None:
+        storage.close()
+
 # ROOT ENDPOINTS
 @app.get("/")
 def root():
@@ -115,146 +219,42 @@ def root():
 def health():
     return {"status": "ok", "modules": ["auth", "token_management", "sdk_ready", "app_management"]}
 
+@app.get("/health/live")
+def health_live():
+    return {"status": "ok"}
+
+@app.get("/health/ready")
+def health_ready():
+    report = readiness_report()
+    status_code = 503 if report["status"] == STATUS_UNAVAILABLE else 200
+    return JSONResponse(report, status_code=status_code)
+
+@app.get("/metrics", response_class=PlainTextResponse)
+def metrics():
+    return PlainTextResponse(render_prometheus(), media_type="text/plain; version=0.0.4")
+
 @app.get("/sso-login", response_class=HTMLResponse)
-def sso_login_page():
+def sso_login_page(request: Request):
     """Serves the SSO login page for third-party applications"""
-    html_content = """
-    <!DOCTYPE html>
-    <html lang="en">
-    <head>
-        <meta charset="UTF-8">
-        <meta name="viewport" content="width=device-width, initial-scale=1.0">
-        <title>SSO Login Portal</title>
-        <script src="https://cdn.tailwindcss.com"></script>
-    </head>
-    <body class="bg-gradient-to-br from-indigo-50 to-purple-100 min-h-screen flex items-center justify-center">
-        <div class="bg-white rounded-2xl shadow-xl p-8 w-full max-w-md">
-            <div class="text-center mb-8">
-                <div class="bg-indigo-600 w-16 h-16 rounded-full flex items-center justify-center mx-auto mb-4">
-                    <svg class="text-white w-8 h-8" fill="none" stroke="currentColor" viewBox="0 0 24 24">
-                        <path stroke-linecap="round" stroke-linejoin="round" stroke-width="2" d="M12 15v2m-6 4h12a2 2 0 002-2v-6a2 2 0 00-2-2H6a2 2 0 00-2 2v6a2 2 0 002 2zm10-10V7a4 4 0 00-8 0v4h8z"/>
-                    </svg>
-                </div>
-                <h1 class="text-3xl font-bold text-gray-800">SSO Login Portal</h1>
-                <p class="text-gray-600 mt-2">Sign in with your university credentials</p>
-            </div>
-
-            <div id="error-message" class="hidden bg-red-50 border border-red-200 text-red-700 px-4 py-3 rounded-lg mb-4"></div>
-
-            <form id="sso-login-form" class="space-y-4">
-                <div>
-                    <label class="block text-sm font-medium text-gray-700 mb-1">Email</label>
-                    <input 
-                        type="email" 
-                        id="email" 
-                        name="email" 
-                        required 
-                        placeholder="student@university.edu"
-                        class="w-full px-4 py-2 border border-gray-300 rounded-lg focus:ring-2 focus:ring-indigo-500 focus:border-transparent"
-                    />
-                </div>
-
-                <div>
-                    <label class="block text-sm font-medium text-gray-700 mb-1">Password</label>
-                    <input 
-                        type="password" 
-                        id="password" 
-                        name="password" 
-                        required 
-                        placeholder="••••••••"
-                        class="w-full px-4 py-2 border border-gray-300 rounded-lg focus:ring-2 focus:ring-indigo-500 focus:border-transparent"
-                    />
-                </div>
-
-                <button 
-                    type="submit" 
-                    class="w-full bg-indigo-600 text-white py-3 rounded-lg font-semibold hover:bg-indigo-700 transition disabled:bg-gray-400"
-                    id="submit-btn"
-                >
-                    Sign In
-                </button>
-                <p class="text-center text-sm text-gray-500">
-                    New here?
-                    <button type="button" id="register-link" class="text-indigo-600 font-semibold hover:underline">
-                        Create an account
-                    </button>
-                </p>
-            </form>
-
-            <p class="text-center mt-6 text-sm text-gray-500">
-                Protected by University SSO System
-            </p>
-        </div>
-
-        <script>
-            const urlParams = new URLSearchParams(window.location.search);
-            const redirectUri = urlParams.get('redirect_uri');
-            const clientId = urlParams.get('client_id');
-            const scopeParam = urlParams.get('scope') || 'profile email';
-
-            const loginForm = document.getElementById('sso-login-form');
-            const errorDiv = document.getElementById('error-message');
-
-            if (!redirectUri || !clientId) {
-                errorDiv.textContent = 'Error: Missing redirect_uri or client_id.';
-                errorDiv.classList.remove('hidden');
-                loginForm.style.display = 'none';
-            }
-
-            document.getElementById('register-link').addEventListener('click', () => {
-                window.location.href = "__FRONTEND_REGISTER_URL__";
-            });
-
-            loginForm.addEventListener('submit', async (e) => {
-                e.preventDefault();
-                
-                const submitBtn = document.getElementById('submit-btn');
-                
-                submitBtn.disabled = true;
-                submitBtn.textContent = 'Signing in...';
-                errorDiv.classList.add('hidden');
-
-                const formData = new FormData();
-                formData.append('email', document.getElementById('email').value);
-                formData.append('password', document.getElementById('password').value);
-                formData.append('redirect_uri', redirectUri);
-
-                const form = document.createElement('form');
-                form.method = 'POST';
-                form.action = '/login';
-
-                for (let [key, value] of formData.entries()) {
-                    const input = document.createElement('input');
-                    input.type = 'hidden';
-                    input.name = key;
-                    input.value = value;
-                    form.appendChild(input);
-                }
-
-                const clientIdField = document.createElement('input');
-                clientIdField.type = 'hidden';
-                clientIdField.name = 'client_id';
-                clientIdField.value = clientId;
-                form.appendChild(clientIdField);
-
-                const scopeField = document.createElement('input');
-                scopeField.type = 'hidden';
-                scopeField.name = 'scope';
-                scopeField.value = scopeParam;
-                form.appendChild(scopeField);
-
-                document.body.appendChild(form);
-                form.submit();
-            });
-        </script>
-    </body>
-    </html>
-    """
-    return HTMLResponse(content=html_content.replace("__FRONTEND_REGISTER_URL__", FRONTEND_REGISTER_URL))
+    return asset_response(request, login_page)
+
+@app.get("/static/{name}")
+def static_file(name: str, request: Request):
+    asset = static_assets.get(name)
+    if asset is None:
+        raise HTTPException(status_code=404, detail="Not found")
+    return asset_response(request, asset)
 
 # AUTHENTICATION ENDPOINTS
+async def verify_login_password(user, password: str) -> bool:
+    """Check a login password, upgrading the stored hash when the hashing policy has changed."""
+    valid, new_hash = await run_hash(verify_password_and_update, password, user["password_hash"])
+    if valid and new_hash:
+        await update_password_hash_async(user["id"], new_hash)
+    return valid
+
 @app.post("/api/auth/register", response_model=Token)
-def register(user_data: UserRegister):
+def register(user_data: UserRegister, request: Request):
     if user_data.password != user_data.confirmPassword:
         raise HTTPException(status_code=400, detail="Passwords do not match")
     
@@ -269,7 +269,7 @@ def register(user_data: UserRegister):
         conn.close()
         raise HTTPException(status_code=400, detail="Email already registered")
     
-    password_hash = pwd_context.hash(user_data.password)
+    password_hash = hash_password(user_data.password)
     cursor.execute("""
         INSERT INTO users (name, email, password_hash, roll_no, branch, semester, role)
         VALUES (?, ?, ?, ?, ?, ?, ?)
@@ -282,6 +282,7 @@ def register(user_data: UserRegister):
     
     access_token, jti = create_access_token(data={"sub": user_data.email})
     refresh_token, refresh_id = create_refresh_token(user_id)
+    record_session_event("register", user_id, request, jti=jti, refresh_token_id=refresh_id)
     
     return {
         "access_token": access_token,
@@ -299,60 +300,62 @@ def register(user_data: UserRegister):
         }
     }
 
-@app.post("/api/auth/login", response_model=Token)
-def login(credentials: UserLogin):
-    conn = get_db_connection()
-    cursor = conn.cursor()
-    cursor.execute("SELECT * FROM users WHERE email = ?", (credentials.email,))
-    user = cursor.fetchone()
-    conn.close()
+@app.post("/api/auth/login", response_model=Token, dependencies=[Depends(limit_login_ip)])
+async def login(credentials: UserLogin, request: Request):
+    await enforce_rate_limit(("login_email", credentials.email.lower()))
+    user = await get_user_by_email_async(credentials.email)
     
-    if not user or not verify_password(credentials.password, user["password_hash"]):
+    if not user or not await verify_login_password(user, credentials.password):
         raise HTTPException(status_code=401, detail="Invalid email or password")
     
     access_token, jti = create_access_token(data={"sub": user["email"]})
-    refresh_token, refresh_id = create_refresh_token(user["id"])
+    refresh_token, refresh_id = await create_refresh_token_async(user["id"])
+    record_session_event("login", user["id"], request, jti=jti, refresh_token_id=refresh_id)
     
-    return {
+    body: TokenResponse = {
         "access_token": access_token,
         "refresh_token": refresh_token,
         "token_type": "bearer",
         "expires_in": ACCESS_TOKEN_EXPIRE_MINUTES * 60,
-        "user": {
-            "id": user["id"],
-            "name": user["name"],
-            "email": user["email"],
-            "role": user["role"],
-            "rollNo": user["roll_no"],
-            "branch": user["branch"],
-            "semester": user["semester"]
-        }
+        "user": token_user(user)
     }
+    return FastJSONResponse(body)
 
-@app.post("/login")
-def sso_login_redirect(
+@app.post("/login", dependencies=[Depends(limit_login_ip)])
+async def sso_login_redirect(
+    request: Request,
     email: str = Form(...),
     password: str = Form(...),
     redirect_uri: str = Form(...),
     client_id: str = Form(...),
-    scope: Optional[str] = Form("profile email")
+    scope: Optional[str] = Form("profile email"),
+    response_type: str = Form("token"),
+    state: Optional[str] = Form(None),
+    code_challenge: Optional[str] = Form(None),
+    code_challenge_method: Optional[str] = Form(None)
 ):
     """
-    Handles user authentication for SSO flow and redirects to the third-party app
-    with the access token appended as a fragment (#token=...) in the URL.
+    Handles user authentication for SSO flow and redirects to the third-party app,
+    either with the access token (response_type=token) or with a short-lived
+    authorization code to exchange at /oauth/token (response_type=code, PKCE).
     """
-    conn = get_db_connection()
-    cursor = conn.cursor()
-    cursor.execute("SELECT * FROM users WHERE email = ?", (email,))
-    user = cursor.fetchone()
-    conn.close()
+    await enforce_rate_limit(("login_email", email.lower()), ("client_id", client_id))
+    if response_type not in ("token", "code"):
+        raise HTTPException(status_code=400, detail="unsupported_response_type")
+    if code_challenge:
+        code_challenge_method = code_challenge_method or "plain"
+        if response_type != "code" or code_challenge_method not in PKCE_METHODS:
+            raise HTTPException(status_code=400, detail="invalid_request")
+    requested_scopes = normalize_scopes(scope) or DEFAULT_SSO_SCOPES
+    context = await load_authorization_context_async(email=email, client_id=client_id, scopes=requested_scopes)
+    user = context.user
     
-    if not user or not verify_password(password, user["password_hash"]):
+    if not user or not await verify_login_password(user, password):
         # For better UX, redirect to login page with error instead of raising exception
         error_url = f"{redirect_uri}?error=invalid_credentials"
         return RedirectResponse(url=error_url, status_code=status.HTTP_302_FOUND)
     
-    application = get_application_by_client_id(client_id)
+    application = context.application
     if not application:
         raise HTTPException(status_code=400, detail="Unknown client_id")
 
@@ -369,111 +372,152 @@ def sso_login_redirect(
         blocked_url = f"{redirect_uri}?error=app_blocked"
         return RedirectResponse(url=blocked_url, status_code=status.HTTP_302_FOUND)
 
-    requested_scopes = normalize_scopes(scope) or DEFAULT_SSO_SCOPES
-
-    ensure_user_app_access(user["email"], application["id"])
-    if is_user_blocked_for_app(user["email"], application["id"]):
+    if not context.has_access:
+        await ensure_user_app_access_async(user["email"], application["id"])
+    if context.access_blocked:
         blocked_url = f"{redirect_uri}?error=user_blocked"
         return RedirectResponse(url=blocked_url, status_code=status.HTTP_302_FOUND)
 
-    if not user_has_consent(user["id"], application["id"], requested_scopes):
-        consent_token = create_pending_consent(
+    if not context.has_consent:
+        consent_token = await create_pending_consent_async(
             user_id=user["id"],
             app_id=application["id"],
             redirect_uri=redirect_uri,
-            scopes=requested_scopes
+            scopes=requested_scopes,
+            response_type=response_type,
+            state=state,
+            code_challenge=code_challenge,
+            code_challenge_method=code_challenge_method
         )
-        consent_page = build_consent_page(consent_token, application["name"], requested_scopes)
+        consent_page = render_consent_page(consent_token, application["name"], requested_scopes)
         return HTMLResponse(content=consent_page)
 
-    # 1. Generate the Access Token
+    return await complete_authorization(
+        request, "sso_login", user, application, requested_scopes, redirect_uri,
+        response_type, state, code_challenge, code_challenge_method
+    )
+# END FIXED SSO LOGIN ENDPOINT
+
+async def complete_authorization(
+    request: Request,
+    event: str,
+    user: dict,
+    application: dict,
+    scopes: List[str],
+    redirect_uri: str,
+    response_type: str,
+    state: Optional[str],
+    code_challenge: Optional[str],
+    code_challenge_method: Optional[str]
+) -> RedirectResponse:
+    """Redirect back to the client with an authorization code, or with the access token itself."""
+    if response_type == "code":
+        # The JWT only travels over the back channel (/oauth/token)
+        code = await create_authorization_code_async(
+            user["id"], application["id"], scopes, redirect_uri, code_challenge, code_challenge_method
+        )
+        record_session_event(event, user["id"], request, app_id=application["id"])
+        location = append_query_params_to_url(redirect_uri, {"code": code, "state": state})
+        return RedirectResponse(url=location, status_code=status.HTTP_302_FOUND)
+
     access_token, jti = create_access_token(
         data={
             "sub": user["email"],
             "aud": application["id"],
-            "scopes": requested_scopes
+            "scopes": scopes
         }
     )
-    
-    # 2. Construct the Redirect URL with token in HASH fragment
-    # This is important: we use # (hash) instead of ? (query) for security
-    final_redirect_url = f"{redirect_uri}?token={access_token}"
-
-    # 3. Redirect the browser
-    return RedirectResponse(url=final_redirect_url, status_code=status.HTTP_302_FOUND)
-# END FIXED SSO LOGIN ENDPOINT
+    record_session_event(event, user["id"], request, jti=jti, app_id=application["id"])
+    return RedirectResponse(url=f"{redirect_uri}?token={access_token}", status_code=status.HTTP_302_FOUND)
 
 @app.post("/consent/decision")
-def consent_decision(
+async def consent_decision(
+    request: Request,
     consent_token: str = Form(...),
     decision: str = Form(...)
 ):
-    pending = get_pending_consent(consent_token)
+    pending = await get_pending_consent_async(consent_token)
     if not pending:
         return RedirectResponse(url="/?error=invalid_consent", status_code=status.HTTP_302_FOUND)
 
     redirect_uri = pending["redirect_uri"]
     app_id = pending["app_id"]
     scopes = normalize_scopes(pending["scopes"])
-    user = get_user_by_email(pending["user_email"])
-    application = get_application_by_id(app_id)
+    context = await load_authorization_context_async(user_id=pending["user_id"], app_id=app_id)
+    user = context.user
+    application = context.application
 
     if not user or not application:
-        delete_pending_consent(consent_token)
+        await delete_pending_consent_async(consent_token)
         return RedirectResponse(url=f"{redirect_uri}?error=invalid_consent", status_code=status.HTTP_302_FOUND)
 
     if application.get("blocked"):
-        delete_pending_consent(consent_token)
+        await delete_pending_consent_async(consent_token)
         return RedirectResponse(url=f"{redirect_uri}?error=app_blocked", status_code=status.HTTP_302_FOUND)
 
-    ensure_user_app_access(user["email"], application["id"])
-    if is_user_blocked_for_app(user["email"], application["id"]):
-        delete_pending_consent(consent_token)
+    if not context.has_access:
+        await ensure_user_app_access_async(user["email"], application["id"])
+    if context.access_blocked:
+        await delete_pending_consent_async(consent_token)
         return RedirectResponse(url=f"{redirect_uri}?error=user_blocked", status_code=status.HTTP_302_FOUND)
 
     expires_at = datetime.fromisoformat(pending["expires_at"])
     if datetime.utcnow() > expires_at:
-        delete_pending_consent(consent_token)
+        await delete_pending_consent_async(consent_token)
         return RedirectResponse(url=f"{redirect_uri}?error=consent_expired", status_code=status.HTTP_302_FOUND)
 
     decision_value = decision.lower()
     if decision_value != "approve":
-        delete_pending_consent(consent_token)
+        await delete_pending_consent_async(consent_token)
         return RedirectResponse(url=f"{redirect_uri}?error=access_denied", status_code=status.HTTP_302_FOUND)
 
-    save_user_consent(user["id"], application["id"], scopes)
-    delete_pending_consent(consent_token)
+    await save_user_consent_async(user["id"], application["id"], scopes)
+    await delete_pending_consent_async(consent_token)
 
-    access_token, _ = create_access_token(
-        data={
-            "sub": user["email"],
-            "aud": application["id"],
-            "scopes": scopes
-        }
+    return await complete_authorization(
+        request, "sso_consent", user, application, scopes, redirect_uri,
+        pending["response_type"] or "token", pending["state"],
+        pending["code_challenge"], pending["code_challenge_method"]
     )
 
-    success_redirect = f"{redirect_uri}?token={access_token}"
-    return RedirectResponse(url=success_redirect, status_code=status.HTTP_302_FOUND)
+OAUTH_GRANT_TYPES = ("authorization_code", "refresh_token", "client_credentials")
 
-@app.post("/oauth/token")
-def exchange_authorization_code(payload: OAuthTokenRequest):
-    if payload.grant_type != "authorization_code":
+@app.post("/oauth/token", dependencies=[Depends(limit_token_ip)])
+async def oauth_token(payload: OAuthTokenRequest, request: Request):
+    await enforce_rate_limit(("client_id", payload.client_id))
+    if payload.grant_type not in OAUTH_GRANT_TYPES:
         raise HTTPException(status_code=400, detail="unsupported_grant_type")
 
-    application = get_application_by_client_id(payload.client_id)
+    application = await get_application_by_client_id_async(payload.client_id)
     if not application:
         raise HTTPException(status_code=401, detail="invalid_client")
 
-    if not verify_client_secret_value(payload.client_secret, application.get("client_secret")):
+    if payload.client_secret is not None:
+        if not await authenticate_client_secret(application, payload.client_secret):
+            raise HTTPException(status_code=401, detail="invalid_client")
+    elif payload.grant_type != "authorization_code" or not payload.code_verifier:
+        # Only the PKCE code exchange is open to clients without a secret
         raise HTTPException(status_code=401, detail="invalid_client")
 
     if application.get("blocked"):
         raise HTTPException(status_code=403, detail="Application blocked by admin")
 
-    auth_record = consume_authorization_code(payload.code)
+    if payload.grant_type == "client_credentials":
+        return client_credentials_grant(application, payload)
+    if payload.grant_type == "refresh_token":
+        return await refresh_token_grant(request, application, payload)
+
+    auth_record = await consume_authorization_code_async(payload.code)
     if not auth_record or auth_record["app_id"] != application["id"]:
         raise HTTPException(status_code=400, detail="invalid_grant")
 
+    if auth_record["code_challenge"]:
+        if not verify_code_verifier(payload.code_verifier, auth_record["code_challenge"], auth_record["code_challenge_method"]):
+            raise HTTPException(status_code=400, detail="invalid_grant")
+    elif payload.client_secret is None:
+        # Without a secret, only a PKCE-bound code authenticates the client
+        raise HTTPException(status_code=400, detail="invalid_grant")
+
     stored_redirect = auth_record["redirect_uri"]
     if stored_redirect:
         incoming_redirect = payload.redirect_uri or stored_redirect
@@ -485,32 +529,97 @@ def exchange_authorization_code(payload: OAuthTokenRequest):
         if not redirect_ok:
             raise HTTPException(status_code=400, detail="invalid_redirect")
 
-    user = get_user_by_id(auth_record["user_id"])
+    context = await load_authorization_context_async(user_id=auth_record["user_id"], app_id=application["id"])
+    user = context.user
     if not user:
         raise HTTPException(status_code=400, detail="invalid_grant")
 
-    if is_user_blocked_for_app(user["email"], application["id"]):
+    if context.access_blocked:
         raise HTTPException(status_code=403, detail="User access blocked by admin")
 
     scopes = normalize_scopes(auth_record["scopes"]) or DEFAULT_SSO_SCOPES
 
-    access_token, _ = create_access_token(
+    access_token, jti = create_access_token(
         data={
             "sub": user["email"],
             "aud": application["id"],
             "scopes": scopes
         }
     )
+    # Refresh tokens only go to clients that can authenticate when using them
+    refresh_token = refresh_id = None
+    if payload.client_secret is not None:
+        refresh_token, refresh_id = await create_refresh_token_async(user["id"], application["id"], scopes)
+    record_session_event("code_exchange", user["id"], request, jti=jti, refresh_token_id=refresh_id, app_id=application["id"])
 
-    return {
+    return oauth_token_response(access_token, scopes, refresh_token)
+
+def oauth_token_response(access_token: str, scopes: List[str], refresh_token: Optional[str] = None) -> FastJSONResponse:
+    content = {
         "access_token": access_token,
         "token_type": "bearer",
         "expires_in": ACCESS_TOKEN_EXPIRE_MINUTES * 60,
         "scope": " ".join(scopes)
     }
+    if refresh_token is not None:
+        content["refresh_token"] = refresh_token
+    return FastJSONResponse(content)
+
+def client_credentials_grant(application: dict, payload: OAuthTokenRequest) -> FastJSONResponse:
+    """A token for the application itself (machine-to-machine); no user, no refresh token."""
+    scopes = normalize_scopes(payload.scope)
+    # There is no user behind the token, so nothing that releases user data is granted
+    if any(scope in SCOPE_FIELD_MAP or scope not in CLIENT_CREDENTIALS_SCOPES for scope in scopes):
+        raise HTTPException(status_code=400, detail="invalid_scope")
+    access_token, _ = create_access_token(
+        data={
+            "sub": application["client_id"],
+            "aud": application["id"],
+            "scopes": scopes
+        },
+        token_type="client"
+    )
+    return oauth_token_response(access_token, scopes)
+
+async def refresh_token_grant(request: Request, application: dict, payload: OAuthTokenRequest) -> FastJSONResponse:
+    """Rotate an application-bound refresh token into a new access and refresh token pair."""
+    if not payload.refresh_token:
+        raise HTTPException(status_code=400, detail="invalid_request")
+    try:
+        record = await load_refresh_token_async(payload.refresh_token, application["id"])
+    except HTTPException:
+        raise HTTPException(status_code=400, detail="invalid_grant")
+
+    granted = normalize_scopes(record["scopes"])
+    # A narrower scope may be requested for this access token; the grant itself stays as issued
+    scopes = normalize_scopes(payload.scope) if payload.scope else granted
+    if not scope_set(scopes).issubset(scope_set(granted)):
+        raise HTTPException(status_code=400, detail="invalid_scope")
+
+    context = await load_authorization_context_async(user_id=record["user_id"], app_id=application["id"], scopes=scopes)
+    user = context.user
+    if not user or not context.has_consent:
+        raise HTTPException(status_code=400, detail="invalid_grant")
+    if context.access_blocked:
+        raise HTTPException(status_code=403, detail="User access blocked by admin")
+
+    # Single use: of two concurrent refreshes with the same token, one loses here
+    if not await revoke_refresh_token_async(record["id"]):
+        raise HTTPException(status_code=400, detail="invalid_grant")
+
+    access_token, jti = create_access_token(
+        data={
+            "sub": user["email"],
+            "aud": application["id"],
+            "scopes": scopes
+        }
+    )
+    refresh_token, refresh_id = await create_refresh_token_async(user["id"], application["id"], granted)
+    record_session_event("oauth_refresh", user["id"], request, jti=jti, refresh_token_id=refresh_id, app_id=application["id"])
+    return oauth_token_response(access_token, scopes, refresh_token)
 
 @app.post("/api/auth/refresh")
-def refresh_access_token(token_data: TokenRefresh):
+def refresh_access_token(token_data: TokenRefresh, request: Request):
     user_id = verify_refresh_token(token_data.refresh_token)
     
     conn = get_db_connection()
@@ -523,6 +632,7 @@ def refresh_access_token(token_data: TokenRefresh):
         raise HTTPException(status_code=401, detail="User not found")
     
     access_token, jti = create_access_token(data={"sub": user["email"]})
+    record_session_event("refresh", user["id"], request, jti=jti)
     
     return {
         "access_token": access_token,
@@ -547,7 +657,13 @@ def verify_token(token_data: TokenVerify):
         }
 
 @app.post("/api/auth/logout")
-def logout(current_user: dict = Depends(get_current_user)):
+def logout(
+    current_user: dict = Depends(get_current_user),
+    credentials: HTTPAuthorizationCredentials = Depends(security)
+):
+    payload = jwt.decode(credentials.credentials, SECRET_KEY, algorithms=[ALGORITHM], options=JWT_DECODE_OPTIONS)
+    revoke_access_token(payload.get("jti"), payload.get("exp"), current_user["id"])
+
     conn = get_db_connection()
     cursor = conn.cursor()
     cursor.execute("""
@@ -560,6 +676,22 @@ def logout(current_user: dict = Depends(get_current_user)):
     
     return {"message": "Logged out successfully"}
 
+@app.post("/api/auth/revoke")
+def revoke_token(token_data: TokenVerify, current_user: dict = Depends(get_current_user)):
+    try:
+        payload = jwt.decode(token_data.token, SECRET_KEY, algorithms=[ALGORITHM], options=JWT_DECODE_OPTIONS)
+    except JWTError:
+        # Expired or malformed tokens are already unusable
+        return {"message": "Token revoked"}
+
+    if payload.get("sub") != current_user["email"] and current_user["role"] != "admin":
+        raise HTTPException(status_code=403, detail="Access denied")
+
+    owner = get_user_by_email(payload.get("sub"))
+    revoke_access_token(payload.get("jti"), payload.get("exp"), owner["id"] if owner else None)
+    record_audit_event("token.revoked", current_user, "access_token", payload.get("jti"), {"subject": payload.get("sub")})
+    return {"message": "Token revoked"}
+
 @app.get("/api/auth/me")
 def get_me(current_user: dict = Depends(get_current_user)):
     return {
@@ -574,7 +706,7 @@ def get_me(current_user: dict = Depends(get_current_user)):
 
 # PROFILE MANAGEMENT
 @app.put("/api/profile")
-def update_profile(profile_data: ProfileUpdate, current_user: dict = Depends(get_current_user)):
+def update_profile(profile_data: ProfileUpdate, request: Request, current_user: dict = Depends(get_current_user)):
     conn = get_db_connection()
     cursor = conn.cursor()
     
@@ -603,14 +735,25 @@ def update_profile(profile_data: ProfileUpdate, current_user: dict = Depends(get
     query = f"UPDATE users SET {', '.join(update_fields)} WHERE id = ?"
     
     cursor.execute(query, params)
+    version = bump_version(cursor, USER, current_user["email"])
     conn.commit()
     conn.close()
+    publish_version(USER, current_user["email"], version)
+
+    record_audit_event(
+        "user.profile_updated",
+        current_user,
+        "user",
+        current_user["id"],
+        profile_data.model_dump(exclude_none=True),
+        request,
+    )
     
     return {"message": "Profile updated successfully"}
 
 # API KEY MANAGEMENT
 @app.post("/api/keys", response_model=APIKeyResponse)
-def create_api_key(key_data: APIKeyCreate, current_user: dict = Depends(get_current_user)):
+def create_api_key(key_data: APIKeyCreate, request: Request, current_user: dict = Depends(get_current_user)):
     key_value = f"{API_KEY_PREFIX}{secrets.token_urlsafe(32)}"
     
     conn = get_db_connection()
@@ -622,6 +765,8 @@ def create_api_key(key_data: APIKeyCreate, current_user: dict = Depends(get_curr
     conn.commit()
     key_id = cursor.lastrowid
     conn.close()
+
+    record_audit_event("api_key.created", current_user, "api_key", key_id, {"name": key_data.name}, request)
     
     return {
         "id": key_id,
@@ -652,7 +797,7 @@ def list_api_keys(current_user: dict = Depends(get_current_user)):
     } for k in keys]
 
 @app.delete("/api/keys/{key_id}")
-def revoke_api_key(key_id: int, current_user: dict = Depends(get_current_user)):
+def revoke_api_key(key_id: int, request: Request, current_user: dict = Depends(get_current_user)):
     conn = get_db_connection()
     cursor = conn.cursor()
     cursor.execute("""
@@ -667,24 +812,24 @@ def revoke_api_key(key_id: int, current_user: dict = Depends(get_current_user)):
     
     conn.commit()
     conn.close()
+
+    record_audit_event("api_key.revoked", current_user, "api_key", key_id, None, request)
     
     return {"message": "API key revoked"}
 
 # SDK INTEGRATION ENDPOINTS
-@app.post("/api/sdk/login")
-def sdk_login(credentials: UserLogin, current_app: dict = Depends(verify_api_key)):
-    conn = get_db_connection()
-    cursor = conn.cursor()
-    cursor.execute("SELECT * FROM users WHERE email = ?", (credentials.email,))
-    user = cursor.fetchone()
-    conn.close()
+@app.post("/api/sdk/login", dependencies=[Depends(limit_api_key)])
+async def sdk_login(credentials: UserLogin, request: Request, current_app: dict = Depends(verify_api_key_async)):
+    await enforce_rate_limit(("login_email", credentials.email.lower()))
+    user = await get_user_by_email_async(credentials.email)
     
-    if not user or not verify_password(credentials.password, user["password_hash"]):
+    if not user or not await verify_login_password(user, credentials.password):
         raise HTTPException(status_code=401, detail="Invalid credentials")
     
     access_token, jti = create_access_token(data={"sub": user["email"]})
+    record_session_event("sdk_login", user["id"], request, jti=jti)
     
-    return {
+    return FastJSONResponse({
         "access_token": access_token,
         "token_type": "bearer",
         "expires_in": ACCESS_TOKEN_EXPIRE_MINUTES * 60,
@@ -693,12 +838,27 @@ def sdk_login(credentials: UserLogin, current_app: dict = Depends(verify_api_key
             "email": user["email"],
             "name": user["name"]
         }
-    }
-
-@app.get("/api/sdk/verify")
-def sdk_verify_token(token: str, current_app: dict = Depends(verify_api_key)):
+    })
+
+# What each SDK endpoint reports when authorize_app_user denies a token's user
+SDK_VERIFY_DENIALS = {
+    DENIED_NO_CONSENT: "Required consent not granted",
+    DENIED_APP_NOT_FOUND: "Application not found",
+    DENIED_APP_BLOCKED: "Application blocked by admin",
+    DENIED_USER_BLOCKED: "User access blocked by admin",
+}
+SDK_PROFILE_DENIALS = {
+    DENIED_USER_NOT_FOUND: (404, "User not found"),
+    DENIED_NO_CONSENT: (403, "User has not granted required permissions"),
+    DENIED_APP_NOT_FOUND: (404, "Application not found"),
+    DENIED_APP_BLOCKED: (403, "Application blocked by admin"),
+    DENIED_USER_BLOCKED: (403, "User access blocked by admin"),
+}
+
+@app.get("/api/sdk/verify", dependencies=[Depends(limit_api_key)])
+async def sdk_verify_token(token: str, current_app: dict = Depends(verify_api_key_async)):
     try:
-        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM], options=JWT_DECODE_OPTIONS)
+        payload = decode_token_claims(token)
         email = payload.get("sub")
         app_id = payload.get("aud")
         scopes = payload.get("scopes") or DEFAULT_SSO_SCOPES
@@ -707,41 +867,51 @@ def sdk_verify_token(token: str, current_app: dict = Depends(verify_api_key)):
 
         if not app_id:
             return {"valid": False, "error": "Token missing audience (app) claim"}
-        
-        user = get_user_by_email(email)
-        
-        if not user:
-            raise HTTPException(status_code=404, detail="User not found")
-
-        if not user_has_consent(user["id"], app_id, scopes):
-            return {"valid": False, "error": "Required consent not granted"}
-
-        application = get_application_by_id(app_id)
-        if not application:
-            return {"valid": False, "error": "Application not found"}
-        if application.get("blocked"):
-            return {"valid": False, "error": "Application blocked by admin"}
 
-        if is_user_blocked_for_app(user["email"], app_id):
-            return {"valid": False, "error": "User access blocked by admin"}
+        if await run_db(is_access_token_revoked, payload.get("jti")):
+            return {"valid": False, "error": "Token has been revoked"}
+
+        if payload.get("type") == "client":
+            # client_credentials: the application itself, no user or consent to check
+            application = await get_application_by_id_async(app_id)
+            if not application:
+                return {"valid": False, "error": "Application not found"}
+            if application.get("blocked"):
+                return {"valid": False, "error": "Application blocked by admin"}
+            return FastJSONResponse({
+                "valid": True,
+                "client_id": email,
+                "scopes": payload.get("scopes") or [],
+                "app_id": app_id
+            })
+        if payload.get("type") != "access":
+            return {"valid": False, "error": "Invalid token type"}
+
+        user, denial = await run_db(authorize_app_user, email, app_id, scopes)
+        if denial == DENIED_USER_NOT_FOUND:
+            raise HTTPException(status_code=404, detail="User not found")
+        if denial:
+            return {"valid": False, "error": SDK_VERIFY_DENIALS[denial]}
 
-        filtered_user = filter_user_data_by_scopes(user, scopes)
-        
-        return {
+        return FastJSONResponse({
             "valid": True,
-            "user": filtered_user,
+            # Only the columns these scopes release, in payload form
+            "user": user,
             "scopes": scopes,
             "app_id": app_id
-        }
+        })
     except JWTError as exc:
         return {"valid": False, "error": str(exc)}
 
-@app.get("/api/sdk/user-profile")
-def sdk_user_profile(token: str, current_app: dict = Depends(verify_api_key)):
+@app.get("/api/sdk/user-profile", dependencies=[Depends(limit_api_key)])
+async def sdk_user_profile(token: str, current_app: dict = Depends(verify_api_key_async)):
     try:
-        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM], options=JWT_DECODE_OPTIONS)
+        payload = decode_token_claims(token)
     except JWTError as exc:
         raise HTTPException(status_code=401, detail=f"Invalid token: {exc}") from exc
+    # Only user access tokens; client_credentials tokens have no user behind them
+    if payload.get("type") != "access":
+        raise HTTPException(status_code=401, detail="Invalid token type")
 
     email = payload.get("sub")
     app_id = payload.get("aud")
@@ -752,65 +922,56 @@ def sdk_user_profile(token: str, current_app: dict = Depends(verify_api_key)):
     if not email or not app_id:
         raise HTTPException(status_code=400, detail="Token missing required claims")
 
-    user = get_user_by_email(email)
-    if not user:
-        raise HTTPException(status_code=404, detail="User not found")
-
-    if not user_has_consent(user["id"], app_id, scopes):
-        raise HTTPException(status_code=403, detail="User has not granted required permissions")
-
-    application = get_application_by_id(app_id)
-    if not application:
-        raise HTTPException(status_code=404, detail="Application not found")
-    if application.get("blocked"):
-        raise HTTPException(status_code=403, detail="Application blocked by admin")
+    if await run_db(is_access_token_revoked, payload.get("jti")):
+        raise HTTPException(status_code=401, detail="Token has been revoked")
 
-    if is_user_blocked_for_app(user["email"], app_id):
-        raise HTTPException(status_code=403, detail="User access blocked by admin")
+    user, denial = await run_db(authorize_app_user, email, app_id, scopes)
+    if denial:
+        status_code, detail = SDK_PROFILE_DENIALS[denial]
+        raise HTTPException(status_code=status_code, detail=detail)
 
-    filtered_user = filter_user_data_by_scopes(user, scopes)
-    return {
-        "user": filtered_user,
+    return FastJSONResponse({
+        "user": user,
         "app_id": app_id,
         "scopes": scopes
-    }
+    })
 
 # USER MANAGEMENT
-@app.get("/api/users", response_model=List[User])
-def get_all_users(current_user: dict = Depends(require_admin)):
+def _users_listing() -> List[UserListItem]:
     conn = get_db_connection()
     cursor = conn.cursor()
     cursor.execute("SELECT id, name, email, role, roll_no, branch, semester, status FROM users")
-    users = [dict(row) for row in cursor.fetchall()]
+    users = [user_list_item(row) for row in cursor.fetchall()]
     conn.close()
-    
-    return [{
-        "id": u["id"],
-        "name": u["name"],
-        "email": u["email"],
-        "role": u["role"],
-        "rollNo": u["roll_no"],
-        "branch": u["branch"],
-        "semester": u["semester"],
-        "status": u["status"]
-    } for u in users]
+    return users
+
+@app.get("/api/users", response_model=List[User])
+def get_all_users(request: Request, current_user: dict = Depends(require_admin)):
+    return listing_response(request, "users", ("users",), _users_listing)
 
 @app.put("/api/users/{user_id}/role")
-def update_user_role(user_id: int, role: str, current_user: dict = Depends(require_admin)):
+def update_user_role(user_id: int, role: str, request: Request, current_user: dict = Depends(require_admin)):
     if role not in ["student", "admin"]:
         raise HTTPException(status_code=400, detail="Invalid role")
     
     conn = get_db_connection()
     cursor = conn.cursor()
     cursor.execute("UPDATE users SET role = ? WHERE id = ?", (role, user_id))
+    cursor.execute("SELECT email FROM users WHERE id = ?", (user_id,))
+    user = cursor.fetchone()
+    version = bump_version(cursor, USER, user["email"]) if user else None
     conn.commit()
     conn.close()
+    if user:
+        publish_version(USER, user["email"], version)
+
+    record_audit_event("user.role_changed", current_user, "user", user_id, {"role": role}, request)
     
     return {"message": f"Role updated to {role}"}
 
 # APPLICATION MANAGEMENT
 @app.post("/api/applications")
-def create_application(app_data: ApplicationCreate, current_user: dict = Depends(require_admin)):
+def create_application(app_data: ApplicationCreate, request: Request, current_user: dict = Depends(require_admin)):
     app_id = str(uuid.uuid4())
     normalized_redirect = normalize_redirect_field(app_data.redirect_url)
     client_id_value = app_data.client_id or f"client-{uuid.uuid4().hex[:10]}"
@@ -832,6 +993,15 @@ def create_application(app_data: ApplicationCreate, current_user: dict = Depends
     ))
     conn.commit()
     conn.close()
+
+    record_audit_event(
+        "app.created",
+        current_user,
+        "application",
+        app_id,
+        {"name": app_data.name, "client_id": client_id_value},
+        request,
+    )
     
     return {
         "id": app_id,
@@ -843,35 +1013,42 @@ def create_application(app_data: ApplicationCreate, current_user: dict = Depends
         "message": "Application created successfully. Store the client secret securely."
     }
 
-@app.get("/api/applications", response_model=List[Application])
-def get_applications(current_user: dict = Depends(get_current_user)):
+def _applications_listing() -> List[ApplicationListItem]:
     conn = get_db_connection()
     cursor = conn.cursor()
     
-    cursor.execute("SELECT * FROM applications")
-    apps = [dict(row) for row in cursor.fetchall()]
-    
-    for app in apps:
-        app["blocked"] = bool(app.get("blocked", False))
-        app["redirect_url"] = serialize_redirect_entries(parse_redirect_entries(app.get("redirect_url")))
-        app["client_secret"] = None
+    cursor.execute("SELECT id, name, url, client_id, redirect_url, blocked FROM applications")
+    apps = []
+    for app in cursor.fetchall():
         cursor.execute("""
             SELECT user_email, blocked FROM user_app_access 
             WHERE app_id = ?
         """, (app["id"],))
         rows = cursor.fetchall()
-        app["authorized_users"] = [{
-            "email": row["user_email"],
-            "blocked": bool(row["blocked"])
-        } for row in rows]
-        app["authorized_emails"] = [row["user_email"] for row in rows]
+        apps.append({
+            "id": app["id"],
+            "name": app["name"],
+            "url": app["url"],
+            "client_id": app["client_id"],
+            "redirect_url": serialize_redirect_entries(parse_redirect_entries(app["redirect_url"])),
+            "blocked": bool(app["blocked"]),
+            "authorized_emails": [row["user_email"] for row in rows],
+            "authorized_users": [{
+                "email": row["user_email"],
+                "blocked": bool(row["blocked"])
+            } for row in rows],
+        })
     
     conn.close()
     
     return apps
 
+@app.get("/api/applications", response_model=List[Application])
+def get_applications(request: Request, current_user: dict = Depends(get_current_user)):
+    return listing_response(request, "applications", ("applications", "user_app_access"), _applications_listing)
+
 @app.put("/api/applications/{app_id}")
-def update_application(app_id: str, app_data: ApplicationCreate, current_user: dict = Depends(require_admin)):
+def update_application(app_id: str, app_data: ApplicationCreate, request: Request, current_user: dict = Depends(require_admin)):
     conn = get_db_connection()
     cursor = conn.cursor()
     normalized_redirect = normalize_redirect_field(app_data.redirect_url)
@@ -892,26 +1069,40 @@ def update_application(app_id: str, app_data: ApplicationCreate, current_user: d
         conn.close()
         raise HTTPException(status_code=404, detail="Application not found")
     
+    version = bump_version(cursor, APP, app_id)
     conn.commit()
     conn.close()
+    publish_version(APP, app_id, version)
+
+    record_audit_event(
+        "app.updated",
+        current_user,
+        "application",
+        app_id,
+        {"name": app_data.name, "url": app_data.url, "client_id": app_data.client_id, "redirect_url": normalized_redirect},
+        request,
+    )
     
     return {"message": "Application updated successfully"}
 
 @app.post("/api/applications/{app_id}/block")
-def set_application_block(app_id: str, payload: ApplicationBlockRequest, current_user: dict = Depends(require_admin)):
+def set_application_block(app_id: str, payload: ApplicationBlockRequest, request: Request, current_user: dict = Depends(require_admin)):
     conn = get_db_connection()
     cursor = conn.cursor()
     cursor.execute("UPDATE applications SET blocked = ? WHERE id = ?", (payload.blocked, app_id))
     if cursor.rowcount == 0:
         conn.close()
         raise HTTPException(status_code=404, detail="Application not found")
+    version = bump_version(cursor, APP, app_id)
     conn.commit()
     conn.close()
+    publish_version(APP, app_id, version)
     state = "blocked" if payload.blocked else "unblocked"
+    record_audit_event(f"app.{state}", current_user, "application", app_id, None, request)
     return {"message": f"Application {state}"}
 
 @app.post("/api/applications/{app_id}/client-secret", response_model=ClientSecretRotateResponse)
-def regenerate_client_secret(app_id: str, current_user: dict = Depends(require_admin)):
+def regenerate_client_secret(app_id: str, request: Request, current_user: dict = Depends(require_admin)):
     application = get_application_by_id(app_id)
     if not application:
         raise HTTPException(status_code=404, detail="Application not found")
@@ -924,6 +1115,9 @@ def regenerate_client_secret(app_id: str, current_user: dict = Depends(require_a
     cursor.execute("UPDATE applications SET client_secret = ? WHERE id = ?", (hashed_secret, app_id))
     conn.commit()
     conn.close()
+    forget_client_secret(application["client_id"])
+
+    record_audit_event("app.secret_rotated", current_user, "application", app_id, None, request)
 
     return {
         "app_id": app_id,
@@ -936,6 +1130,7 @@ def regenerate_client_secret(app_id: str, current_user: dict = Depends(require_a
 def set_application_user_block(
     app_id: str,
     payload: ApplicationUserBlockRequest,
+    request: Request,
     current_user: dict = Depends(require_admin)
 ):
     application = get_application_by_id(app_id)
@@ -967,13 +1162,16 @@ def set_application_user_block(
             INSERT INTO user_app_access (user_email, app_id, blocked)
             VALUES (?, ?, ?)
         """, (payload.email, app_id, payload.blocked))
+    version = bump_version(cursor, USER, payload.email)
     conn.commit()
     conn.close()
+    publish_version(USER, payload.email, version)
     state = "blocked" if payload.blocked else "unblocked"
+    record_audit_event(f"app.user_{state}", current_user, "application", app_id, {"email": payload.email}, request)
     return {"message": f"User {payload.email} {state} for this app"}
 
 @app.delete("/api/applications/{app_id}")
-def delete_application(app_id: str, current_user: dict = Depends(require_admin)):
+def delete_application(app_id: str, request: Request, current_user: dict = Depends(require_admin)):
     conn = get_db_connection()
     cursor = conn.cursor()
     
@@ -984,13 +1182,17 @@ def delete_application(app_id: str, current_user: dict = Depends(require_admin))
         conn.close()
         raise HTTPException(status_code=404, detail="Application not found")
     
+    version = bump_version(cursor, APP, app_id)
     conn.commit()
     conn.close()
+    publish_version(APP, app_id, version)
+
+    record_audit_event("app.deleted", current_user, "application", app_id, None, request)
     
     return {"message": "Application deleted successfully"}
 
 @app.post("/api/applications/{app_id}/api-keys")
-def generate_application_api_key(app_id: str, key_data: ApplicationAPIKeyCreate, current_user: dict = Depends(require_admin)):
+def generate_application_api_key(app_id: str, key_data: ApplicationAPIKeyCreate, request: Request, current_user: dict = Depends(require_admin)):
     app = get_application_by_id(app_id)
     if not app:
         raise HTTPException(status_code=404, detail="Application not found")
@@ -1016,6 +1218,8 @@ def generate_application_api_key(app_id: str, key_data: ApplicationAPIKeyCreate,
     key_id = cursor.lastrowid
     conn.close()
 
+    record_audit_event("app.api_key_created", current_user, "application", app_id, {"key_id": key_id, "name": key_name}, request)
+
     return {
         "id": key_id,
         "key_value": key_value,
@@ -1038,7 +1242,7 @@ def list_application_api_keys(app_id: str, current_user: dict = Depends(require_
     return [dict(row) for row in rows]
 
 @app.delete("/api/applications/{app_id}/api-keys/{key_id}")
-def revoke_application_api_key(app_id: str, key_id: int, current_user: dict = Depends(require_admin)):
+def revoke_application_api_key(app_id: str, key_id: int, request: Request, current_user: dict = Depends(require_admin)):
     conn = get_db_connection()
     cursor = conn.cursor()
     cursor.execute("""
@@ -1054,11 +1258,13 @@ def revoke_application_api_key(app_id: str, key_id: int, current_user: dict = De
     conn.commit()
     conn.close()
 
+    record_audit_event("app.api_key_revoked", current_user, "application", app_id, {"key_id": key_id}, request)
+
     return {"message": "Application API key revoked"}
 
 # USER-APP MAPPING
 @app.post("/api/map")
-def map_user_to_app(mapping: MapRequest, current_user: dict = Depends(require_admin)):
+def map_user_to_app(mapping: MapRequest, request: Request, current_user: dict = Depends(require_admin)):
     conn = get_db_connection()
     cursor = conn.cursor()
     
@@ -1088,11 +1294,13 @@ def map_user_to_app(mapping: MapRequest, current_user: dict = Depends(require_ad
     
     conn.commit()
     conn.close()
+
+    record_audit_event("app.user_mapped", current_user, "application", mapping.app_id, {"email": mapping.email}, request)
     
     return {"message": "User mapped to application successfully"}
 
 @app.post("/api/unmap")
-def unmap_user_from_app(mapping: MapRequest, current_user: dict = Depends(require_admin)):
+def unmap_user_from_app(mapping: MapRequest, request: Request, current_user: dict = Depends(require_admin)):
     conn = get_db_connection()
     cursor = conn.cursor()
     
@@ -1105,8 +1313,12 @@ def unmap_user_from_app(mapping: MapRequest, current_user: dict = Depends(requir
         conn.close()
         raise HTTPException(status_code=404, detail="Mapping not found")
     
+    version = bump_version(cursor, USER, mapping.email)
     conn.commit()
     conn.close()
+    publish_version(USER, mapping.email, version)
+
+    record_audit_event("app.user_unmapped", current_user, "application", mapping.app_id, {"email": mapping.email}, request)
     
     return {"message": "User access removed successfully"}
 
@@ -1153,15 +1365,16 @@ def remove_my_app(app_id: str, current_user: dict = Depends(get_current_user)):
         DELETE FROM user_app_access
         WHERE user_email = ? AND app_id = ?
     """, (current_user["email"], app_id))
+    version = bump_version(cursor, USER, current_user["email"])
     conn.commit()
     conn.close()
+    publish_version(USER, current_user["email"], version)
 
     log_app_removal(current_user["email"], current_user["name"], app_id, app["name"])
 
     return {"message": f"Removed access to {app['name']}"}
 
-@app.get("/api/admin/removals")
-def get_removal_logs(current_user: dict = Depends(require_admin)):
+def _removals_listing() -> List[dict]:
     conn = get_db_connection()
     conn.row_factory = sqlite3.Row
     cursor = conn.cursor()
@@ -1193,7 +1406,89 @@ def get_removal_logs(current_user: dict = Depends(require_admin)):
         logs.append(entry)
     return logs
 
-init_db()
+@app.get("/api/admin/removals")
+def get_removal_logs(request: Request, current_user: dict = Depends(require_admin)):
+    return listing_response(request, "removals", ("app_removal_logs",), _removals_listing)
+
+@app.get("/api/admin/sessions")
+def get_session_logs(
+    user_id: Optional[int] = None,
+    email: Optional[str] = None,
+    event: Optional[str] = None,
+    app_id: Optional[str] = None,
+    since: Optional[str] = None,
+    until: Optional[str] = None,
+    before_id: Optional[int] = None,
+    limit: int = 100,
+    current_user: dict = Depends(require_admin)
+):
+    if email and user_id is None:
+        user = get_user_by_email(email)
+        if not user:
+            return []
+        user_id = user["id"]
+    limit = max(1, min(limit, 1000))
+    return query_session_logs(
+        user_id=user_id,
+        event=event,
+        app_id=app_id,
+        since=since,
+        until=until,
+        before_id=before_id,
+        limit=limit,
+    )
+
+@app.get("/api/admin/audit")
+def get_audit_events(
+    action: Optional[str] = None,
+    actor_email: Optional[str] = None,
+    target_type: Optional[str] = None,
+    target_id: Optional[str] = None,
+    since: Optional[str] = None,
+    until: Optional[str] = None,
+    before_id: Optional[int] = None,
+    limit: int = 100,
+    current_user: dict = Depends(require_admin)
+):
+    limit = max(1, min(limit, 1000))
+    return query_audit_events(
+        action=action,
+        actor_email=actor_email,
+        target_type=target_type,
+        target_id=target_id,
+        since=since,
+        until=until,
+        before_id=before_id,
+        limit=limit,
+    )
+
+@app.get("/api/admin/audit/export")
+def export_audit_events(
+    action: Optional[str] = None,
+    actor_email: Optional[str] = None,
+    target_type: Optional[str] = None,
+    target_id: Optional[str] = None,
+    since: Optional[str] = None,
+    until: Optional[str] = None,
+    current_user: dict = Depends(require_admin)
+):
+    stream = export_audit_ndjson(
+        action=action,
+        actor_email=actor_email,
+        target_type=target_type,
+        target_id=target_id,
+        since=since,
+        until=until,
+    )
+    return StreamingResponse(
+        stream,
+        media_type="application/x-ndjson",
+        headers={"Content-Disposition": "attachment; filename=audit_events.ndjson"},
+    )
+
+@app.get("/api/admin/audit/stats")
+def get_audit_pipeline_stats(current_user: dict = Depends(require_admin)):
+    return audit_pipeline_stats()
 
 if __name__ == "__main__":
     import uvicorn
@@ -0,0 +1,125 @@
+"""
+Operational commands.
+
+    python -m backend.manage seed              # migrate, then create the demo users, apps and API keys
+    python -m backend.manage migrate           # apply pending schema migrations only
+    python -m backend.manage startup-profile   # where a worker's cold start goes
+    python -m backend.manage calibrate-hashing --target-ms 250
+
+With SSO_INIT_MODE=schema, workers never seed or hash at startup; run
+`seed` once per database instead.
+"""
+import argparse
+import os
+import re
+import subprocess
+import sys
+import time
+from typing import List, Optional, Tuple
+
+PACKAGE_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+IMPORTTIME_PATTERN = re.compile(r"^import time:\s+(\d+) \|\s+\d+ \| *(\S+)$")
+
+
+def seed() -> None:
+    from .database import init_db
+    init_db(seed=True)
+    print("[SSO] Database migrated and seeded")
+
+def migrate() -> None:
+    from .migrations import main as migrations_main
+    migrations_main([])
+
+def _import_profile() -> Tuple[List[tuple], float]:
+    env = dict(os.environ, SSO_INIT_MODE="skip", PYTHONPATH=PACKAGE_ROOT)
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import backend.main"],
+        capture_output=True, text=True, env=env, cwd=PACKAGE_ROOT,
+    )
+    if result.returncode != 0:
+        raise SystemExit(result.stderr)
+    # Self time grouped by top-level package; our own modules are listed one by one
+    groups = {}
+    for line in result.stderr.splitlines():
+        match = IMPORTTIME_PATTERN.match(line)
+        if not match:
+            continue
+        name = match.group(2)
+        group = name if name.startswith("backend") else name.split(".")[0]
+        groups[group] = groups.get(group, 0.0) + int(match.group(1)) / 1000
+    return sorted(groups.items(), key=lambda item: -item[1]), sum(groups.values())
+
+def startup_profile(top: int) -> None:
+    groups, total = _import_profile()
+    print(f"Importing backend.main: {total:.0f} ms")
+    for name, milliseconds in groups[:top]:
+        print(f"  {milliseconds:8.1f} ms  {name}")
+
+    from .migrations import schema_is_current
+    from .security import warm_password_hashing
+    started = time.perf_counter()
+    current = schema_is_current()
+    print(f"Schema version check: {(time.perf_counter() - started) * 1000:.1f} ms ({'current' if current else 'migrations pending'})")
+    started = time.perf_counter()
+    warm_password_hashing()
+    print(f"bcrypt backend detection (runs in the background at startup): {(time.perf_counter() - started) * 1000:.1f} ms")
+
+def _median_hash_ms(handler, samples: int) -> float:
+    timings = []
+    for _ in range(samples):
+        started = time.perf_counter()
+        handler.hash("calibration-password")
+        timings.append((time.perf_counter() - started) * 1000)
+    return sorted(timings)[len(timings) // 2]
+
+def calibrate_hashing(target_ms: float, samples: int) -> None:
+    from passlib.hash import bcrypt
+    from .config import PASSWORD_SCHEME, ARGON2_MEMORY_KIB, ARGON2_PARALLELISM
+
+    print(f"Target: {target_ms:.0f} ms per hash (median of {samples})")
+    chosen = None
+    for rounds in range(8, 17):
+        elapsed = _median_hash_ms(bcrypt.using(rounds=rounds), samples)
+        print(f"  bcrypt rounds={rounds:2d}: {elapsed:8.1f} ms")
+        if elapsed > target_ms:
+            break
+        chosen = rounds
+    chosen = chosen or 8
+    print(f"SSO_BCRYPT_ROUNDS={chosen}")
+
+    if PASSWORD_SCHEME == "argon2":
+        from passlib.hash import argon2
+        chosen = 1
+        for time_cost in range(1, 11):
+            handler = argon2.using(type="ID", memory_cost=ARGON2_MEMORY_KIB,
+                                   parallelism=ARGON2_PARALLELISM, time_cost=time_cost)
+            elapsed = _median_hash_ms(handler, samples)
+            print(f"  argon2id memory={ARGON2_MEMORY_KIB} KiB time_cost={time_cost:2d}: {elapsed:8.1f} ms")
+            if elapsed > target_ms:
+                break
+            chosen = time_cost
+        print(f"SSO_ARGON2_TIME_COST={chosen}")
+
+def main(argv: Optional[list] = None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    commands = parser.add_subparsers(dest="command", required=True)
+    commands.add_parser("seed", help="Apply migrations and create the default users, apps and API keys")
+    commands.add_parser("migrate", help="Apply pending schema migrations")
+    profile = commands.add_parser("startup-profile", help="Report import and startup timing")
+    profile.add_argument("--top", type=int, default=15, help="Slowest packages to list")
+    calibrate = commands.add_parser("calibrate-hashing", help="Pick password hashing cost for a target latency on this host")
+    calibrate.add_argument("--target-ms", type=float, default=250.0, help="Longest acceptable time for one hash")
+    calibrate.add_argument("--samples", type=int, default=3)
+    args = parser.parse_args(argv)
+
+    if args.command == "seed":
+        seed()
+    elif args.command == "migrate":
+        migrate()
+    elif args.command == "calibrate-hashing":
+        calibrate_hashing(args.target_ms, args.samples)
+    else:
+        startup_profile(args.top)
+
+if __name__ == "__main__":
+    main()
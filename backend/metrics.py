@@ -0,0 +1,219 @@
+import threading
+import time
+from bisect import bisect_left
+from typing import Dict, List, Tuple
+
+# Metrics are recorded into per-thread shards, so the hot path never takes a
+# lock or contends with other threads; shards are only summed at scrape time.
+
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+HASH_BUCKETS = (0.01, 0.025, 0.05, 0.1, 0.2, 0.3, 0.5, 0.75, 1.0, 2.0)
+DB_BUCKETS = (0.00005, 0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.05, 0.1, 0.5)
+
+_COUNTERS: Dict[str, str] = {}
+_HISTOGRAMS: Dict[str, Tuple[str, Tuple[float, ...]]] = {}
+_GAUGES: Dict[str, Tuple[str, object]] = {}
+
+_local = threading.local()
+_shards: List["_Shard"] = []
+_shards_lock = threading.Lock()
+
+
+class _Shard:
+    __slots__ = ("counters", "histograms")
+
+    def __init__(self):
+        self.counters: Dict[tuple, float] = {}
+        # key -> [bucket counts..., +Inf count, sum]
+        self.histograms: Dict[tuple, list] = {}
+
+
+def _shard() -> _Shard:
+    try:
+        return _local.shard
+    except AttributeError:
+        shard = _Shard()
+        with _shards_lock:
+            _shards.append(shard)
+        _local.shard = shard
+        return shard
+
+def register_counter(name: str, help_text: str) -> None:
+    _COUNTERS[name] = help_text
+
+def register_histogram(name: str, help_text: str, buckets: Tuple[float, ...] = LATENCY_BUCKETS) -> None:
+    _HISTOGRAMS[name] = (help_text, tuple(buckets))
+
+def register_gauge(name: str, help_text: str, callback) -> None:
+    """`callback()` returns a number or a {labels_tuple: number} mapping, evaluated at scrape time."""
+    _GAUGES[name] = (help_text, callback)
+
+def inc(name: str, labels: tuple = (), amount: float = 1) -> None:
+    counters = _shard().counters
+    key = (name, labels)
+    counters[key] = counters.get(key, 0) + amount
+
+def observe(name: str, value: float, labels: tuple = ()) -> None:
+    histograms = _shard().histograms
+    key = (name, labels)
+    slots = histograms.get(key)
+    buckets = _HISTOGRAMS[name][1]
+    if slots is None:
+        slots = [0] * (len(buckets) + 2)
+        histograms[key] = slots
+    slots[bisect_left(buckets, value)] += 1
+    slots[-1] += value
+
+def record_cache(cache: str, hit: bool) -> None:
+    inc("sso_cache_requests_total", (("cache", cache), ("result", "hit" if hit else "miss")))
+
+
+class timed:
+    """Context manager observing elapsed seconds into a histogram."""
+    __slots__ = ("name", "labels", "start")
+
+    def __init__(self, name: str, labels: tuple = ()):
+        self.name = name
+        self.labels = labels
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        observe(self.name, time.perf_counter() - self.start, self.labels)
+        return False
+
+
+def _escape_label(value) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+def _format_labels(labels: tuple, extra: tuple = ()) -> str:
+    pairs = labels + extra
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{key}="{_escape_label(value)}"' for key, value in pairs) + "}"
+
+def _format_value(value: float) -> str:
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return repr(value) if isinstance(value, float) else str(value)
+
+def _collect():
+    counters: Dict[tuple, float] = {}
+    histograms: Dict[tuple, list] = {}
+    with _shards_lock:
+        shards = list(_shards)
+    for shard in shards:
+        for key, value in list(shard.counters.items()):
+            counters[key] = counters.get(key, 0) + value
+        for key, slots in list(shard.histograms.items()):
+            merged = histograms.get(key)
+            if merged is None:
+                histograms[key] = list(slots)
+            else:
+                for i, value in enumerate(slots):
+                    merged[i] += value
+    return counters, histograms
+
+def snapshot_counter(name: str) -> Dict[tuple, float]:
+    counters, _ = _collect()
+    return {labels: value for (metric, labels), value in counters.items() if metric == name}
+
+def snapshot_histogram(name: str) -> Dict[tuple, list]:
+    _, histograms = _collect()
+    return {labels: slots for (metric, labels), slots in histograms.items() if metric == name}
+
+def render_prometheus() -> str:
+    counters, histograms = _collect()
+    lines: List[str] = []
+
+    for name, help_text in _COUNTERS.items():
+        lines.append(f"# HELP {name} {help_text}")
+        lines.append(f"# TYPE {name} counter")
+        for (metric, labels), value in sorted(counters.items()):
+            if metric == name:
+                lines.append(f"{name}{_format_labels(labels)} {_format_value(value)}")
+
+    for name, (help_text, buckets) in _HISTOGRAMS.items():
+        lines.append(f"# HELP {name} {help_text}")
+        lines.append(f"# TYPE {name} histogram")
+        for (metric, labels), slots in sorted(histograms.items()):
+            if metric != name:
+                continue
+            cumulative = 0
+            for bound, count in zip(buckets, slots):
+                cumulative += count
+                lines.append(f"{name}_bucket{_format_labels(labels, (('le', bound),))} {cumulative}")
+            cumulative += slots[len(buckets)]
+            lines.append(f"{name}_bucket{_format_labels(labels, (('le', '+Inf'),))} {cumulative}")
+            lines.append(f"{name}_sum{_format_labels(labels)} {_format_value(float(slots[-1]))}")
+            lines.append(f"{name}_count{_format_labels(labels)} {cumulative}")
+
+    for name, (help_text, callback) in _GAUGES.items():
+        lines.append(f"# HELP {name} {help_text}")
+        lines.append(f"# TYPE {name} gauge")
+        value = callback()
+        if isinstance(value, dict):
+            for labels, item in sorted(value.items()):
+                lines.append(f"{name}{_format_labels(labels)} {_format_value(item)}")
+        else:
+            lines.append(f"{name} {_format_value(value)}")
+
+    return "\n".join(lines) + "\n"
+
+
+class MetricsMiddleware:
+    """Pure ASGI middleware recording request counts and latency per route template."""
+
+    def __init__(self, app):
+        self.app = app
+        self._route_paths: Dict[object, str] = {}
+
+    def _route_label(self, scope) -> str:
+        endpoint = scope.get("endpoint")
+        if endpoint is None:
+            return "unmatched"
+        path = self._route_paths.get(endpoint)
+        if path is None:
+            for route in scope["app"].routes:
+                if getattr(route, "endpoint", None) is endpoint:
+                    path = route.path
+                    break
+            else:
+                path = "unmatched"
+            self._route_paths[endpoint] = path
+        return path
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        status_holder = [500]
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                status_holder[0] = message["status"]
+            await send(message)
+
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            elapsed = time.perf_counter() - start
+            route = self._route_label(scope)
+            method = scope["method"]
+            inc("sso_http_requests_total", (("method", method), ("route", route), ("status", status_holder[0])))
+            observe("sso_http_request_duration_seconds", elapsed, (("method", method), ("route", route)))
+
+
+register_counter("sso_http_requests_total", "HTTP requests by method, route template and status code.")
+register_histogram("sso_http_request_duration_seconds", "HTTP request latency by route template.", LATENCY_BUCKETS)
+register_histogram("sso_password_hash_seconds", "Time spent in password and client secret hashing and verification.", HASH_BUCKETS)
+register_histogram("sso_db_connect_seconds", "Time spent opening SQLite connections.", DB_BUCKETS)
+register_histogram("sso_db_query_seconds", "SQL statement execution time by statement kind and table.", DB_BUCKETS)
+register_counter("sso_cache_requests_total", "Cache lookups by cache name and result.")
+register_counter("sso_tokens_issued_total", "Tokens issued by token type.")
+register_counter("sso_rate_limited_total", "Requests refused with 429 by rate-limit rule.")
+register_counter("sso_password_rehash_total", "Password hashes upgraded on login, by new scheme.")
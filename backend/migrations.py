@@ -0,0 +1,454 @@
+"""
+Versioned schema migrations.
+
+Every migration runs once, in order, and is recorded in `schema_version`.
+On startup the current version is read with a single query; when it is up
+to date nothing else runs, so startup cost no longer grows with the schema's
+history.
+
+    python -m backend.migrations            # apply pending migrations
+    python -m backend.migrations --status
+
+Index builds use CREATE INDEX CONCURRENTLY on Postgres, and data backfills go
+through `backfill()`, which updates and commits one id range at a time so
+large tables are never locked for the whole migration.
+"""
+import argparse
+from typing import Callable, List, Optional
+from .config import MIGRATION_BATCH_SIZE
+from .database import DEMO_APPLICATIONS, get_db_connection, get_storage, init_lock
+from .storage import DatabaseError, POSTGRES_SCHEMA
+from .scopes import mask_sql
+from .sso_helpers import serialize_redirect_entries
+
+SQLITE_BASELINE = [
+    """
+    CREATE TABLE IF NOT EXISTS users (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        name TEXT NOT NULL,
+        email TEXT UNIQUE NOT NULL,
+        password_hash TEXT NOT NULL,
+        roll_no TEXT,
+        branch TEXT,
+        semester TEXT,
+        role TEXT DEFAULT 'student',
+        status TEXT DEFAULT 'active',
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS applications (
+        id TEXT PRIMARY KEY,
+        name TEXT NOT NULL,
+        url TEXT NOT NULL,
+        client_id TEXT,
+        client_secret TEXT,
+        redirect_url TEXT,
+        blocked BOOLEAN DEFAULT FALSE,
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS user_app_access (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        user_email TEXT NOT NULL,
+        app_id TEXT NOT NULL,
+        blocked BOOLEAN DEFAULT FALSE,
+        granted_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        FOREIGN KEY (app_id) REFERENCES applications(id)
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS refresh_tokens (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        token TEXT UNIQUE NOT NULL,
+        user_id INTEGER NOT NULL,
+        expires_at TIMESTAMP NOT NULL,
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        revoked BOOLEAN DEFAULT FALSE,
+        FOREIGN KEY (user_id) REFERENCES users(id)
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS api_keys (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        key_value TEXT UNIQUE NOT NULL,
+        user_id INTEGER NOT NULL,
+        name TEXT NOT NULL,
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        last_used TIMESTAMP,
+        revoked BOOLEAN DEFAULT FALSE,
+        app_id TEXT,
+        FOREIGN KEY (user_id) REFERENCES users(id)
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS session_logs (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        user_id INTEGER NOT NULL,
+        event TEXT,
+        app_id TEXT,
+        access_token_jti TEXT,
+        refresh_token_id INTEGER,
+        ip_address TEXT,
+        user_agent TEXT,
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        expires_at TIMESTAMP,
+        FOREIGN KEY (user_id) REFERENCES users(id)
+    )
+    """,
+    "CREATE INDEX IF NOT EXISTS idx_session_logs_user_id ON session_logs(user_id)",
+    "CREATE INDEX IF NOT EXISTS idx_session_logs_created_at ON session_logs(created_at)",
+    """
+    CREATE TABLE IF NOT EXISTS user_consents (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        user_id INTEGER NOT NULL,
+        app_id TEXT NOT NULL,
+        scopes TEXT NOT NULL,
+        granted_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        revoked BOOLEAN DEFAULT FALSE,
+        FOREIGN KEY (user_id) REFERENCES users(id),
+        FOREIGN KEY (app_id) REFERENCES applications(id)
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS app_removal_logs (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        user_email TEXT NOT NULL,
+        user_name TEXT,
+        app_id TEXT NOT NULL,
+        app_name TEXT,
+        removed_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS audit_events (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        action TEXT NOT NULL,
+        actor_id INTEGER,
+        actor_email TEXT,
+        target_type TEXT,
+        target_id TEXT,
+        details TEXT,
+        ip_address TEXT,
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    )
+    """,
+    "CREATE INDEX IF NOT EXISTS idx_audit_events_created_at ON audit_events(created_at)",
+    "CREATE INDEX IF NOT EXISTS idx_audit_events_action ON audit_events(action)",
+    """
+    CREATE TRIGGER IF NOT EXISTS audit_events_no_update
+    BEFORE UPDATE ON audit_events
+    BEGIN
+        SELECT RAISE(ABORT, 'audit_events is append-only');
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS audit_events_no_delete
+    BEFORE DELETE ON audit_events
+    BEGIN
+        SELECT RAISE(ABORT, 'audit_events is append-only');
+    END
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS pending_consents (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        token TEXT UNIQUE NOT NULL,
+        user_id INTEGER NOT NULL,
+        app_id TEXT NOT NULL,
+        redirect_uri TEXT NOT NULL,
+        scopes TEXT NOT NULL,
+        expires_at TIMESTAMP NOT NULL,
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        FOREIGN KEY (user_id) REFERENCES users(id),
+        FOREIGN KEY (app_id) REFERENCES applications(id)
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS authorization_codes (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        code TEXT UNIQUE NOT NULL,
+        user_id INTEGER NOT NULL,
+        app_id TEXT NOT NULL,
+        scopes TEXT,
+        redirect_uri TEXT,
+        expires_at TIMESTAMP NOT NULL,
+        used BOOLEAN DEFAULT FALSE,
+        used_at TIMESTAMP,
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        FOREIGN KEY (user_id) REFERENCES users(id),
+        FOREIGN KEY (app_id) REFERENCES applications(id)
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS revoked_tokens (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        jti TEXT UNIQUE NOT NULL,
+        user_id INTEGER,
+        expires_at TIMESTAMP NOT NULL,
+        revoked_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    )
+    """,
+    "CREATE INDEX IF NOT EXISTS idx_revoked_tokens_expires_at ON revoked_tokens(expires_at)",
+]
+
+# Columns that pre-versioned databases gained through ALTER TABLE
+LEGACY_COLUMNS = [
+    ("applications", "redirect_url", "TEXT"),
+    ("applications", "blocked", "BOOLEAN DEFAULT FALSE"),
+    ("user_app_access", "blocked", "BOOLEAN DEFAULT FALSE"),
+    ("api_keys", "app_id", "TEXT"),
+    ("session_logs", "event", "TEXT"),
+    ("session_logs", "app_id", "TEXT"),
+]
+
+
+class Migration:
+    def __init__(self, version: int, name: str, apply: Callable):
+        self.version = version
+        self.name = name
+        self.apply = apply
+
+
+# HELPERS
+def dialect() -> str:
+    return "postgres" if get_storage() is not None else "sqlite"
+
+def table_columns(conn, table: str) -> set:
+    if dialect() == "postgres":
+        rows = conn.execute("""
+            SELECT column_name FROM information_schema.columns
+            WHERE table_name = ?
+        """, (table,)).fetchall()
+        return {row[0] for row in rows}
+    return {row[1] for row in conn.execute(f"PRAGMA table_info({table})").fetchall()}
+
+def add_column(conn, table: str, column: str, definition: str) -> None:
+    if column not in table_columns(conn, table):
+        conn.execute(f"ALTER TABLE {table} ADD COLUMN {column} {definition}")
+
+def create_index(conn, name: str, table: str, columns: str, unique: bool = False) -> None:
+    kind = "UNIQUE INDEX" if unique else "INDEX"
+    if dialect() == "postgres":
+        # Built without blocking writes; CONCURRENTLY cannot run inside a transaction
+        conn.commit()
+        conn.execute_autocommit(f"CREATE {kind} CONCURRENTLY IF NOT EXISTS {name} ON {table}({columns})")
+    else:
+        conn.execute(f"CREATE {kind} IF NOT EXISTS {name} ON {table}({columns})")
+
+def backfill(conn, table: str, assignments: str, where: str = "1 = 1",
+             params: tuple = (), batch_size: int = MIGRATION_BATCH_SIZE) -> int:
+    """UPDATE `table` in id ranges of `batch_size` rows, committing after each range."""
+    updated = 0
+    last_id = 0
+    while True:
+        upper = conn.execute(f"""
+            SELECT MAX(id) FROM (
+                SELECT id FROM {table} WHERE id > ? ORDER BY id LIMIT ?
+            ) AS batch
+        """, (last_id, batch_size)).fetchone()[0]
+        if upper is None:
+            return updated
+        cursor = conn.execute(f"""
+            UPDATE {table} SET {assignments}
+            WHERE ({where}) AND id > ? AND id <= ?
+        """, (*params, last_id, upper))
+        updated += cursor.rowcount
+        conn.commit()
+        last_id = upper
+
+
+# MIGRATIONS
+def _baseline(conn) -> None:
+    for statement in (POSTGRES_SCHEMA if dialect() == "postgres" else SQLITE_BASELINE):
+        conn.execute(statement)
+
+def _legacy_columns(conn) -> None:
+    for table, column, definition in LEGACY_COLUMNS:
+        add_column(conn, table, column, definition)
+
+def _user_app_access_lookup_index(conn) -> None:
+    create_index(conn, "idx_user_app_access_email_app", "user_app_access", "user_email, app_id")
+
+# Tables whose writes bump a counter in table_versions; listings built from
+# them are revalidated against the counters (see listings.py)
+VERSIONED_TABLES = ("users", "applications", "user_app_access", "app_removal_logs")
+
+def _table_versions(conn) -> None:
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS table_versions (
+            table_name TEXT PRIMARY KEY,
+            version INTEGER NOT NULL DEFAULT 0
+        )
+    """)
+    postgres = dialect() == "postgres"
+    if postgres:
+        conn.execute("""
+            CREATE OR REPLACE FUNCTION bump_table_version() RETURNS trigger AS $$
+            BEGIN
+                UPDATE table_versions SET version = version + 1 WHERE table_name = TG_TABLE_NAME;
+                RETURN NULL;
+            END
+            $$ LANGUAGE plpgsql
+        """)
+    for table in VERSIONED_TABLES:
+        conn.execute("INSERT OR IGNORE INTO table_versions (table_name, version) VALUES (?, 0)", (table,))
+        if postgres:
+            _postgres_version_trigger(conn, table)
+            continue
+        for event in ("INSERT", "UPDATE", "DELETE"):
+            conn.execute(f"""
+                CREATE TRIGGER IF NOT EXISTS {table}_version_{event.lower()}
+                AFTER {event} ON {table}
+                BEGIN
+                    UPDATE table_versions SET version = version + 1 WHERE table_name = '{table}';
+                END
+            """)
+
+def _postgres_version_trigger(conn, table: str) -> None:
+    # Once per statement, not per row: a bulk write touches the shared
+    # table_versions row a single time instead of queueing on it row by row
+    conn.execute(f"DROP TRIGGER IF EXISTS {table}_version ON {table}")
+    conn.execute(f"""
+        CREATE TRIGGER {table}_version AFTER INSERT OR UPDATE OR DELETE ON {table}
+        FOR EACH STATEMENT EXECUTE FUNCTION bump_table_version()
+    """)
+
+def _statement_table_versions(conn) -> None:
+    # Replaces the per-row triggers migration 4 created on Postgres; SQLite
+    # only has row triggers and serializes writers anyway
+    if dialect() != "postgres":
+        return
+    for table in VERSIONED_TABLES:
+        _postgres_version_trigger(conn, table)
+
+def _consent_scope_masks(conn) -> None:
+    # Registry scopes as a bitmask next to the text (see scopes.py)
+    add_column(conn, "user_consents", "scope_mask", "BIGINT")
+    conn.commit()
+    backfill(conn, "user_consents", f"scope_mask = {mask_sql()}", where="scope_mask IS NULL")
+    create_index(conn, "idx_user_consents_user_app", "user_consents", "user_id, app_id")
+
+def _authorization_code_flow(conn) -> None:
+    # response_type=code with PKCE on /login (carried through the consent page)
+    for column, definition in (
+        ("response_type", "TEXT DEFAULT 'token'"),
+        ("state", "TEXT"),
+        ("code_challenge", "TEXT"),
+        ("code_challenge_method", "TEXT"),
+    ):
+        add_column(conn, "pending_consents", column, definition)
+    add_column(conn, "authorization_codes", "code_challenge", "TEXT")
+    add_column(conn, "authorization_codes", "code_challenge_method", "TEXT")
+
+def _client_refresh_tokens(conn) -> None:
+    # Refresh tokens issued by /oauth/token are bound to one application and
+    # scope set; first-party tokens from /api/auth/login keep both NULL
+    add_column(conn, "refresh_tokens", "app_id", "TEXT")
+    add_column(conn, "refresh_tokens", "scopes", "TEXT")
+
+def _version_changes(conn) -> None:
+    # Changes that make cached users and authorizations stale (see versions.py); ids must never be reused
+    id_column = "SERIAL PRIMARY KEY" if dialect() == "postgres" else "INTEGER PRIMARY KEY AUTOINCREMENT"
+    conn.execute(f"""
+        CREATE TABLE IF NOT EXISTS version_changes (
+            id {id_column},
+            kind TEXT NOT NULL,
+            subject TEXT NOT NULL,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    """)
+    create_index(conn, "idx_version_changes_created_at", "version_changes", "created_at")
+
+def _demo_redirect_urls(conn) -> None:
+    # Formerly the update_db.py and set_ports.py scripts; only touches the
+    # demo applications, and only where they were already seeded
+    for _, _, client_id, redirect_urls in DEMO_APPLICATIONS:
+        conn.execute(
+            "UPDATE applications SET redirect_url = ? WHERE client_id = ?",
+            (serialize_redirect_entries(list(redirect_urls)), client_id),
+        )
+
+MIGRATIONS = [
+    Migration(1, "baseline schema", _baseline),
+    Migration(2, "columns added to pre-versioned databases", _legacy_columns),
+    Migration(3, "user_app_access lookup index", _user_app_access_lookup_index),
+    Migration(4, "per-table change counters", _table_versions),
+    Migration(5, "user_consents scope bitmask", _consent_scope_masks),
+    Migration(6, "authorization code flow with PKCE", _authorization_code_flow),
+    Migration(7, "application-bound refresh tokens", _client_refresh_tokens),
+    Migration(8, "user and application version log", _version_changes),
+    Migration(9, "statement-level change counter triggers", _statement_table_versions),
+    Migration(10, "demo application redirect URLs", _demo_redirect_urls),
+]
+LATEST_VERSION = MIGRATIONS[-1].version
+
+
+# RUNNER
+def current_version(conn) -> int:
+    try:
+        return conn.execute("SELECT MAX(version) FROM schema_version").fetchone()[0] or 0
+    except DatabaseError:
+        conn.rollback()
+        return 0
+
+def schema_is_current() -> bool:
+    """The startup fast path: one read of the schema version."""
+    conn = get_db_connection()
+    try:
+        return current_version(conn) >= LATEST_VERSION
+    finally:
+        conn.close()
+
+def migrate(conn) -> List[Migration]:
+    """Apply pending migrations on `conn`; the caller holds init_lock()."""
+    version = current_version(conn)
+    if version >= LATEST_VERSION:
+        return []
+
+    if dialect() == "sqlite":
+        # WAL lets worker processes keep reading while another one writes
+        conn.execute("PRAGMA journal_mode = WAL")
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS schema_version (
+            version INTEGER PRIMARY KEY,
+            name TEXT NOT NULL,
+            applied_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    """)
+    applied = []
+    for migration in MIGRATIONS:
+        if migration.version <= version:
+            continue
+        migration.apply(conn)
+        conn.execute(
+            "INSERT INTO schema_version (version, name) VALUES (?, ?)",
+            (migration.version, migration.name),
+        )
+        conn.commit()
+        print(f"[SSO] Applied migration {migration.version}: {migration.name}")
+        applied.append(migration)
+    return applied
+
+def main(argv: Optional[list] = None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--status", action="store_true", help="Print the current and latest version only")
+    args = parser.parse_args(argv)
+
+    if args.status:
+        conn = get_db_connection()
+        version = current_version(conn)
+        conn.close()
+        print(f"schema version {version}, latest {LATEST_VERSION}")
+        return
+    with init_lock():
+        conn = get_db_connection()
+        try:
+            applied = migrate(conn)
+        finally:
+            conn.close()
+    if not applied:
+        print(f"[SSO] Schema is up to date (version {LATEST_VERSION})")
+
+if __name__ == "__main__":
+    main()
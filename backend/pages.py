@@ -0,0 +1,132 @@
+import hashlib
+import json
+import os
+import re
+from functools import lru_cache
+from html import escape
+from typing import Dict, List, Optional, Tuple
+from fastapi import Request, Response
+from .config import FRONTEND_REGISTER_URL, CONSENT_PAGE_CACHE_SIZE, STATIC_MAX_AGE_SECONDS
+from .compression import ENCODINGS, accepted_encodings, encode
+
+# Pages are read and split into literal parts once at import; rendering is a
+# single join. Constant responses (the login page, /static files) are encoded
+# up front in every supported Content-Encoding and revalidated by ETag.
+
+TEMPLATE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "templates")
+STATIC_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "static")
+PLACEHOLDER_PATTERN = re.compile(r"\{\{\s*(\w+)\s*\}\}")
+
+
+class Template:
+    """`{{ name }}` placeholders; parts alternate literal text and placeholder names."""
+
+    def __init__(self, parts: List[str]):
+        self.parts = parts
+
+    @classmethod
+    def load(cls, filename: str) -> "Template":
+        with open(os.path.join(TEMPLATE_DIR, filename), encoding="utf-8") as handle:
+            return cls(PLACEHOLDER_PATTERN.split(handle.read()))
+
+    def partial(self, **values: str) -> "Template":
+        """Fill some placeholders now, merging them into the surrounding literals."""
+        parts = [self.parts[0]]
+        for index in range(1, len(self.parts), 2):
+            name, literal = self.parts[index], self.parts[index + 1]
+            if name in values:
+                parts[-1] += values[name] + literal
+            else:
+                parts += [name, literal]
+        return Template(parts)
+
+    def render(self, **values: str) -> str:
+        parts = self.parts
+        return "".join(values[part] if index % 2 else part for index, part in enumerate(parts))
+
+
+class Asset:
+    """A constant response body with its compressed variants and ETag."""
+
+    def __init__(self, body: bytes, media_type: str, cache_control: str, etag: Optional[str] = None,
+                 gzip_level: int = 9, brotli_quality: int = 11):
+        self.body = body
+        self.media_type = media_type
+        self.cache_control = cache_control
+        self.version = hashlib.sha256(body).hexdigest()[:16]
+        self.etag = etag or f'"{self.version}"'
+        self.encoded: Dict[str, bytes] = {}
+        for encoding in ENCODINGS:
+            data = encode(body, encoding, gzip_level=gzip_level, brotli_quality=brotli_quality)
+            if len(data) < len(body):
+                self.encoded[encoding] = data
+
+    def negotiate(self, accept_encoding: str) -> Tuple[bytes, Optional[str]]:
+        accepted = accepted_encodings(accept_encoding)
+        for encoding, data in self.encoded.items():
+            if encoding in accepted:
+                return data, encoding
+        return self.body, None
+
+
+def not_modified(request: Request, etag: str, cache_control: str) -> Optional[Response]:
+    """A 304 when the client already holds `etag`, else None."""
+    if etag in request.headers.get("if-none-match", ""):
+        return Response(status_code=304, headers={"ETag": etag, "Cache-Control": cache_control, "Vary": "Accept-Encoding"})
+    return None
+
+def asset_response(request: Request, asset: Asset) -> Response:
+    cached = not_modified(request, asset.etag, asset.cache_control)
+    if cached is not None:
+        return cached
+    headers = {"ETag": asset.etag, "Cache-Control": asset.cache_control, "Vary": "Accept-Encoding"}
+    body, encoding = asset.negotiate(request.headers.get("accept-encoding", ""))
+    if encoding:
+        headers["Content-Encoding"] = encoding
+    return Response(content=body, media_type=asset.media_type, headers=headers)
+
+# STATIC ASSETS
+STATIC_MEDIA_TYPES = {".css": "text/css; charset=utf-8", ".js": "application/javascript; charset=utf-8"}
+
+def _load_static_assets() -> Dict[str, Asset]:
+    assets = {}
+    for name in sorted(os.listdir(STATIC_DIR)):
+        media_type = STATIC_MEDIA_TYPES.get(os.path.splitext(name)[1])
+        if media_type is None:
+            continue
+        with open(os.path.join(STATIC_DIR, name), "rb") as handle:
+            body = handle.read()
+        assets[name] = Asset(body, media_type, f"public, max-age={STATIC_MAX_AGE_SECONDS}, immutable")
+    return assets
+
+static_assets = _load_static_assets()
+
+def static_url(name: str) -> str:
+    """Fingerprinted URL, so a changed file is fetched again despite the long max-age."""
+    return f"/static/{name}?v={static_assets[name].version}"
+
+# PAGES
+def _script_string(value: str) -> str:
+    return json.dumps(value).replace("</", "<\\/")
+
+login_page = Asset(
+    Template.load("login.html").render(
+        stylesheet=static_url("sso.css"),
+        register_url=_script_string(FRONTEND_REGISTER_URL),
+    ).encode("utf-8"),
+    "text/html; charset=utf-8",
+    "no-cache",
+)
+
+_consent_template = Template.load("consent.html").partial(stylesheet=static_url("sso.css"))
+
+def _scope_label(scope: str) -> str:
+    return escape(scope.replace("_", " ").replace("-", " ").title())
+
+@lru_cache(maxsize=CONSENT_PAGE_CACHE_SIZE)
+def _consent_page_for(app_name: str, scopes: Tuple[str, ...]) -> Template:
+    scope_items = "".join(f"<li>{_scope_label(scope)}</li>" for scope in scopes)
+    return _consent_template.partial(app_name=escape(app_name), scope_items=scope_items)
+
+def render_consent_page(consent_token: str, app_name: str, scopes: List[str]) -> str:
+    return _consent_page_for(app_name, tuple(scopes)).render(consent_token=escape(consent_token))
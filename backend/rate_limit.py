@@ -0,0 +1,163 @@
+import math
+import sqlite3
+import threading
+import time
+from typing import Optional, Tuple
+from fastapi import Header, HTTPException, Request
+from .config import (
+    RATE_LIMIT_ENABLED,
+    RATE_LIMIT_STORE,
+    RATE_LIMIT_DB_PATH,
+    RATE_LIMIT_SHARDS,
+    RATE_LIMIT_IDLE_SECONDS,
+    RATE_LIMITS
+)
+from .async_database import run_db
+from .metrics import inc
+
+# Token buckets: each key holds up to `capacity` tokens and regains `rate`
+# tokens per second; a request spends one token or is refused with the time
+# until the next token arrives.
+
+def _refill(tokens: float, updated_at: float, now: float, capacity: float, rate: float) -> float:
+    return min(capacity, tokens + (now - updated_at) * rate)
+
+
+class MemoryBucketStore:
+    """Per-process buckets, sharded so concurrent requests rarely share a lock."""
+    blocking = False
+
+    def __init__(self, shards: int = RATE_LIMIT_SHARDS, max_keys_per_shard: int = 50000):
+        self.shards = [({}, threading.Lock()) for _ in range(shards)]
+        self.max_keys_per_shard = max_keys_per_shard
+
+    def take(self, key: str, capacity: float, rate: float) -> float:
+        """Spend a token for `key`; returns 0 when allowed, else seconds until one is available."""
+        buckets, lock = self.shards[hash(key) % len(self.shards)]
+        now = time.monotonic()
+        with lock:
+            bucket = buckets.get(key)
+            tokens = _refill(bucket[0], bucket[1], now, capacity, rate) if bucket else capacity
+            wait = 0.0 if tokens >= 1 else (1 - tokens) / rate
+            if not wait:
+                tokens -= 1
+            # (tokens, updated_at, moment the bucket is full again)
+            buckets[key] = (tokens, now, now + (capacity - tokens) / rate)
+            if len(buckets) > self.max_keys_per_shard:
+                self._evict_full(buckets, now)
+            return wait
+
+    @staticmethod
+    def _evict_full(buckets: dict, now: float) -> None:
+        # A bucket that has refilled completely is the same as no bucket
+        for key in [key for key, bucket in buckets.items() if bucket[2] <= now]:
+            del buckets[key]
+
+
+class SQLiteBucketStore:
+    """Buckets shared by every worker process on the host through a small SQLite file."""
+    blocking = True
+
+    def __init__(self, path: str):
+        self.path = path
+        self._local = threading.local()
+        self._next_prune = 0.0
+
+    def _connection(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=1.0, isolation_level=None)
+            conn.execute("PRAGMA journal_mode = WAL")
+            conn.execute("PRAGMA synchronous = OFF")
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS rate_limit_buckets (
+                    key TEXT PRIMARY KEY,
+                    tokens REAL NOT NULL,
+                    updated_at REAL NOT NULL
+                )
+            """)
+            self._local.conn = conn
+        return conn
+
+    def take(self, key: str, capacity: float, rate: float) -> float:
+        conn = self._connection()
+        now = time.time()
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+        except sqlite3.OperationalError:
+            # Never fail a request because the limiter itself is contended
+            return 0.0
+        try:
+            row = conn.execute(
+                "SELECT tokens, updated_at FROM rate_limit_buckets WHERE key = ?", (key,)
+            ).fetchone()
+            tokens = _refill(row[0], row[1], now, capacity, rate) if row else capacity
+            wait = 0.0 if tokens >= 1 else (1 - tokens) / rate
+            if not wait:
+                tokens -= 1
+            conn.execute("""
+                INSERT INTO rate_limit_buckets (key, tokens, updated_at) VALUES (?, ?, ?)
+                ON CONFLICT(key) DO UPDATE SET tokens = excluded.tokens, updated_at = excluded.updated_at
+            """, (key, tokens, now))
+            conn.execute("COMMIT")
+        except sqlite3.Error:
+            conn.execute("ROLLBACK")
+            return 0.0
+        if now >= self._next_prune:
+            self._next_prune = now + RATE_LIMIT_IDLE_SECONDS
+            self.prune(conn, now - RATE_LIMIT_IDLE_SECONDS)
+        return wait
+
+    @staticmethod
+    def prune(conn: sqlite3.Connection, before: float) -> None:
+        # Long-idle buckets have refilled; dropping them changes nothing
+        try:
+            conn.execute("DELETE FROM rate_limit_buckets WHERE updated_at < ?", (before,))
+        except sqlite3.OperationalError:
+            pass
+
+
+def _create_store():
+    if RATE_LIMIT_STORE == "sqlite":
+        return SQLiteBucketStore(RATE_LIMIT_DB_PATH)
+    return MemoryBucketStore()
+
+store = _create_store()
+
+def check(rule: str, value: Optional[str]) -> float:
+    """Seconds to wait before `value` may be used again under `rule` (0 when allowed)."""
+    if not RATE_LIMIT_ENABLED or not value:
+        return 0.0
+    capacity, rate = RATE_LIMITS[rule]
+    return store.take(f"{rule}:{value}", capacity, rate)
+
+def _raise_limited(rule: str, wait: float) -> None:
+    inc("sso_rate_limited_total", (("rule", rule),))
+    raise HTTPException(
+        status_code=429,
+        detail="Too many requests",
+        headers={"Retry-After": str(max(1, math.ceil(wait)))},
+    )
+
+async def enforce(*limits: Tuple[str, Optional[str]]) -> None:
+    """Spend one token per (rule, value) pair and raise 429 with Retry-After on the first empty bucket."""
+    for rule, value in limits:
+        if store.blocking:
+            wait = await run_db(check, rule, value)
+        else:
+            wait = check(rule, value)
+        if wait:
+            _raise_limited(rule, wait)
+
+def client_ip(request: Request) -> Optional[str]:
+    return request.client.host if request.client else None
+
+# Route dependencies, resolved before the body handler runs
+async def limit_login_ip(request: Request) -> None:
+    await enforce(("login_ip", client_ip(request)))
+
+async def limit_token_ip(request: Request) -> None:
+    await enforce(("token_ip", client_ip(request)))
+
+async def limit_api_key(x_api_key: str = Header(None)) -> None:
+    await enforce(("api_key", x_api_key))
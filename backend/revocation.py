@@ -0,0 +1,151 @@
+import hashlib
+import math
+import threading
+import time
+from datetime import datetime
+from typing import Optional
+from .config import (
+    REVOCATION_FILTER_CAPACITY,
+    REVOCATION_FILTER_ERROR_RATE,
+    REVOCATION_SYNC_SECONDS,
+    REVOCATION_PRUNE_SECONDS
+)
+from .database import get_db_connection
+from .storage import OperationalError
+from .metrics import record_cache
+
+
+class BloomFilter:
+    """Fixed-size Bloom filter over string keys (k probes via double hashing)."""
+
+    def __init__(self, capacity: int, error_rate: float):
+        capacity = max(capacity, 1)
+        self.capacity = capacity
+        size = int(-capacity * math.log(error_rate) / (math.log(2) ** 2))
+        self.size = max(size, 8)
+        self.hash_count = max(int(round(self.size / capacity * math.log(2))), 1)
+        self.bits = bytearray((self.size + 7) // 8)
+        self.count = 0
+
+    def _positions(self, key: str):
+        digest = hashlib.blake2b(key.encode("utf-8"), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], "little")
+        h2 = int.from_bytes(digest[8:], "little") | 1
+        for i in range(self.hash_count):
+            yield (h1 + i * h2) % self.size
+
+    def add(self, key: str) -> None:
+        for pos in self._positions(key):
+            self.bits[pos >> 3] |= 1 << (pos & 7)
+        self.count += 1
+
+    def __contains__(self, key: str) -> bool:
+        bits = self.bits
+        for pos in self._positions(key):
+            if not bits[pos >> 3] & (1 << (pos & 7)):
+                return False
+        return True
+
+
+# In-process filter state. Other workers' revocations are picked up by
+# incremental sync at most REVOCATION_SYNC_SECONDS later.
+_filter = BloomFilter(REVOCATION_FILTER_CAPACITY, REVOCATION_FILTER_ERROR_RATE)
+_last_synced_id = 0
+_next_sync_at = 0.0
+_next_prune_at = 0.0
+_lock = threading.Lock()
+
+def _exp_to_iso(exp) -> str:
+    if isinstance(exp, datetime):
+        return exp.isoformat()
+    return datetime.utcfromtimestamp(int(exp)).isoformat()
+
+def _rebuild_filter(cursor) -> None:
+    global _filter, _last_synced_id
+    cursor.execute("SELECT COUNT(*) FROM revoked_tokens")
+    total = cursor.fetchone()[0]
+    # Twice the live revocations, so the next rebuild is another `total` revocations away
+    rebuilt = BloomFilter(max(REVOCATION_FILTER_CAPACITY, total * 2), REVOCATION_FILTER_ERROR_RATE)
+    last_id = 0
+    cursor.execute("SELECT id, jti FROM revoked_tokens ORDER BY id")
+    for row in cursor.fetchall():
+        rebuilt.add(row["jti"])
+        last_id = row["id"]
+    _filter = rebuilt
+    _last_synced_id = last_id
+
+def prune_revoked_tokens() -> int:
+    """Delete revocations whose token has expired anyway and rebuild the filter."""
+    now = datetime.utcnow().isoformat()
+    conn = get_db_connection()
+    cursor = conn.cursor()
+    cursor.execute("DELETE FROM revoked_tokens WHERE expires_at < ?", (now,))
+    removed = cursor.rowcount
+    conn.commit()
+    with _lock:
+        _rebuild_filter(cursor)
+    conn.close()
+    return removed
+
+def sync_revocation_filter(force: bool = False) -> None:
+    global _last_synced_id, _next_sync_at, _next_prune_at
+    now = time.monotonic()
+    if not force and now < _next_sync_at:
+        return
+
+    _next_sync_at = now + REVOCATION_SYNC_SECONDS
+    # A busy database only delays the sync; the current filter stays in use
+    try:
+        if now >= _next_prune_at:
+            _next_prune_at = now + REVOCATION_PRUNE_SECONDS
+            prune_revoked_tokens()
+            return
+
+        conn = get_db_connection()
+        cursor = conn.cursor()
+        with _lock:
+            cursor.execute("""
+                SELECT id, jti FROM revoked_tokens
+                WHERE id > ?
+                ORDER BY id
+            """, (_last_synced_id,))
+            for row in cursor.fetchall():
+                _filter.add(row["jti"])
+                _last_synced_id = row["id"]
+            if _filter.count > _filter.capacity:
+                _rebuild_filter(cursor)
+        conn.close()
+    except OperationalError as exc:
+        print(f"[SSO] Revocation filter sync skipped: {exc}")
+
+def revoke_access_token(jti: str, exp, user_id: Optional[int] = None) -> None:
+    """Persist a revocation for `jti` until the token's own expiry (`exp` claim)."""
+    if not jti:
+        return
+    conn = get_db_connection()
+    cursor = conn.cursor()
+    cursor.execute("""
+        INSERT OR IGNORE INTO revoked_tokens (jti, user_id, expires_at)
+        VALUES (?, ?, ?)
+    """, (jti, user_id, _exp_to_iso(exp)))
+    conn.commit()
+    conn.close()
+    with _lock:
+        _filter.add(jti)
+
+def is_access_token_revoked(jti: Optional[str]) -> bool:
+    if not jti:
+        return False
+    sync_revocation_filter()
+    if jti not in _filter:
+        record_cache("revocation_filter", True)
+        return False
+    record_cache("revocation_filter", False)
+
+    # Possible hit (or false positive): confirm against the persisted list
+    conn = get_db_connection()
+    cursor = conn.cursor()
+    cursor.execute("SELECT 1 FROM revoked_tokens WHERE jti = ?", (jti,))
+    revoked = cursor.fetchone() is not None
+    conn.close()
+    return revoked
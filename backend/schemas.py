@@ -1,5 +1,5 @@
 from pydantic import BaseModel, EmailStr, Field
-from typing import List, Optional, Tuple
+from typing import List, Optional, Tuple, TypedDict
 
 # PYDANTIC MODELS
 class UserRegister(BaseModel):
@@ -65,11 +65,16 @@ class ClientSecretRotateResponse(BaseModel):
     client_secret: str
 
 class OAuthTokenRequest(BaseModel):
+    # authorization_code, refresh_token or client_credentials
     grant_type: str = "authorization_code"
-    code: str
+    code: Optional[str] = None
     redirect_uri: Optional[str] = None
     client_id: str
-    client_secret: str
+    # Public clients send code_verifier (PKCE) instead of a secret
+    client_secret: Optional[str] = None
+    code_verifier: Optional[str] = None
+    refresh_token: Optional[str] = None
+    scope: Optional[str] = None
 
 class ApplicationBlockRequest(BaseModel):
     blocked: bool
@@ -101,4 +106,70 @@ class ProfileUpdate(BaseModel):
 
 class UserInDB(User):
     """Schema used for retrieving user data from the DB, includes the hash."""
-    password_hash: str
\ No newline at end of file
+    password_hash: str
+
+# RESPONSE SHAPES
+# Plain dicts matching the models above, built straight from database rows
+# for routes that skip response-model validation (see serialization.py)
+class TokenUser(TypedDict):
+    id: int
+    name: str
+    email: str
+    role: str
+    rollNo: Optional[str]
+    branch: Optional[str]
+    semester: Optional[str]
+
+class TokenResponse(TypedDict):
+    access_token: str
+    refresh_token: str
+    token_type: str
+    expires_in: int
+    user: TokenUser
+
+class UserListItem(TypedDict):
+    id: int
+    name: str
+    email: str
+    role: str
+    rollNo: Optional[str]
+    branch: Optional[str]
+    semester: Optional[str]
+    status: str
+
+class AuthorizedUserItem(TypedDict):
+    email: str
+    blocked: bool
+
+class ApplicationListItem(TypedDict):
+    id: str
+    name: str
+    url: str
+    client_id: Optional[str]
+    redirect_url: Optional[str]
+    blocked: bool
+    authorized_emails: List[str]
+    authorized_users: List[AuthorizedUserItem]
+
+def token_user(row) -> TokenUser:
+    return {
+        "id": row["id"],
+        "name": row["name"],
+        "email": row["email"],
+        "role": row["role"],
+        "rollNo": row["roll_no"],
+        "branch": row["branch"],
+        "semester": row["semester"],
+    }
+
+def user_list_item(row) -> UserListItem:
+    return {
+        "id": row["id"],
+        "name": row["name"],
+        "email": row["email"],
+        "role": row["role"],
+        "rollNo": row["roll_no"],
+        "branch": row["branch"],
+        "semester": row["semester"],
+        "status": row["status"],
+    }
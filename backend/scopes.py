@@ -0,0 +1,96 @@
+from functools import lru_cache
+from typing import Iterable, Optional, Tuple
+from .config import SCOPE_FIELD_MAP
+
+# Every scope in SCOPE_FIELD_MAP owns one bit, in the map's order. The bits are
+# stored in user_consents.scope_mask, so new scopes must be appended to the
+# map and existing ones never reordered or removed. Scopes outside the
+# registry (or past bit 62) are kept as `extra` names and checked against the
+# stored text instead.
+MAX_SCOPE_BITS = 63
+SCOPE_REGISTRY: Tuple[str, ...] = tuple(SCOPE_FIELD_MAP)[:MAX_SCOPE_BITS]
+SCOPE_BITS = {name: 1 << index for index, name in enumerate(SCOPE_REGISTRY)}
+
+
+class ScopeSet:
+    """An interned, normalized set of scopes: a bitmask over the registry plus any unknown names."""
+    __slots__ = ("names", "mask", "extra", "text")
+
+    def __init__(self, names: Tuple[str, ...]):
+        self.names = names
+        self.mask = 0
+        extra = []
+        for name in names:
+            bit = SCOPE_BITS.get(name)
+            if bit is None:
+                extra.append(name)
+            else:
+                self.mask |= bit
+        self.extra = tuple(extra)
+        # Same form normalize_scopes() and save_user_consent() have always stored
+        self.text = " ".join(names)
+
+    def issubset(self, other: "ScopeSet") -> bool:
+        return self.mask & other.mask == self.mask and set(self.extra).issubset(other.extra)
+
+    def union(self, other: "ScopeSet") -> "ScopeSet":
+        return scope_set(self.names + other.names)
+
+    def __bool__(self) -> bool:
+        return bool(self.names)
+
+    def __repr__(self) -> str:
+        return f"ScopeSet({self.text!r})"
+
+
+@lru_cache(maxsize=4096)
+def _intern(names: Tuple[str, ...]) -> ScopeSet:
+    return ScopeSet(names)
+
+def scope_set(scopes: Optional[Iterable[str]]) -> ScopeSet:
+    """Normalize (lowercase, dedupe, sort) and intern; equal sets share one object."""
+    if not scopes:
+        return _intern(())
+    if isinstance(scopes, str):
+        scopes = scopes.replace(",", " ").split()
+    return _intern(tuple(sorted({scope.strip().lower() for scope in scopes if scope and scope.strip()})))
+
+# PROJECTION PLANS
+# Claim names that differ from their users column
+CLAIM_NAMES = {"roll_no": "rollNo"}
+
+
+class ProjectionPlan:
+    """The user columns a scope set releases, in payload order, and their claim names."""
+    __slots__ = ("columns", "keys")
+
+    def __init__(self, scopes: ScopeSet):
+        fields = ["id"]
+        for name in scopes.names:
+            fields.extend(SCOPE_FIELD_MAP.get(name, ()))
+        # Always include name if nothing else (basic identifier)
+        fields.append("name")
+        self.columns = tuple(dict.fromkeys(fields))
+        self.keys = tuple(CLAIM_NAMES.get(column, column) for column in self.columns)
+
+    def project_row(self, row) -> dict:
+        """Payload from any row addressable by column name."""
+        return {key: row[column] for key, column in zip(self.keys, self.columns)}
+
+
+@lru_cache(maxsize=1024)
+def projection_plan(scopes: ScopeSet) -> ProjectionPlan:
+    return ProjectionPlan(scopes)
+
+def mask_sql(column: str = "scopes") -> str:
+    """SQL expression computing scope_mask from a stored scope string.
+
+    Appending a scope to the registry needs a migration that re-runs
+    backfill(conn, "user_consents", f"scope_mask = {mask_sql()}").
+    """
+    padded = f"(' ' || LOWER(REPLACE({column}, ',', ' ')) || ' ')"
+    terms = []
+    for name, bit in SCOPE_BITS.items():
+        pattern = name.replace("\\", "\\\\").replace("_", "\\_").replace("%", "\\%")
+        terms.append(f"(CASE WHEN {padded} LIKE '% {pattern} %' ESCAPE '\\' THEN {bit} ELSE 0 END)")
+    return " + ".join(terms) or "0"
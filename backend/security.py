@@ -1,63 +1,183 @@
 from fastapi import HTTPException, Depends, Header
+import base64
+import hashlib
+import hmac
+import importlib.util
+import re
 import secrets
-from typing import Optional, List
+from typing import Optional, List, Tuple
 import sqlite3
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from datetime import datetime, timedelta
 from passlib.context import CryptContext
 from jose import JWTError, jwt
 import uuid
-import os
+import threading
+import time
+from contextlib import contextmanager
 from .config import (
     SECRET_KEY,
     ALGORITHM,
     ACCESS_TOKEN_EXPIRE_MINUTES,
     CLIENT_SECRET_BYTES,
-    SCOPE_FIELD_MAP
+    CLIENT_AUTH_CACHE_SECONDS,
+    CLIENT_AUTH_CACHE_SIZE,
+    HASH_POOL_SIZE,
+    PASSWORD_SCHEME,
+    BCRYPT_ROUNDS,
+    CLIENT_SECRET_BCRYPT_ROUNDS,
+    ARGON2_MEMORY_KIB,
+    ARGON2_TIME_COST,
+    ARGON2_PARALLELISM
 )
-from .database import get_db_connection
+from .database import get_db_connection, load_authorization_context
+from .scopes import scope_set, projection_plan
+from .revocation import is_access_token_revoked
+from .metrics import timed, inc
+from .auth_cache import (
+    TTLCache,
+    cached_token_claims,
+    remember_token_claims,
+    cached_user,
+    remember_user,
+    cached_authorization,
+    remember_authorization
+)
+from .versions import USER, APP, current_version
+from .async_database import run_db, run_hash
 
 
 # The security object definitions
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
-client_secret_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+def _build_password_context() -> CryptContext:
+    # Hashes at any other cost (or bcrypt hashes once argon2 is the default)
+    # report needs_update and are re-hashed on the user's next login
+    policy = {
+        "bcrypt__rounds": BCRYPT_ROUNDS,
+        "bcrypt__min_rounds": BCRYPT_ROUNDS,
+        "bcrypt__max_rounds": BCRYPT_ROUNDS,
+    }
+    if PASSWORD_SCHEME != "argon2":
+        return CryptContext(schemes=["bcrypt"], deprecated="auto", **policy)
+    # passlib imports the backend lazily; fail at startup rather than on the first login
+    if importlib.util.find_spec("argon2") is None:
+        raise RuntimeError("SSO_PASSWORD_SCHEME=argon2 needs the optional dependency: pip install argon2-cffi")
+    return CryptContext(
+        schemes=["argon2", "bcrypt"],
+        deprecated="auto",
+        argon2__type="ID",
+        argon2__memory_cost=ARGON2_MEMORY_KIB,
+        argon2__time_cost=ARGON2_TIME_COST,
+        argon2__parallelism=ARGON2_PARALLELISM,
+        **policy,
+    )
+
+pwd_context = _build_password_context()
+client_secret_context = CryptContext(schemes=["bcrypt"], deprecated="auto", bcrypt__rounds=CLIENT_SECRET_BCRYPT_ROUNDS)
 security = HTTPBearer()
 JWT_DECODE_OPTIONS = {"verify_aud": False}
 
+# Number of bcrypt operations currently running, reported by the readiness probe
+_hash_inflight = 0
+_hash_inflight_lock = threading.Lock()
+
+@contextmanager
+def _hashing(op: str, kind: str):
+    global _hash_inflight
+    with _hash_inflight_lock:
+        _hash_inflight += 1
+    try:
+        with timed("sso_password_hash_seconds", (("op", op), ("kind", kind))):
+            yield
+    finally:
+        with _hash_inflight_lock:
+            _hash_inflight -= 1
+
+def hashing_pool_usage() -> dict:
+    return {
+        "in_flight": _hash_inflight,
+        "capacity": HASH_POOL_SIZE,
+        "saturation": round(_hash_inflight / HASH_POOL_SIZE, 3),
+    }
+
 # PASSWORD AND SECRET MANAGEMENT
 def generate_client_secret_value() -> str:
     # token_urlsafe roughly adds 4/3 characters per byte; trim for readability
     return secrets.token_urlsafe(CLIENT_SECRET_BYTES)[:64]
 
 def hash_client_secret_value(secret: str) -> str:
-    return client_secret_context.hash(secret)
+    with _hashing("hash", "client_secret"):
+        return client_secret_context.hash(secret)
 
 def verify_client_secret_value(secret: str, hashed: Optional[str]) -> bool:
     if not secret or not hashed:
         return False
     try:
-        return client_secret_context.verify(secret, hashed)
+        with _hashing("verify", "client_secret"):
+            return client_secret_context.verify(secret, hashed)
     except ValueError:
         return False
+
+# client_id -> (sha256 of a verified secret, the stored hash it matched).
+# Rotation changes the stored hash, so old entries stop matching in every
+# worker without any explicit invalidation.
+_client_auth_cache = TTLCache("client_auth", CLIENT_AUTH_CACHE_SIZE)
+
+async def authenticate_client_secret(application: dict, secret: Optional[str]) -> bool:
+    """Check an application's client secret, skipping bcrypt for a recently verified one."""
+    hashed = application.get("client_secret")
+    if not secret or not hashed:
+        return False
+    client_id = application["client_id"]
+    digest = hashlib.sha256(secret.encode("utf-8")).digest()
+    entry = _client_auth_cache.get(client_id)
+    if entry is not None and entry[1] == hashed and hmac.compare_digest(entry[0], digest):
+        return True
+
+    if not await run_hash(verify_client_secret_value, secret, hashed):
+        return False
+    _client_auth_cache.set(client_id, (digest, hashed), time.time() + CLIENT_AUTH_CACHE_SECONDS)
+    return True
+
+def forget_client_secret(client_id: str) -> None:
+    _client_auth_cache.pop(client_id)
+
+def hash_password(plain_password: str) -> str:
+    with _hashing("hash", "password"):
+        return pwd_context.hash(plain_password)
     
 def verify_password(plain_password, hashed_password):
-    return pwd_context.verify(plain_password, hashed_password)
+    with _hashing("verify", "password"):
+        return pwd_context.verify(plain_password, hashed_password)
+
+def verify_password_and_update(plain_password: str, hashed_password: str) -> Tuple[bool, Optional[str]]:
+    """Verify; when the stored hash uses an outdated scheme or cost, also return its replacement."""
+    with _hashing("verify", "password"):
+        valid, new_hash = pwd_context.verify_and_update(plain_password, hashed_password)
+    if new_hash:
+        inc("sso_password_rehash_total", (("scheme", pwd_context.identify(new_hash)),))
+    return valid, new_hash
+
+def warm_password_hashing() -> None:
+    """Load and self-test passlib's hashing backends now instead of on the first login."""
+    pwd_context.handler().get_backend()
+    pwd_context.handler("bcrypt").get_backend()
+    client_secret_context.handler("bcrypt").get_backend()
 
 # JWT TOKEN MANAGEMENT
 def filter_user_data_by_scopes(user_row: sqlite3.Row, scopes: List[str]) -> dict:
-    allowed_scopes = set(scopes)
-    payload = {"id": user_row["id"]}
+    return projection_plan(scope_set(scopes)).project_row(user_row)
 
-    for scope in allowed_scopes:
-        fields = SCOPE_FIELD_MAP.get(scope, [])
-        for field in fields:
-            payload[field if field != "roll_no" else "rollNo"] = user_row[field]
+# PKCE (RFC 7636)
+PKCE_METHODS = ("S256", "plain")
+PKCE_VERIFIER_PATTERN = re.compile(r"^[A-Za-z0-9\-._~]{43,128}$")
 
-    # Always include name if nothing else (basic identifier)
-    if "name" not in payload:
-        payload["name"] = user_row["name"]
-
-    return payload
+def verify_code_verifier(verifier: Optional[str], challenge: str, method: Optional[str]) -> bool:
+    if not verifier or not PKCE_VERIFIER_PATTERN.match(verifier):
+        return False
+    if (method or "plain") == "S256":
+        digest = hashlib.sha256(verifier.encode("ascii")).digest()
+        verifier = base64.urlsafe_b64encode(digest).rstrip(b"=").decode("ascii")
+    return secrets.compare_digest(verifier, challenge)
 
 def build_user_claims(name: str, email: str, roll_no: Optional[str], branch: Optional[str], semester: Optional[str]):
     return {
@@ -68,7 +188,8 @@ def build_user_claims(name: str, email: str, roll_no: Optional[str], branch: Opt
         "semester": semester
     }
 
-def create_access_token(data: dict, expires_delta: timedelta = None):
+def create_access_token(data: dict, expires_delta: timedelta = None, token_type: str = "access"):
+    # token_type "client" marks client_credentials tokens, which have no user behind them
     to_encode = data.copy()
     if expires_delta:
         expire = datetime.utcnow() + expires_delta
@@ -78,39 +199,114 @@ def create_access_token(data: dict, expires_delta: timedelta = None):
     to_encode.update({
         "exp": expire,
         "jti": str(uuid.uuid4()),
-        "type": "access"
+        "type": token_type
     })
     encoded_jwt = jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
+    inc("sso_tokens_issued_total", (("type", token_type),))
     return encoded_jwt, to_encode["jti"]
 
 # FASTAPI DEPENDENCIES
-def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(security)):
-    token = credentials.credentials
-    try:
+def decode_token_claims(token: str) -> dict:
+    """Verified JWT claims, reused from the per-worker cache for a recently seen token."""
+    payload = cached_token_claims(token)
+    if payload is None:
         payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM], options=JWT_DECODE_OPTIONS)
-        email: str = payload.get("sub")
-        token_type: str = payload.get("type")
-        
-        if email is None or token_type != "access":
-            raise HTTPException(status_code=401, detail="Invalid authentication credentials")
-    except JWTError:
-        raise HTTPException(status_code=401, detail="Invalid authentication credentials")
-    
+        remember_token_claims(token, payload)
+    return payload
+
+def load_current_user_row(email: str) -> Optional[dict]:
+    """The user's row, from the cache while their version is unchanged."""
+    version = current_version(USER, email)
+    user = cached_user(email, version)
+    if user is not None:
+        return user
+
     conn = get_db_connection()
     cursor = conn.cursor()
     cursor.execute("SELECT * FROM users WHERE email = ?", (email,))
     user = cursor.fetchone()
     conn.close()
     
+    if user is None:
+        return None
+    user = dict(user)
+    # Request handlers never need the hash; logins read it fresh (see verify_login_password)
+    user.pop("password_hash", None)
+    # Stored with the version read before the query, so a concurrent change still invalidates it
+    remember_user(user, version)
+    return user
+
+# Why an app-scoped token's user may not be served, in the order they are checked
+DENIED_USER_NOT_FOUND = "user_not_found"
+DENIED_NO_CONSENT = "consent_missing"
+DENIED_APP_NOT_FOUND = "app_not_found"
+DENIED_APP_BLOCKED = "app_blocked"
+DENIED_USER_BLOCKED = "user_blocked"
+
+def authorize_app_user(email: str, app_id: str, scopes: List[str]) -> Tuple[Optional[dict], Optional[str]]:
+    """(scoped user payload, None) when the user may still use `app_id` with `scopes`, else (None, denial).
+
+    All checks come from one authorization-context query, which selects only
+    the user columns the scopes release. A passing outcome is cached with the
+    user and application versions read before the query and reused while
+    both are unchanged.
+    """
+    requested = scope_set(scopes)
+    versions = (current_version(USER, email), current_version(APP, app_id))
+    user = cached_authorization(email, app_id, requested, versions)
+    if user is not None:
+        return user, None
+
+    plan = projection_plan(requested)
+    context = load_authorization_context(
+        email=email, app_id=app_id, scopes=list(requested.names), user_columns=plan.columns
+    )
+    if context.user is None:
+        return None, DENIED_USER_NOT_FOUND
+    # has_consent is None when the application is missing; that reads as no consent, as it always has
+    if not context.has_consent:
+        return None, DENIED_NO_CONSENT
+    if context.application is None:
+        return None, DENIED_APP_NOT_FOUND
+    if context.application["blocked"]:
+        return None, DENIED_APP_BLOCKED
+    if context.access_blocked:
+        return None, DENIED_USER_BLOCKED
+    user = plan.project_row(context.user)
+    remember_authorization(email, app_id, requested, user, versions)
+    return user, None
+
+def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(security)):
+    try:
+        payload = decode_token_claims(credentials.credentials)
+    except JWTError:
+        raise HTTPException(status_code=401, detail="Invalid authentication credentials")
+
+    email: str = payload.get("sub")
+    token_type: str = payload.get("type")
+    if email is None or token_type != "access":
+        raise HTTPException(status_code=401, detail="Invalid authentication credentials")
+
+    if is_access_token_revoked(payload.get("jti")):
+        raise HTTPException(status_code=401, detail="Token has been revoked")
+    
+    user = load_current_user_row(email)
     if user is None:
         raise HTTPException(status_code=401, detail="User not found")
     
-    return dict(user)
+    return user
 
 def verify_api_key(x_api_key: str = Header(None)):
     if not x_api_key:
         raise HTTPException(status_code=401, detail="API key required")
-    
+    return load_api_key_user(x_api_key)
+
+async def verify_api_key_async(x_api_key: str = Header(None)):
+    if not x_api_key:
+        raise HTTPException(status_code=401, detail="API key required")
+    return await run_db(load_api_key_user, x_api_key)
+
+def load_api_key_user(x_api_key: str) -> dict:
     conn = get_db_connection()
     cursor = conn.cursor()
     cursor.execute("""
@@ -0,0 +1,26 @@
+import json
+from fastapi.responses import JSONResponse
+from .config import JSON_ENCODER
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+if JSON_ENCODER == "orjson" and orjson is None:
+    raise RuntimeError("SSO_JSON_ENCODER=orjson requires the orjson package")
+
+# Hot routes build their bodies as the TypedDict shapes in schemas.py, which
+# already match the response models, and return FastJSONResponse directly:
+# FastAPI's response-model validation and jsonable_encoder pass are skipped
+# and the body goes straight to the configured encoder.
+
+def dumps(content) -> bytes:
+    if JSON_ENCODER == "orjson":
+        return orjson.dumps(content)
+    return json.dumps(content, ensure_ascii=False, allow_nan=False, separators=(",", ":")).encode("utf-8")
+
+
+class FastJSONResponse(JSONResponse):
+    def render(self, content) -> bytes:
+        return dumps(content)
@@ -0,0 +1,46 @@
+"""
+Multi-worker launcher.
+
+    python -m backend.serve                      # one worker per CPU core on :8000
+    python -m backend.serve --workers 4 --port 9000 --no-seed
+
+The schema and demo data are set up once here, under the init lock, before
+any worker starts; workers then import main.py with SSO_INIT_MODE=skip.
+Authorization codes, pending consents and revocations already live in the
+database, so every worker (or host, with SSO_DB_BACKEND=postgres) sees the
+same state.
+"""
+import argparse
+import os
+from typing import Optional
+from .config import WORKERS, INIT_MODE
+from .database import init_db
+
+
+def worker_count(requested: int) -> int:
+    if requested > 0:
+        return requested
+    return os.cpu_count() or 1
+
+def main(argv: Optional[list] = None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="0.0.0.0")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--workers", type=int, default=WORKERS, help="Worker processes (default: one per CPU core)")
+    parser.add_argument("--no-seed", action="store_true", help="Create the schema but not the demo users and apps")
+    args = parser.parse_args(argv)
+
+    if INIT_MODE != "skip":
+        init_db(seed=INIT_MODE == "full" and not args.no_seed)
+    os.environ["SSO_INIT_MODE"] = "skip"
+
+    import uvicorn
+    workers = worker_count(args.workers)
+    if workers > 1:
+        # Per-process buckets would multiply every limit by the worker count
+        os.environ.setdefault("SSO_RATE_LIMIT_STORE", "sqlite")
+    print(f"[SSO] Starting {workers} worker(s) on {args.host}:{args.port}")
+    uvicorn.run("backend.main:app", host=args.host, port=args.port, workers=workers)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,92 @@
+from datetime import datetime, timedelta
+from typing import List, Optional
+from fastapi import Request
+from .batch_writer import BatchWriter
+from .config import ACCESS_TOKEN_EXPIRE_MINUTES, SESSION_LOG_BATCH_SIZE, SESSION_LOG_QUEUE_SIZE
+from .database import get_db_connection
+
+session_writer = BatchWriter(
+    "session_logs",
+    """
+        INSERT INTO session_logs
+            (user_id, event, app_id, access_token_jti, refresh_token_id,
+             ip_address, user_agent, created_at, expires_at)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+    """,
+    max_batch=SESSION_LOG_BATCH_SIZE,
+    max_queue=SESSION_LOG_QUEUE_SIZE,
+)
+
+def record_session_event(
+    event: str,
+    user_id: int,
+    request: Optional[Request] = None,
+    jti: Optional[str] = None,
+    refresh_token_id: Optional[int] = None,
+    app_id: Optional[str] = None,
+) -> None:
+    """Queue a session event; the row is written in the background."""
+    now = datetime.utcnow()
+    ip_address = request.client.host if request is not None and request.client else None
+    user_agent = request.headers.get("user-agent") if request is not None else None
+    expires_at = (now + timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)).isoformat(sep=" ", timespec="seconds") if jti else None
+    session_writer.submit((
+        user_id,
+        event,
+        app_id,
+        jti,
+        refresh_token_id,
+        ip_address,
+        user_agent,
+        now.isoformat(sep=" ", timespec="seconds"),
+        expires_at,
+    ))
+
+def query_session_logs(
+    user_id: Optional[int] = None,
+    event: Optional[str] = None,
+    app_id: Optional[str] = None,
+    since: Optional[str] = None,
+    until: Optional[str] = None,
+    before_id: Optional[int] = None,
+    limit: int = 100,
+) -> List[dict]:
+    """Newest-first page of session events; pass the last id as `before_id` for the next page."""
+    clauses = []
+    params: list = []
+    if user_id is not None:
+        clauses.append("s.user_id = ?")
+        params.append(user_id)
+    if event:
+        clauses.append("s.event = ?")
+        params.append(event)
+    if app_id:
+        clauses.append("s.app_id = ?")
+        params.append(app_id)
+    if since:
+        clauses.append("s.created_at >= ?")
+        params.append(since)
+    if until:
+        clauses.append("s.created_at < ?")
+        params.append(until)
+    if before_id is not None:
+        clauses.append("s.id < ?")
+        params.append(before_id)
+    where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+    params.append(limit)
+
+    conn = get_db_connection()
+    cursor = conn.cursor()
+    cursor.execute(f"""
+        SELECT s.id, s.user_id, u.email AS user_email, s.event, s.app_id,
+               s.access_token_jti, s.refresh_token_id, s.ip_address, s.user_agent,
+               s.created_at, s.expires_at
+        FROM session_logs s
+        LEFT JOIN users u ON u.id = s.user_id
+        {where}
+        ORDER BY s.id DESC
+        LIMIT ?
+    """, params)
+    rows = [dict(row) for row in cursor.fetchall()]
+    conn.close()
+    return rows
@@ -1,4 +1,3 @@
-from html import escape
 from urllib.parse import urlparse, urlunparse, parse_qsl, urlencode
 import json
 import re
@@ -122,43 +121,3 @@ def get_allowed_redirects_for_app(application: dict) -> List[str]:
     if not redirects and application.get("url"):
         redirects.append(application["url"])
     return redirects
-
-def build_consent_page(consent_token: str, app_name: str, scopes: List[str]) -> str:
-    scope_items = "".join(
-        f"<li class='flex items-center gap-2 text-gray-700'><span class='w-2 h-2 bg-indigo-500 rounded-full'></span>{scope.replace('_', ' ').replace('-', ' ').title()}</li>"
-        for scope in scopes
-    )
-    safe_token = escape(consent_token)
-    return f"""
-    <!DOCTYPE html>
-    <html lang="en">
-    <head>
-        <meta charset="UTF-8">
-        <title>Authorize Access</title>
-        <script src="https://cdn.tailwindcss.com"></script>
-    </head>
-    <body class="bg-slate-100 min-h-screen flex items-center justify-center">
-        <div class="bg-white rounded-2xl shadow-xl p-10 max-w-lg w-full">
-            <h1 class="text-2xl font-bold text-gray-900 mb-2">Authorize {app_name}</h1>
-            <p class="text-gray-600 mb-4">
-                This application is requesting access to the following information from your SSO profile:
-            </p>
-            <ul class="space-y-2 mb-6">
-                {scope_items}
-            </ul>
-            <p class="text-sm text-gray-500 mb-6">
-                You can manage granted permissions later from your dashboard. Grant access?
-            </p>
-            <form method="POST" action="/consent/decision" class="flex flex-col gap-3">
-                <input type="hidden" name="consent_token" value="{safe_token}" />
-                <button type="submit" name="decision" value="approve" class="w-full bg-indigo-600 hover:bg-indigo-700 text-white py-3 rounded-lg font-semibold transition">
-                    Allow Access
-                </button>
-                <button name="decision" value="deny" class="w-full bg-gray-200 hover:bg-gray-300 text-gray-800 py-3 rounded-lg font-semibold transition" type="submit">
-                    Deny
-                </button>
-            </form>
-        </div>
-    </body>
-    </html>
-    """
\ No newline at end of file
@@ -0,0 +1,105 @@
+import threading
+import time
+from datetime import datetime, timedelta
+from typing import Dict, Optional
+from .config import ACCESS_TOKEN_EXPIRE_MINUTES, VERSION_SYNC_SECONDS, VERSION_PRUNE_SECONDS
+from .database import get_db_connection
+from .storage import OperationalError
+
+# A user's (by email) or application's (by id) version is the id of its
+# latest row in version_changes, so versions only ever grow. Every change
+# that can fail an authorization check (role, profile, blocks, access
+# removal, app block or deletion) records one. Per-worker caches are stamped
+# with the versions they were filled under (see auth_cache.py), so an entry
+# is served only while nothing affecting it has changed since.
+USER = "user"
+APP = "app"
+
+# In-process copy of the latest version per (kind, subject). Other workers'
+# changes are picked up by incremental sync at most VERSION_SYNC_SECONDS later.
+_versions: Dict[tuple, int] = {}
+_last_synced_id = 0
+_next_sync_at = 0.0
+_next_prune_at = 0.0
+_lock = threading.Lock()
+
+def _apply(kind: str, subject: str, version: int) -> None:
+    key = (kind, subject)
+    if version > _versions.get(key, 0):
+        _versions[key] = version
+
+def _rebuild(cursor, pruned_through: int = 0) -> None:
+    global _versions, _last_synced_id
+    cursor.execute("SELECT kind, subject, MAX(id) AS version FROM version_changes GROUP BY kind, subject")
+    rebuilt = {(row["kind"], row["subject"]): row["version"] for row in cursor.fetchall()}
+    # Ids are never reused, so the sync mark only moves forward even when every row was pruned
+    _last_synced_id = max(_last_synced_id, pruned_through, *rebuilt.values())
+    # Versions this worker already applied stay unless their rows were pruned;
+    # dropping one would make caches filled before that change look current
+    for key, version in _versions.items():
+        if version > pruned_through and version > rebuilt.get(key, 0):
+            rebuilt[key] = version
+    _versions = rebuilt
+
+def prune_version_changes() -> int:
+    """Delete changes older than the access token lifetime, which every cache entry is younger than, and rebuild the table."""
+    cutoff = (datetime.utcnow() - timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)).isoformat(sep=" ", timespec="seconds")
+    conn = get_db_connection()
+    cursor = conn.cursor()
+    cursor.execute("SELECT MAX(id) AS pruned_through FROM version_changes WHERE created_at < ?", (cutoff,))
+    pruned_through = cursor.fetchone()["pruned_through"] or 0
+    cursor.execute("DELETE FROM version_changes WHERE id <= ?", (pruned_through,))
+    removed = cursor.rowcount
+    conn.commit()
+    with _lock:
+        _rebuild(cursor, pruned_through)
+    conn.close()
+    return removed
+
+def sync_versions(force: bool = False) -> None:
+    global _last_synced_id, _next_sync_at, _next_prune_at
+    now = time.monotonic()
+    if not force and now < _next_sync_at:
+        return
+
+    _next_sync_at = now + VERSION_SYNC_SECONDS
+    # A busy database only delays the sync; tokens are checked against the current table
+    try:
+        if now >= _next_prune_at:
+            _next_prune_at = now + VERSION_PRUNE_SECONDS
+            prune_version_changes()
+            return
+
+        conn = get_db_connection()
+        cursor = conn.cursor()
+        with _lock:
+            cursor.execute("""
+                SELECT id, kind, subject FROM version_changes
+                WHERE id > ?
+                ORDER BY id
+            """, (_last_synced_id,))
+            for row in cursor.fetchall():
+                _apply(row["kind"], row["subject"], row["id"])
+                _last_synced_id = row["id"]
+        conn.close()
+    except OperationalError as exc:
+        print(f"[SSO] Version table sync skipped: {exc}")
+
+def bump_version(cursor, kind: str, subject: str) -> int:
+    """Record a change to `subject` inside the caller's transaction and return its version.
+
+    Pass the version to publish_version once the transaction has committed.
+    Publishing earlier would let a concurrent reader cache the still-committed
+    old row under the new version, where it would look current.
+    """
+    cursor.execute("INSERT INTO version_changes (kind, subject) VALUES (?, ?)", (kind, str(subject)))
+    return cursor.lastrowid
+
+def publish_version(kind: str, subject: str, version: int) -> None:
+    """Make a committed change visible to this worker at once; caches filled earlier go stale."""
+    with _lock:
+        _apply(kind, str(subject), version)
+
+def current_version(kind: str, subject: Optional[str]) -> int:
+    sync_versions()
+    return _versions.get((kind, subject), 0)
@@ -0,0 +1,128 @@
+"""
+Shared fixtures. The backend reads its configuration at import time, so the
+environment is pointed at a throwaway database (and cheap bcrypt rounds)
+before anything from `backend` is imported.
+
+    python -m pytest -q tests
+"""
+import os
+import re
+import sys
+import tempfile
+import uuid
+from urllib.parse import parse_qs, urlparse
+
+_WORKDIR = tempfile.mkdtemp(prefix="sso_tests_")
+os.environ["SSO_DB_PATH"] = os.path.join(_WORKDIR, "sso_test.db")
+os.environ["SSO_RATE_LIMIT_DB_PATH"] = os.path.join(_WORKDIR, "rate_limit.db")
+os.environ.setdefault("SECRET_KEY", "test-secret-key")
+os.environ["SSO_BCRYPT_ROUNDS"] = "4"
+os.environ["SSO_CLIENT_SECRET_BCRYPT_ROUNDS"] = "4"
+os.environ["SSO_INIT_MODE"] = "full"
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pytest
+from fastapi.testclient import TestClient
+
+from backend import database, rate_limit
+from backend.main import app
+
+ADMIN_EMAIL = "admin@example.com"
+ADMIN_PASSWORD = "admin123"
+STUDENT_PASSWORD = "student-pass-123"
+CONSENT_TOKEN_PATTERN = re.compile(r'name="consent_token" value="([^"]+)"')
+
+
+@pytest.fixture(scope="session")
+def client():
+    with TestClient(app) as test_client:
+        yield test_client
+
+
+@pytest.fixture(autouse=True)
+def fresh_rate_limits(monkeypatch):
+    # Every test starts with full buckets
+    monkeypatch.setattr(rate_limit, "store", rate_limit.MemoryBucketStore())
+
+
+@pytest.fixture
+def bench_db(tmp_path, monkeypatch):
+    """A small synthetic database; returns seed_database's credentials."""
+    from backend.benchmarks.seed import seed_database
+    # seed_database repoints database.DB_FILE_PATH; monkeypatch puts it back
+    monkeypatch.setattr(database, "DB_FILE_PATH", database.DB_FILE_PATH)
+    return seed_database(str(tmp_path / "bench.db"), users=40, apps=3, refresh_tokens_per_user=1, codes_per_user=1)
+
+
+def login(client, email: str, password: str) -> dict:
+    response = client.post("/api/auth/login", json={"email": email, "password": password})
+    assert response.status_code == 200, response.text
+    return response.json()
+
+def bearer(token: str) -> dict:
+    return {"Authorization": f"Bearer {token}"}
+
+
+@pytest.fixture
+def admin_headers(client):
+    return bearer(login(client, ADMIN_EMAIL, ADMIN_PASSWORD)["access_token"])
+
+
+def unique(prefix: str) -> str:
+    return f"{prefix}-{uuid.uuid4().hex[:10]}"
+
+def register_student(client, email: str = None) -> dict:
+    """Register a student; returns the /api/auth/register payload plus the email."""
+    email = email or f"{unique('student')}@example.com"
+    response = client.post("/api/auth/register", json={
+        "name": "Test Student",
+        "email": email,
+        "password": STUDENT_PASSWORD,
+        "confirmPassword": STUDENT_PASSWORD,
+        "rollNo": "R-1",
+        "branch": "CSE",
+        "semester": "3",
+    })
+    assert response.status_code == 200, response.text
+    return {**response.json(), "email": email}
+
+def create_application(client, admin_headers: dict, client_id: str = None) -> dict:
+    """Register a client application; returns id, client_id, client_secret and redirect_uri."""
+    client_id = client_id or unique("client")
+    redirect_uri = f"http://{client_id}.test/callback"
+    response = client.post("/api/applications", headers=admin_headers, json={
+        "name": client_id,
+        "url": f"http://{client_id}.test",
+        "client_id": client_id,
+        "redirect_url": redirect_uri,
+    })
+    assert response.status_code == 200, response.text
+    return {**response.json(), "redirect_uri": redirect_uri}
+
+def create_api_key(client, headers: dict) -> dict:
+    response = client.post("/api/keys", headers=headers, json={"name": unique("key")})
+    assert response.status_code == 200, response.text
+    return {"X-API-Key": response.json()["key_value"]}
+
+def sso_login(client, application: dict, email: str, password: str = STUDENT_PASSWORD, **fields):
+    """POST the /login form for `application`; the response is not followed."""
+    form = {
+        "email": email,
+        "password": password,
+        "client_id": application["client_id"],
+        "redirect_uri": application["redirect_uri"],
+        **fields,
+    }
+    return client.post("/login", data=form, follow_redirects=False)
+
+def consent_decision(client, consent_page, decision: str = "approve"):
+    consent_token = CONSENT_TOKEN_PATTERN.search(consent_page.text).group(1)
+    return client.post(
+        "/consent/decision",
+        data={"consent_token": consent_token, "decision": decision},
+        follow_redirects=False,
+    )
+
+def redirect_params(response) -> dict:
+    assert response.status_code == 302, response.text
+    return {key: values[0] for key, values in parse_qs(urlparse(response.headers["location"]).query).items()}
@@ -0,0 +1,48 @@
+import json
+
+from backend.audit import audit_writer, log_app_removal, removal_writer
+from backend.database import get_db_connection
+from conftest import create_application, unique
+
+
+def test_admin_actions_are_flushed_to_the_audit_log(client, admin_headers):
+    application = create_application(client, admin_headers)
+    client.post(f"/api/applications/{application['id']}/client-secret", headers=admin_headers)
+    audit_writer.flush()
+
+    response = client.get(
+        "/api/admin/audit",
+        params={"target_type": "application", "target_id": application["id"]},
+        headers=admin_headers,
+    )
+    assert response.status_code == 200
+    actions = [event["action"] for event in response.json()]
+    assert "app.secret_rotated" in actions
+    assert all(event["actor_email"] == "admin@example.com" for event in response.json())
+
+    export = client.get(
+        "/api/admin/audit/export",
+        params={"action": "app.*", "target_id": application["id"]},
+        headers=admin_headers,
+    )
+    exported = [json.loads(line)["action"] for line in export.text.splitlines()]
+    assert sorted(exported) == sorted(actions)
+
+def test_app_removals_reach_both_tables():
+    email = f"{unique('leaver')}@example.com"
+    log_app_removal(email, "Leaver", "app-1", "Some App")
+    removal_writer.flush()
+    audit_writer.flush()
+
+    conn = get_db_connection()
+    removals = conn.execute("SELECT app_name FROM app_removal_logs WHERE user_email = ?", (email,)).fetchall()
+    events = conn.execute("SELECT action FROM audit_events WHERE actor_email = ?", (email,)).fetchall()
+    conn.close()
+    assert [row["app_name"] for row in removals] == ["Some App"]
+    assert [row["action"] for row in events] == ["user.app_removed"]
+
+def test_pipeline_stats_require_admin(client, admin_headers):
+    stats = client.get("/api/admin/audit/stats", headers=admin_headers).json()
+    assert set(stats) == {"audit_events", "app_removal_logs"}
+    assert stats["audit_events"]["failed"] == 0
+    assert client.get("/api/admin/audit/stats").status_code == 403
@@ -0,0 +1,68 @@
+from backend import auth_cache, metrics
+from backend.security import create_access_token, decode_token_claims
+from conftest import STUDENT_PASSWORD, bearer, login, register_student, unique
+
+
+def _hits(cache: str) -> float:
+    return metrics.snapshot_counter("sso_cache_requests_total").get((("cache", cache), ("result", "hit")), 0)
+
+def _student_session(client) -> dict:
+    student = register_student(client)
+    session = login(client, student["email"], STUDENT_PASSWORD)
+    return {"email": student["email"], "id": session["user"]["id"], "headers": bearer(session["access_token"])}
+
+
+def test_repeat_requests_reuse_claims_and_user_row(client):
+    student = _student_session(client)
+    client.get("/api/auth/me", headers=student["headers"])
+    claims, users = _hits("token_claims"), _hits("user_row")
+    assert client.get("/api/auth/me", headers=student["headers"]).status_code == 200
+    assert _hits("token_claims") == claims + 1
+    assert _hits("user_row") == users + 1
+
+def test_cached_user_rows_leave_out_the_password_hash(client):
+    student = _student_session(client)
+    client.get("/api/auth/me", headers=student["headers"])
+    cached = auth_cache.cached_user(student["email"], 0)
+    assert cached["email"] == student["email"]
+    assert "password_hash" not in cached
+
+def test_role_change_is_visible_on_the_next_request(client, admin_headers):
+    student = _student_session(client)
+    assert client.get("/api/auth/me", headers=student["headers"]).json()["role"] == "student"
+    client.put(f"/api/users/{student['id']}/role", params={"role": "admin"}, headers=admin_headers)
+    assert client.get("/api/auth/me", headers=student["headers"]).json()["role"] == "admin"
+
+def test_profile_change_is_visible_on_the_next_request(client):
+    student = _student_session(client)
+    client.get("/api/auth/me", headers=student["headers"])
+    client.put("/api/profile", json={"name": "Renamed"}, headers=student["headers"])
+    assert client.get("/api/auth/me", headers=student["headers"]).json()["name"] == "Renamed"
+
+def test_token_for_a_changed_email_stops_resolving(client):
+    student = _student_session(client)
+    client.get("/api/auth/me", headers=student["headers"])
+    client.put("/api/profile", json={"email": f"{unique('moved')}@example.com"}, headers=student["headers"])
+    response = client.get("/api/auth/me", headers=student["headers"])
+    assert response.status_code == 401
+    assert response.json()["detail"] == "User not found"
+
+def test_cached_claims_need_the_exact_token():
+    token, _ = create_access_token({"sub": "a@example.com"})
+    payload = decode_token_claims(token)
+    assert auth_cache.cached_token_claims(token) == payload
+    # Same signature segment, different header and payload
+    forged = "x.y." + token.rpartition(".")[2]
+    assert auth_cache.cached_token_claims(forged) is None
+
+def test_ttl_cache_expires_and_evicts(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(auth_cache.time, "time", lambda: now[0])
+    cache = auth_cache.TTLCache("test", max_size=2)
+    cache.set("a", 1, 1010.0)
+    cache.set("b", 2, 1005.0)
+    cache.get("a")
+    cache.set("c", 3, 1010.0)
+    assert cache.get("b") is None and cache.get("a") == 1
+    now[0] = 1010.0
+    assert cache.get("a") is None and cache.get("c") is None
@@ -0,0 +1,106 @@
+import base64
+import hashlib
+import secrets
+
+from jose import jwt
+
+from backend.config import ALGORITHM, SECRET_KEY
+from conftest import (
+    consent_decision,
+    create_application,
+    redirect_params,
+    register_student,
+    sso_login,
+)
+
+
+def _pkce_pair() -> tuple:
+    verifier = secrets.token_urlsafe(48)
+    challenge = base64.urlsafe_b64encode(hashlib.sha256(verifier.encode("ascii")).digest()).rstrip(b"=").decode()
+    return verifier, challenge
+
+def _authorize(client, application: dict, email: str, **fields) -> dict:
+    """Sign in with response_type=code, approving consent if asked; returns the redirect's query."""
+    response = sso_login(client, application, email, response_type="code", state="xyz", **fields)
+    if response.status_code == 200:
+        response = consent_decision(client, response)
+    return redirect_params(response)
+
+def _exchange(client, application: dict, code: str, **fields):
+    return client.post("/oauth/token", json={
+        "grant_type": "authorization_code",
+        "client_id": application["client_id"],
+        "code": code,
+        "redirect_uri": application["redirect_uri"],
+        **fields,
+    })
+
+
+def test_public_client_exchanges_a_code_with_its_s256_verifier(client, admin_headers):
+    application = create_application(client, admin_headers)
+    student = register_student(client)
+    verifier, challenge = _pkce_pair()
+
+    params = _authorize(client, application, student["email"], code_challenge=challenge, code_challenge_method="S256")
+    assert params["state"] == "xyz"
+    assert "token" not in params
+
+    response = _exchange(client, application, params["code"], code_verifier=verifier)
+    assert response.status_code == 200, response.text
+    body = response.json()
+    assert "refresh_token" not in body
+    claims = jwt.decode(body["access_token"], SECRET_KEY, algorithms=[ALGORITHM], audience=application["id"])
+    assert claims["sub"] == student["email"]
+
+def test_wrong_verifier_fails_and_burns_the_code(client, admin_headers):
+    application = create_application(client, admin_headers)
+    student = register_student(client)
+    verifier, challenge = _pkce_pair()
+    code = _authorize(client, application, student["email"], code_challenge=challenge, code_challenge_method="S256")["code"]
+
+    wrong = _exchange(client, application, code, code_verifier=secrets.token_urlsafe(48))
+    assert wrong.status_code == 400
+    assert wrong.json()["detail"] == "invalid_grant"
+    assert _exchange(client, application, code, code_verifier=verifier).json()["detail"] == "invalid_grant"
+
+def test_codes_are_single_use(client, admin_headers):
+    application = create_application(client, admin_headers)
+    student = register_student(client)
+    code = _authorize(client, application, student["email"])["code"]
+
+    first = _exchange(client, application, code, client_secret=application["client_secret"])
+    assert first.status_code == 200
+    assert "refresh_token" in first.json()
+    assert _exchange(client, application, code, client_secret=application["client_secret"]).status_code == 400
+
+def test_code_without_challenge_needs_the_client_secret(client, admin_headers):
+    application = create_application(client, admin_headers)
+    student = register_student(client)
+    code = _authorize(client, application, student["email"])["code"]
+    response = _exchange(client, application, code)
+    assert response.status_code == 401
+    assert response.json()["detail"] == "invalid_client"
+
+def test_code_is_bound_to_its_client_and_redirect(client, admin_headers):
+    application = create_application(client, admin_headers)
+    other = create_application(client, admin_headers)
+    student = register_student(client)
+
+    code = _authorize(client, application, student["email"])["code"]
+    stolen = _exchange(client, other, code, client_secret=other["client_secret"])
+    assert stolen.json()["detail"] == "invalid_grant"
+
+    code = _authorize(client, application, student["email"])["code"]
+    moved = _exchange(client, {**application, "redirect_uri": application["redirect_uri"] + "/other"}, code,
+                      client_secret=application["client_secret"])
+    assert moved.json()["detail"] == "invalid_redirect"
+
+def test_malformed_authorization_requests_are_rejected(client, admin_headers):
+    application = create_application(client, admin_headers)
+    student = register_student(client)
+    _, challenge = _pkce_pair()
+    assert sso_login(client, application, student["email"], response_type="id_token").status_code == 400
+    # A challenge only makes sense with response_type=code
+    assert sso_login(client, application, student["email"], code_challenge=challenge).status_code == 400
+    assert sso_login(client, application, student["email"], response_type="code",
+                     code_challenge=challenge, code_challenge_method="S512").status_code == 400
@@ -0,0 +1,66 @@
+import sqlite3
+
+from backend import batch_writer
+from backend.batch_writer import BatchWriter
+from backend.database import get_db_connection
+from backend.session_log import session_writer
+from conftest import bearer, login, register_student, STUDENT_PASSWORD
+
+
+def _session_events(user_id: int) -> list:
+    conn = get_db_connection()
+    rows = conn.execute(
+        "SELECT event FROM session_logs WHERE user_id = ? ORDER BY id", (user_id,)
+    ).fetchall()
+    conn.close()
+    return [row["event"] for row in rows]
+
+def test_register_and_login_rows_are_flushed(client):
+    student = register_student(client)
+    token = login(client, student["email"], STUDENT_PASSWORD)["access_token"]
+    user_id = client.get("/api/auth/me", headers=bearer(token)).json()["id"]
+
+    session_writer.flush()
+    assert _session_events(user_id) == ["register", "login"]
+
+def test_batch_survives_a_transient_failure(monkeypatch):
+    writer = BatchWriter(
+        "test_rows",
+        "INSERT INTO version_changes (kind, subject) VALUES (?, ?)",
+        retry_backoff=0.001,
+    )
+    original = writer._insert
+    attempts = []
+
+    def flaky_insert(batch):
+        attempts.append(len(batch))
+        if len(attempts) < 3:
+            raise sqlite3.OperationalError("database is locked")
+        original(batch)
+
+    monkeypatch.setattr(writer, "_insert", flaky_insert)
+    for n in range(3):
+        writer.submit(("test", f"retry-{n}"))
+    writer.flush()
+
+    stats = writer.stats()
+    assert stats["written"] == 3
+    assert stats["failed"] == 0
+    assert stats["retried"] == 2
+    conn = get_db_connection()
+    count = conn.execute("SELECT COUNT(*) FROM version_changes WHERE subject LIKE 'retry-%'").fetchone()[0]
+    conn.close()
+    assert count == 3
+
+def test_batch_is_counted_lost_after_its_last_attempt(monkeypatch, capsys):
+    writer = BatchWriter("test_rows", "INSERT INTO no_such_table VALUES (?)", max_attempts=2, retry_backoff=0.001)
+    monkeypatch.setattr(batch_writer.time, "sleep", lambda seconds: None)
+    writer.submit((1,))
+    writer.submit((2,))
+    writer.flush()
+
+    stats = writer.stats()
+    assert stats["written"] == 0
+    assert stats["failed"] == 2
+    assert stats["retried"] == 1
+    assert "lost 2 rows after 2 attempt(s)" in capsys.readouterr().out
@@ -0,0 +1,55 @@
+from backend.benchmarks import loadtest, micro
+
+
+def test_percentile_uses_nearest_rank():
+    values = [float(n) for n in range(1, 101)]
+    assert loadtest.percentile(values, 0.50) == 50.0
+    assert loadtest.percentile(values, 0.95) == 95.0
+    assert loadtest.percentile(values, 0.99) == 99.0
+    assert loadtest.percentile([7.0], 0.99) == 7.0
+    assert loadtest.percentile([], 0.5) == 0.0
+
+def test_summarize_reports_milliseconds_and_throughput():
+    summary = loadtest.summarize([0.001, 0.002, 0.003, 0.010], errors=1, elapsed=2.0)
+    assert summary == {
+        "requests": 4,
+        "errors": 1,
+        "throughput_rps": 2.0,
+        "p50_ms": 2.0,
+        "p95_ms": 10.0,
+        "p99_ms": 10.0,
+        "max_ms": 10.0,
+    }
+
+def test_compare_counts_only_p95_regressions(capsys):
+    baseline = {"results": {
+        "login": {"p95_ms": 10.0, "throughput_rps": 100.0},
+        "sdk_verify": {"p95_ms": 10.0, "throughput_rps": 100.0},
+    }}
+    current = {"results": {
+        "login": {"p95_ms": 13.0, "throughput_rps": 80.0},
+        "sdk_verify": {"p95_ms": 10.5, "throughput_rps": 100.0},
+        "client_credentials": {"p95_ms": 4.0, "throughput_rps": 300.0},
+    }}
+    assert loadtest.compare(baseline, current, max_regression=10.0) == 1
+    output = capsys.readouterr().out
+    assert "REGRESSION" in next(line for line in output.splitlines() if line.startswith("login"))
+    assert "(new)" in next(line for line in output.splitlines() if line.startswith("client_credentials"))
+
+def test_measure_reports_per_call_time():
+    seen = []
+    result = micro.measure(seen.append, number=5, repeat=3)
+    assert seen == list(range(15))
+    assert result["calls"] == 15
+    assert 0 < result["min_ns"] <= result["median_ns"]
+
+def test_check_regressions_flags_slower_medians():
+    baseline = {"results": {"a": {"median_ns": 100.0}, "b": {"median_ns": 100.0}}}
+    current = {"results": {"a": {"median_ns": 130.0}, "b": {"median_ns": 105.0}, "c": {"median_ns": 1.0}}}
+    failures = micro.check_regressions(baseline, current, max_regression=25)
+    assert len(failures) == 1 and failures[0].startswith("a ")
+
+def test_database_benchmarks_run_against_a_seeded_database(bench_db):
+    results = micro.database_benchmarks(bench_db, number=4, repeat=2)
+    assert set(results) >= {"user_has_consent", "load_authorization_context", "consume_authorization_code"}
+    assert all(result["calls"] == 8 for result in results.values())
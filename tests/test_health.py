@@ -0,0 +1,43 @@
+import pytest
+
+from backend import health
+
+
+@pytest.fixture(autouse=True)
+def fresh_report(monkeypatch):
+    monkeypatch.setattr(health, "_cached_report", None)
+    monkeypatch.setattr(health, "_cached_at", 0.0)
+
+
+def test_liveness_does_not_probe(client, monkeypatch):
+    monkeypatch.setattr(health, "_run_probes", lambda: pytest.fail("liveness must not probe"))
+    assert client.get("/health/live").json() == {"status": "ok"}
+
+def test_readiness_reports_every_probe(client):
+    response = client.get("/health/ready")
+    assert response.status_code == 200
+    report = response.json()
+    assert report["status"] == health.STATUS_OK
+    assert set(report["checks"]) == {"db_read", "db_write", "disk", "writer_queues", "hashing", "caches"}
+    assert "session_logs" in report["checks"]["writer_queues"]["queues"]
+
+def test_readiness_is_cached_between_probes(client, monkeypatch):
+    client.get("/health/ready")
+    monkeypatch.setattr(health, "_run_probes", lambda: pytest.fail("report should come from the cache"))
+    assert client.get("/health/ready").status_code == 200
+
+def test_unreadable_database_is_unavailable(client, monkeypatch):
+    monkeypatch.setattr(health, "_probe_db_read", lambda: {"status": health.STATUS_UNAVAILABLE, "error": "gone"})
+    response = client.get("/health/ready")
+    assert response.status_code == 503
+    assert response.json()["status"] == health.STATUS_UNAVAILABLE
+
+def test_degraded_service_sheds_non_critical_paths(client, admin_headers, monkeypatch):
+    monkeypatch.setattr(health, "_probe_disk", lambda: {"status": health.STATUS_DEGRADED, "free_mb": 1})
+    assert client.get("/health/ready").json()["status"] == health.STATUS_DEGRADED
+
+    shed = client.get("/api/admin/audit", headers=admin_headers)
+    assert shed.status_code == 503
+    assert "Retry-After" in shed.headers
+    # Sign-in keeps working
+    assert client.get("/api/auth/me", headers=admin_headers).status_code == 200
@@ -0,0 +1,63 @@
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from backend.compression import CompressionMiddleware, accepted_encodings
+from backend.database import get_table_versions
+from conftest import create_application, register_student
+
+
+def test_user_listing_is_a_304_until_the_users_table_changes(client, admin_headers):
+    first = client.get("/api/users", headers=admin_headers)
+    assert first.status_code == 200
+    etag = first.headers["etag"]
+    assert etag.startswith('W/"users-')
+    assert client.get("/api/users", headers={**admin_headers, "If-None-Match": etag}).status_code == 304
+
+    student = register_student(client)
+    changed = client.get("/api/users", headers={**admin_headers, "If-None-Match": etag})
+    assert changed.status_code == 200
+    assert changed.headers["etag"] != etag
+    assert student["email"] in {user["email"] for user in changed.json()}
+
+def test_application_listing_follows_user_app_access_writes(client, admin_headers):
+    application = create_application(client, admin_headers)
+    student = register_student(client)
+    etag = client.get("/api/applications", headers=admin_headers).headers["etag"]
+    before = get_table_versions(("user_app_access",))
+
+    client.post(
+        f"/api/applications/{application['id']}/users/block",
+        json={"email": student["email"], "blocked": True},
+        headers=admin_headers,
+    )
+    assert get_table_versions(("user_app_access",))[0] > before[0]
+    response = client.get("/api/applications", headers={**admin_headers, "If-None-Match": etag})
+    assert response.status_code == 200
+
+def test_listing_requires_admin_even_with_an_etag(client):
+    assert client.get("/api/users", headers={"If-None-Match": "*"}).status_code == 403
+
+
+def _app_returning(size: int) -> TestClient:
+    app = FastAPI()
+    app.add_middleware(CompressionMiddleware, minimum_size=100)
+
+    @app.get("/data")
+    def data():
+        return {"payload": "x" * size}
+
+    return TestClient(app)
+
+def test_large_json_bodies_are_gzipped():
+    response = _app_returning(500).get("/data", headers={"Accept-Encoding": "gzip"})
+    assert response.headers["content-encoding"] == "gzip"
+    assert response.headers["vary"] == "Accept-Encoding"
+    assert response.json()["payload"] == "x" * 500
+
+def test_small_or_unaccepted_bodies_pass_through():
+    assert "content-encoding" not in _app_returning(10).get("/data", headers={"Accept-Encoding": "gzip"}).headers
+    refused = _app_returning(500).get("/data", headers={"Accept-Encoding": "gzip;q=0"})
+    assert "content-encoding" not in refused.headers
+
+def test_accept_encoding_parsing():
+    assert accepted_encodings("gzip, br;q=0, Deflate;q=0.5") == {"gzip", "deflate"}
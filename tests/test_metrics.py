@@ -0,0 +1,32 @@
+from backend import metrics
+from conftest import ADMIN_EMAIL, ADMIN_PASSWORD, login
+
+
+def test_requests_are_counted_by_route_template(client):
+    before = metrics.snapshot_counter("sso_http_requests_total")
+    key = (("method", "GET"), ("route", "/static/{name}"), ("status", 404))
+    client.get("/static/no-such-asset.js")
+    client.get("/static/another-missing.css")
+    after = metrics.snapshot_counter("sso_http_requests_total")
+    assert after.get(key, 0) - before.get(key, 0) == 2
+
+def test_metrics_endpoint_renders_prometheus_text(client):
+    login(client, ADMIN_EMAIL, ADMIN_PASSWORD)
+    response = client.get("/metrics")
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain; version=0.0.4")
+    body = response.text
+    assert "# TYPE sso_http_requests_total counter" in body
+    assert "# TYPE sso_http_request_duration_seconds histogram" in body
+    assert 'sso_http_request_duration_seconds_bucket{method="POST",route="/api/auth/login",le="+Inf"}' in body
+    assert 'sso_background_queue_depth{writer="session_logs"}' in body
+
+def test_histogram_buckets_are_cumulative(monkeypatch):
+    monkeypatch.setitem(metrics._HISTOGRAMS, "sso_test_seconds", ("Test histogram.", (0.1, 1.0)))
+    for value in (0.05, 0.5, 5.0):
+        metrics.observe("sso_test_seconds", value)
+    lines = [line for line in metrics.render_prometheus().splitlines() if line.startswith("sso_test_seconds")]
+    assert 'sso_test_seconds_bucket{le="0.1"} 1' in lines
+    assert 'sso_test_seconds_bucket{le="1.0"} 2' in lines
+    assert 'sso_test_seconds_bucket{le="+Inf"} 3' in lines
+    assert "sso_test_seconds_count 3" in lines
@@ -0,0 +1,90 @@
+import pytest
+
+from backend import database, migrations
+from backend.scopes import scope_set
+from backend.sso_helpers import parse_redirect_entries
+
+
+@pytest.fixture
+def empty_db(tmp_path, monkeypatch):
+    monkeypatch.setattr(database, "DB_FILE_PATH", str(tmp_path / "migrate.db"))
+    conn = database.get_db_connection()
+    yield conn
+    conn.close()
+
+def _apply_up_to(conn, version: int) -> None:
+    conn.execute("CREATE TABLE schema_version (version INTEGER PRIMARY KEY, name TEXT NOT NULL)")
+    for migration in migrations.MIGRATIONS[:version]:
+        migration.apply(conn)
+        conn.execute("INSERT INTO schema_version (version, name) VALUES (?, ?)", (migration.version, migration.name))
+    conn.commit()
+
+
+def test_fresh_database_gets_every_migration_once(empty_db):
+    assert migrations.current_version(empty_db) == 0
+    assert not migrations.schema_is_current()
+
+    applied = migrations.migrate(empty_db)
+    assert [m.version for m in applied] == list(range(1, migrations.LATEST_VERSION + 1))
+    assert migrations.schema_is_current()
+    assert migrations.migrate(empty_db) == []
+
+def test_upgrade_backfills_consent_masks_from_legacy_strings(empty_db):
+    _apply_up_to(empty_db, 4)
+    empty_db.execute("INSERT INTO users (name, email, password_hash) VALUES ('A', 'a@example.com', 'x')")
+    legacy = ["profile email", "EMAIL,Profile", "student_academics role", "profile custom:scope", ""]
+    empty_db.executemany(
+        "INSERT INTO user_consents (user_id, app_id, scopes) VALUES (1, ?, ?)",
+        [(f"app-{n}", scopes) for n, scopes in enumerate(legacy)],
+    )
+    empty_db.commit()
+
+    applied = migrations.migrate(empty_db)
+    assert applied[0].version == 5
+    rows = empty_db.execute("SELECT scopes, scope_mask FROM user_consents ORDER BY app_id").fetchall()
+    assert [row["scope_mask"] for row in rows] == [scope_set(scopes).mask for scopes in legacy]
+
+def test_backfill_commits_in_id_ranges(empty_db):
+    _apply_up_to(empty_db, migrations.LATEST_VERSION)
+    empty_db.execute("INSERT INTO users (name, email, password_hash) VALUES ('A', 'a@example.com', 'x')")
+    empty_db.executemany(
+        "INSERT INTO user_consents (user_id, app_id, scopes) VALUES (1, ?, 'profile')",
+        [(f"app-{n}",) for n in range(7)],
+    )
+    empty_db.commit()
+
+    updated = migrations.backfill(empty_db, "user_consents", "scope_mask = 1", where="scope_mask IS NULL", batch_size=3)
+    assert updated == 7
+    assert empty_db.execute("SELECT COUNT(*) FROM user_consents WHERE scope_mask = 1").fetchone()[0] == 7
+
+def test_status_reports_the_version(empty_db, capsys):
+    migrations.main(["--status"])
+    assert capsys.readouterr().out.strip() == f"schema version 0, latest {migrations.LATEST_VERSION}"
+
+def test_postgres_change_counters_bump_once_per_statement(monkeypatch):
+    executed = []
+
+    class Recorder:
+        def execute(self, sql, parameters=()):
+            executed.append(" ".join(sql.split()))
+
+    monkeypatch.setattr(migrations, "dialect", lambda: "postgres")
+    migrations._table_versions(Recorder())
+    migrations._statement_table_versions(Recorder())
+    triggers = [sql for sql in executed if sql.startswith("CREATE TRIGGER")]
+    assert len(triggers) == 2 * len(migrations.VERSIONED_TABLES)
+    assert all("FOR EACH STATEMENT" in sql and "FOR EACH ROW" not in sql for sql in triggers)
+
+def test_demo_redirect_urls_follow_the_seed_list(empty_db):
+    _apply_up_to(empty_db, 9)
+    empty_db.executemany("INSERT INTO applications (id, name, url, client_id, redirect_url) VALUES (?, ?, ?, ?, ?)", [
+        ("demo", "Demo", "http://127.0.0.1:8081", "campusconnect-client-2", "http://127.0.0.1:5502/index2.html"),
+        ("other", "Other", "http://other.test", "other-client", "http://other.test/callback"),
+    ])
+    empty_db.commit()
+
+    assert [m.version for m in migrations.migrate(empty_db)] == list(range(10, migrations.LATEST_VERSION + 1))
+    rows = {row[0]: row[1] for row in empty_db.execute("SELECT client_id, redirect_url FROM applications")}
+    demo_urls = dict((client_id, list(urls)) for _, _, client_id, urls in database.DEMO_APPLICATIONS)
+    assert parse_redirect_entries(rows["campusconnect-client-2"]) == demo_urls["campusconnect-client-2"]
+    assert rows["other-client"] == "http://other.test/callback"
@@ -0,0 +1,133 @@
+import pytest
+from jose import jwt
+
+from backend import main
+from backend.config import ALGORITHM, SECRET_KEY
+from conftest import (
+    consent_decision,
+    create_api_key,
+    create_application,
+    redirect_params,
+    register_student,
+    sso_login,
+)
+
+
+def _token(client, application: dict, **fields):
+    return client.post("/oauth/token", json={
+        "client_id": application["client_id"],
+        "client_secret": application["client_secret"],
+        **fields,
+    })
+
+def _client_credentials(client, application: dict, **fields):
+    return _token(client, application, grant_type="client_credentials", **fields)
+
+def _refresh(client, application: dict, refresh_token: str, **fields):
+    return _token(client, application, grant_type="refresh_token", refresh_token=refresh_token, **fields)
+
+@pytest.fixture
+def signed_in(client, admin_headers):
+    """A confidential client and the token pair from a student's code exchange."""
+    application = create_application(client, admin_headers)
+    student = register_student(client)
+    consent_page = sso_login(client, application, student["email"], scope="profile email", response_type="code")
+    code = redirect_params(consent_decision(client, consent_page))["code"]
+    tokens = _token(client, application, code=code, redirect_uri=application["redirect_uri"]).json()
+    return {"application": application, "email": student["email"], **tokens}
+
+
+# CLIENT CREDENTIALS
+def test_client_credentials_token_has_no_user_or_refresh_token(client, admin_headers):
+    application = create_application(client, admin_headers)
+    response = _client_credentials(client, application)
+    assert response.status_code == 200, response.text
+    body = response.json()
+    assert "refresh_token" not in body
+    claims = jwt.decode(body["access_token"], SECRET_KEY, algorithms=[ALGORITHM], audience=application["id"])
+    assert claims["type"] == "client"
+    assert claims["sub"] == application["client_id"]
+
+def test_client_credentials_never_grant_user_data_scopes(client, admin_headers, monkeypatch):
+    application = create_application(client, admin_headers)
+    assert _client_credentials(client, application, scope="email").json()["detail"] == "invalid_scope"
+    assert _client_credentials(client, application, scope="reports:read").json()["detail"] == "invalid_scope"
+
+    monkeypatch.setattr(main, "CLIENT_CREDENTIALS_SCOPES", frozenset({"reports:read", "email"}))
+    allowed = _client_credentials(client, application, scope="reports:read")
+    assert allowed.status_code == 200
+    assert allowed.json()["scope"] == "reports:read"
+    # Listing a user-data scope does not make it grantable
+    refused = _client_credentials(client, application, scope="reports:read email")
+    assert refused.status_code == 400
+    assert refused.json()["detail"] == "invalid_scope"
+
+def test_client_credentials_need_a_valid_secret_and_an_unblocked_app(client, admin_headers):
+    application = create_application(client, admin_headers)
+    wrong = _client_credentials(client, {**application, "client_secret": "not-the-secret"})
+    assert wrong.status_code == 401
+    missing = client.post("/oauth/token", json={"grant_type": "client_credentials", "client_id": application["client_id"]})
+    assert missing.status_code == 401
+
+    client.post(f"/api/applications/{application['id']}/block", json={"blocked": True}, headers=admin_headers)
+    assert _client_credentials(client, application).status_code == 403
+
+def test_client_tokens_are_refused_by_user_data_endpoints(client, admin_headers):
+    application = create_application(client, admin_headers)
+    api_key = create_api_key(client, admin_headers)
+    token = _client_credentials(client, application).json()["access_token"]
+
+    profile = client.get("/api/sdk/user-profile", params={"token": token}, headers=api_key)
+    assert profile.status_code == 401
+    assert profile.json()["detail"] == "Invalid token type"
+    assert client.get("/api/auth/me", headers={"Authorization": f"Bearer {token}"}).status_code == 401
+
+    verified = client.get("/api/sdk/verify", params={"token": token}, headers=api_key).json()
+    assert verified == {"valid": True, "client_id": application["client_id"], "scopes": [], "app_id": application["id"]}
+
+def test_unknown_grant_type(client, admin_headers):
+    application = create_application(client, admin_headers)
+    assert _token(client, application, grant_type="password").json()["detail"] == "unsupported_grant_type"
+
+
+# REFRESH TOKENS
+def test_refresh_rotates_the_token_pair(client, signed_in):
+    application = signed_in["application"]
+    response = _refresh(client, application, signed_in["refresh_token"])
+    assert response.status_code == 200, response.text
+    rotated = response.json()
+    assert rotated["refresh_token"] != signed_in["refresh_token"]
+    assert rotated["scope"] == "email profile"
+    claims = jwt.decode(rotated["access_token"], SECRET_KEY, algorithms=[ALGORITHM], audience=application["id"])
+    assert claims["sub"] == signed_in["email"] and claims["type"] == "access"
+
+    # The rotated token keeps working, the original is spent
+    assert _refresh(client, application, rotated["refresh_token"]).status_code == 200
+    reused = _refresh(client, application, signed_in["refresh_token"])
+    assert reused.status_code == 400
+    assert reused.json()["detail"] == "invalid_grant"
+
+def test_refresh_may_narrow_but_not_widen_scopes(client, signed_in):
+    application = signed_in["application"]
+    wider = _refresh(client, application, signed_in["refresh_token"], scope="email role")
+    assert wider.json()["detail"] == "invalid_scope"
+
+    narrower = _refresh(client, application, signed_in["refresh_token"], scope="email")
+    assert narrower.json()["scope"] == "email"
+    # The grant itself is unchanged by a narrower request
+    assert _refresh(client, application, narrower.json()["refresh_token"]).json()["scope"] == "email profile"
+
+def test_refresh_token_is_bound_to_its_application(client, admin_headers, signed_in):
+    other = create_application(client, admin_headers)
+    assert _refresh(client, other, signed_in["refresh_token"]).json()["detail"] == "invalid_grant"
+    # Still usable by the application it was issued to
+    assert _refresh(client, signed_in["application"], signed_in["refresh_token"]).status_code == 200
+
+def test_refresh_stops_once_the_user_is_blocked(client, admin_headers, signed_in):
+    application = signed_in["application"]
+    client.post(
+        f"/api/applications/{application['id']}/users/block",
+        json={"email": signed_in["email"], "blocked": True},
+        headers=admin_headers,
+    )
+    assert _refresh(client, application, signed_in["refresh_token"]).status_code == 403
@@ -0,0 +1,41 @@
+from backend import pages
+from backend.pages import Template
+
+
+def test_login_page_is_revalidated_by_etag(client):
+    first = client.get("/sso-login")
+    assert first.status_code == 200
+    assert first.headers["cache-control"] == "no-cache"
+    etag = first.headers["etag"]
+
+    again = client.get("/sso-login", headers={"If-None-Match": etag})
+    assert again.status_code == 304
+    assert again.content == b""
+
+def test_precompressed_variant_is_served_when_accepted(client):
+    raw = client.get("/sso-login", headers={"Accept-Encoding": "identity"})
+    assert "content-encoding" not in raw.headers
+
+    response = client.get("/static/sso.css", headers={"Accept-Encoding": "gzip"})
+    assert response.headers["content-encoding"] == "gzip"
+    assert response.headers["vary"] == "Accept-Encoding"
+    assert "immutable" in response.headers["cache-control"]
+    assert response.content == pages.static_assets["sso.css"].body
+
+def test_static_urls_are_fingerprinted(client):
+    url = pages.static_url("sso.css")
+    assert url == f"/static/sso.css?v={pages.static_assets['sso.css'].version}"
+    assert url in client.get("/sso-login").text
+    assert client.get("/static/missing.css").status_code == 404
+
+def test_partial_templates_render_like_full_ones():
+    template = Template(["<p>", "greeting", ", ", "name", "!</p>"])
+    assert template.partial(greeting="Hi").render(name="Ada") == template.render(greeting="Hi", name="Ada")
+    assert template.partial(greeting="Hi").parts == ["<p>Hi, ", "name", "!</p>"]
+
+def test_consent_page_escapes_names_and_tokens():
+    page = pages.render_consent_page('tok"en', "<script>App</script>", ["profile", "student_academics"])
+    assert "<script>App" not in page
+    assert "&lt;script&gt;App&lt;/script&gt;" in page
+    assert 'value="tok&quot;en"' in page
+    assert "<li>Student Academics</li>" in page
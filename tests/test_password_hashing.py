@@ -0,0 +1,52 @@
+import importlib.util
+
+import pytest
+from passlib.hash import bcrypt
+
+from backend import metrics, security
+from backend.database import get_db_connection
+from conftest import STUDENT_PASSWORD, login, register_student
+
+
+def _stored_hash(email: str) -> str:
+    conn = get_db_connection()
+    password_hash = conn.execute("SELECT password_hash FROM users WHERE email = ?", (email,)).fetchone()[0]
+    conn.close()
+    return password_hash
+
+def _set_hash(email: str, password_hash: str) -> None:
+    conn = get_db_connection()
+    conn.execute("UPDATE users SET password_hash = ? WHERE email = ?", (password_hash, email))
+    conn.commit()
+    conn.close()
+
+
+def test_login_upgrades_a_hash_with_an_outdated_cost(client):
+    student = register_student(client)
+    assert _stored_hash(student["email"]).startswith("$2b$04$")
+    _set_hash(student["email"], bcrypt.using(rounds=5).hash(STUDENT_PASSWORD))
+    before = metrics.snapshot_counter("sso_password_rehash_total").get((("scheme", "bcrypt"),), 0)
+
+    login(client, student["email"], STUDENT_PASSWORD)
+    upgraded = _stored_hash(student["email"])
+    assert upgraded.startswith("$2b$04$")
+    assert security.verify_password(STUDENT_PASSWORD, upgraded)
+    assert metrics.snapshot_counter("sso_password_rehash_total")[(("scheme", "bcrypt"),)] == before + 1
+
+    # Nothing left to upgrade on the next login
+    login(client, student["email"], STUDENT_PASSWORD)
+    assert _stored_hash(student["email"]) == upgraded
+
+def test_failed_login_leaves_the_hash_alone(client):
+    student = register_student(client)
+    outdated = bcrypt.using(rounds=5).hash(STUDENT_PASSWORD)
+    _set_hash(student["email"], outdated)
+    response = client.post("/api/auth/login", json={"email": student["email"], "password": "wrong-password"})
+    assert response.status_code == 401
+    assert _stored_hash(student["email"]) == outdated
+
+def test_argon2_without_its_backend_fails_at_startup(monkeypatch):
+    monkeypatch.setattr(security, "PASSWORD_SCHEME", "argon2")
+    monkeypatch.setattr(importlib.util, "find_spec", lambda name: None)
+    with pytest.raises(RuntimeError, match="argon2-cffi"):
+        security._build_password_context()
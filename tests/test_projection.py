@@ -0,0 +1,47 @@
+import itertools
+
+from backend import database
+from backend.config import SCOPE_FIELD_MAP
+from backend.scopes import projection_plan, scope_set
+from backend.security import filter_user_data_by_scopes
+from conftest import register_student
+
+
+def _expected(row, scopes) -> dict:
+    # The field-by-field filtering the plans replaced
+    payload = {"id": row["id"]}
+    for scope in scopes:
+        for column in SCOPE_FIELD_MAP.get(scope, ()):
+            payload["rollNo" if column == "roll_no" else column] = row[column]
+    payload.setdefault("name", row["name"])
+    return payload
+
+
+def test_plans_are_built_once_per_scope_set():
+    assert projection_plan(scope_set("email profile")) is projection_plan(scope_set(["profile", "email"]))
+
+def test_plan_selects_only_released_columns():
+    plan = projection_plan(scope_set("email"))
+    assert plan.columns == ("id", "email", "name")
+    assert projection_plan(scope_set("unknown")).columns == ("id", "name")
+
+def _projected(email: str, plan) -> dict:
+    # The SDK endpoints' query: the authorization context with only the plan's columns
+    context = database.load_authorization_context(email=email, app_id="no-such-app", user_columns=plan.columns)
+    assert set(context.user) == set(plan.columns)
+    return plan.project_row(context.user)
+
+def test_every_scope_combination_matches_field_filtering(client):
+    student = register_student(client)
+    row = database.get_user_by_email(student["email"])
+    names = list(SCOPE_FIELD_MAP) + ["unknown"]
+    for size in range(len(names) + 1):
+        for combination in itertools.combinations(names, size):
+            plan = projection_plan(scope_set(combination))
+            expected = _expected(row, combination)
+            assert filter_user_data_by_scopes(row, list(combination)) == expected
+            assert _projected(student["email"], plan) == expected
+
+def test_missing_user_has_no_context_row():
+    plan = projection_plan(scope_set("email"))
+    assert database.load_authorization_context(email="nobody@example.com", user_columns=plan.columns).user is None
@@ -0,0 +1,49 @@
+from backend import metrics, rate_limit
+from backend.config import RATE_LIMITS
+from conftest import register_student
+
+
+def test_repeated_logins_for_one_email_get_429_with_retry_after(client):
+    student = register_student(client)
+    capacity, rate = RATE_LIMITS["login_email"]
+    before = metrics.snapshot_counter("sso_rate_limited_total").get((("rule", "login_email"),), 0)
+
+    for _ in range(int(capacity)):
+        response = client.post("/api/auth/login", json={"email": student["email"], "password": "wrong-password"})
+        assert response.status_code == 401
+    limited = client.post("/api/auth/login", json={"email": student["email"].upper(), "password": "wrong-password"})
+    assert limited.status_code == 429
+    assert int(limited.headers["Retry-After"]) >= int(1 / rate)
+    assert metrics.snapshot_counter("sso_rate_limited_total")[(("rule", "login_email"),)] == before + 1
+
+    # Other accounts are unaffected
+    other = register_student(client)
+    response = client.post("/api/auth/login", json={"email": other["email"], "password": "wrong-password"})
+    assert response.status_code == 401
+
+def test_memory_bucket_refills_over_time(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(rate_limit.time, "monotonic", lambda: now[0])
+    store = rate_limit.MemoryBucketStore(shards=1)
+    assert [store.take("k", 2, 0.5) for _ in range(2)] == [0.0, 0.0]
+    assert store.take("k", 2, 0.5) == 2.0
+    now[0] += 2.0
+    assert store.take("k", 2, 0.5) == 0.0
+
+def test_full_buckets_are_evicted(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(rate_limit.time, "monotonic", lambda: now[0])
+    store = rate_limit.MemoryBucketStore(shards=1, max_keys_per_shard=2)
+    store.take("a", 1, 1.0)
+    store.take("b", 1, 1.0)
+    now[0] += 5.0
+    store.take("c", 1, 1.0)
+    assert set(store.shards[0][0]) == {"c"}
+
+def test_sqlite_buckets_are_shared_between_stores(tmp_path):
+    path = str(tmp_path / "buckets.db")
+    worker_a = rate_limit.SQLiteBucketStore(path)
+    worker_b = rate_limit.SQLiteBucketStore(path)
+    assert worker_a.take("shared", 2, 0.001) == 0.0
+    assert worker_b.take("shared", 2, 0.001) == 0.0
+    assert worker_a.take("shared", 2, 0.001) > 0
@@ -0,0 +1,70 @@
+import uuid
+from datetime import datetime, timedelta
+
+from backend import revocation
+from backend.database import get_db_connection
+from conftest import ADMIN_EMAIL, ADMIN_PASSWORD, bearer, login
+
+
+def test_bloom_filter_has_no_false_negatives():
+    bloom = revocation.BloomFilter(1000, 0.01)
+    keys = [str(uuid.uuid4()) for _ in range(500)]
+    for key in keys:
+        bloom.add(key)
+    assert all(key in bloom for key in keys)
+    assert bloom.count == 500
+    misses = sum(str(uuid.uuid4()) in bloom for _ in range(2000))
+    assert misses < 100
+
+def test_logout_revokes_the_access_token(client):
+    token = login(client, ADMIN_EMAIL, ADMIN_PASSWORD)["access_token"]
+    assert client.get("/api/auth/me", headers=bearer(token)).status_code == 200
+
+    assert client.post("/api/auth/logout", headers=bearer(token)).status_code == 200
+    response = client.get("/api/auth/me", headers=bearer(token))
+    assert response.status_code == 401
+    assert response.json()["detail"] == "Token has been revoked"
+
+def test_unrevoked_jti_is_a_filter_miss():
+    assert revocation.is_access_token_revoked(str(uuid.uuid4())) is False
+    assert revocation.is_access_token_revoked(None) is False
+
+def test_revocation_from_another_worker_is_picked_up_by_sync():
+    jti = str(uuid.uuid4())
+    conn = get_db_connection()
+    conn.execute(
+        "INSERT INTO revoked_tokens (jti, expires_at) VALUES (?, ?)",
+        (jti, (datetime.utcnow() + timedelta(minutes=30)).isoformat()),
+    )
+    conn.commit()
+    conn.close()
+
+    revocation.sync_revocation_filter(force=True)
+    assert revocation.is_access_token_revoked(jti) is True
+
+def test_sync_rebuilds_only_when_the_filter_itself_is_full(monkeypatch):
+    # A filter sized for fewer entries than are live must be rebuilt once, with
+    # headroom, and then stay put on later syncs
+    rebuilds = []
+    original = revocation._rebuild_filter
+    monkeypatch.setattr(revocation, "_rebuild_filter", lambda cursor: rebuilds.append(1) or original(cursor))
+    monkeypatch.setattr(revocation, "_filter", revocation.BloomFilter(1, 0.001))
+    monkeypatch.setattr(revocation, "_last_synced_id", 0)
+    monkeypatch.setattr(revocation, "REVOCATION_FILTER_CAPACITY", 1)
+    monkeypatch.setattr(revocation, "_next_prune_at", float("inf"))
+
+    conn = get_db_connection()
+    expires_at = (datetime.utcnow() + timedelta(minutes=30)).isoformat()
+    conn.executemany(
+        "INSERT INTO revoked_tokens (jti, expires_at) VALUES (?, ?)",
+        [(str(uuid.uuid4()), expires_at) for _ in range(5)],
+    )
+    conn.commit()
+    conn.close()
+
+    revocation.sync_revocation_filter(force=True)
+    assert len(rebuilds) == 1
+    assert revocation._filter.capacity >= 2 * revocation._filter.count
+    for _ in range(3):
+        revocation.sync_revocation_filter(force=True)
+    assert len(rebuilds) == 1
@@ -0,0 +1,61 @@
+from backend import database
+from backend.database import get_db_connection
+from backend.scopes import SCOPE_BITS, SCOPE_REGISTRY, mask_sql, scope_set
+from conftest import register_student, unique
+
+
+def test_equal_scope_sets_share_one_interned_object():
+    assert scope_set("Profile, email") is scope_set(["email", "profile", "EMAIL"])
+    assert scope_set(None) is scope_set([]) and not scope_set(None)
+
+def test_bits_follow_registry_order():
+    assert [SCOPE_BITS[name] for name in SCOPE_REGISTRY] == [1 << index for index in range(len(SCOPE_REGISTRY))]
+    assert scope_set("profile email").mask == SCOPE_BITS["profile"] | SCOPE_BITS["email"]
+
+def test_unknown_scopes_are_kept_as_extras():
+    scopes = scope_set("profile calendar:read")
+    assert scopes.mask == SCOPE_BITS["profile"]
+    assert scopes.extra == ("calendar:read",)
+    assert scopes.text == "calendar:read profile"
+
+def test_subset_checks_both_bits_and_extras():
+    granted = scope_set("profile email calendar:read")
+    assert scope_set("email").issubset(granted)
+    assert scope_set("calendar:read profile").issubset(granted)
+    assert not scope_set("role").issubset(granted)
+    assert not scope_set("calendar:write").issubset(granted)
+    assert scope_set("role").union(granted) is scope_set("calendar:read email profile role")
+
+def test_text_round_trips_through_the_mask():
+    for text in ("", "profile", "email student_academics", " ".join(SCOPE_REGISTRY)):
+        original = scope_set(text)
+        decoded = scope_set([name for name, bit in SCOPE_BITS.items() if original.mask & bit])
+        assert decoded is original
+
+def test_sql_mask_matches_python():
+    conn = get_db_connection()
+    for text in ("profile", "EMAIL,profile", "student_academics role", "profile_extra", "x student_academics"):
+        assert conn.execute(f"SELECT {mask_sql('s')} FROM (SELECT ? AS s)", (text,)).fetchone()[0] == scope_set(text).mask
+    conn.close()
+
+
+def test_saved_consent_answers_subset_requests(client):
+    student = register_student(client)
+    user_id = database.get_user_by_email(student["email"])["id"]
+    app_id = unique("app")
+
+    database.save_user_consent(user_id, app_id, ["profile", "email"])
+    assert database.user_has_consent(user_id, app_id, ["email"])
+    assert not database.user_has_consent(user_id, app_id, ["email", "role"])
+
+    database.save_user_consent(user_id, app_id, ["role", "calendar:read"])
+    assert database.user_has_consent(user_id, app_id, ["profile", "role"])
+    assert database.user_has_consent(user_id, app_id, ["calendar:read", "email"])
+    assert not database.user_has_consent(user_id, app_id, ["calendar:write"])
+
+    conn = get_db_connection()
+    row = conn.execute("SELECT scopes, scope_mask FROM user_consents WHERE user_id = ? AND app_id = ?",
+                       (user_id, app_id)).fetchone()
+    conn.close()
+    assert row["scopes"] == "calendar:read email profile role"
+    assert row["scope_mask"] == scope_set(row["scopes"]).mask
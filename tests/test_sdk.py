@@ -0,0 +1,102 @@
+import pytest
+
+from backend import auth_cache, metrics, security
+from backend.security import create_access_token
+from conftest import (
+    consent_decision,
+    create_api_key,
+    create_application,
+    redirect_params,
+    register_student,
+    sso_login,
+)
+
+
+@pytest.fixture
+def sdk(client, admin_headers):
+    """An application, a student who signed in to it, their token and an API key."""
+    application = create_application(client, admin_headers)
+    student = register_student(client)
+    consent_page = sso_login(client, application, student["email"], scope="profile email")
+    token = redirect_params(consent_decision(client, consent_page))["token"]
+    return {
+        "application": application,
+        "email": student["email"],
+        "token": token,
+        "api_key": create_api_key(client, admin_headers),
+    }
+
+def _verify(client, sdk, token=None):
+    return client.get("/api/sdk/verify", params={"token": token or sdk["token"]}, headers=sdk["api_key"])
+
+def _profile(client, sdk, token=None):
+    return client.get("/api/sdk/user-profile", params={"token": token or sdk["token"]}, headers=sdk["api_key"])
+
+def _authorization_hits() -> float:
+    return metrics.snapshot_counter("sso_cache_requests_total").get((("cache", "authorization"), ("result", "hit")), 0)
+
+
+def test_token_resolves_to_the_scoped_user(client, sdk):
+    verified = _verify(client, sdk).json()
+    assert verified["valid"] is True
+    assert verified["user"]["email"] == sdk["email"]
+    assert set(verified["user"]) == {"id", "name", "email"}
+
+    profile = _profile(client, sdk)
+    assert profile.status_code == 200
+    assert profile.json()["user"] == verified["user"]
+
+def test_only_the_released_columns_are_read_and_cached(client, sdk, monkeypatch):
+    requested = []
+    load = security.load_authorization_context
+    monkeypatch.setattr(security, "load_authorization_context", lambda **kwargs: requested.append(kwargs) or load(**kwargs))
+
+    assert _verify(client, sdk).json()["valid"] is True
+    assert set(requested[0]["user_columns"]) == {"id", "name", "email"}
+    for (user, _), _ in auth_cache._authorizations._entries.values():
+        assert "password_hash" not in user
+
+def test_passing_checks_are_reused_until_a_version_moves(client, sdk, admin_headers):
+    _verify(client, sdk)
+    hits = _authorization_hits()
+    assert _verify(client, sdk).json()["valid"] is True
+    assert _authorization_hits() == hits + 1
+
+    client.post(
+        f"/api/applications/{sdk['application']['id']}/users/block",
+        json={"email": sdk["email"], "blocked": True},
+        headers=admin_headers,
+    )
+    assert _verify(client, sdk).json() == {"valid": False, "error": "User access blocked by admin"}
+    profile = _profile(client, sdk)
+    assert profile.status_code == 403
+    assert profile.json()["detail"] == "User access blocked by admin"
+
+def test_blocked_application_is_refused(client, sdk, admin_headers):
+    assert _verify(client, sdk).json()["valid"] is True
+    client.post(f"/api/applications/{sdk['application']['id']}/block", json={"blocked": True}, headers=admin_headers)
+    assert _verify(client, sdk).json() == {"valid": False, "error": "Application blocked by admin"}
+    assert _profile(client, sdk).status_code == 403
+
+def test_a_cached_pass_does_not_cover_other_scopes(client, sdk):
+    assert _verify(client, sdk).json()["valid"] is True
+    # Same user and application, but a scope the student never granted
+    token, _ = create_access_token({"sub": sdk["email"], "aud": sdk["application"]["id"], "scopes": ["role"]})
+    assert _verify(client, sdk, token).json() == {"valid": False, "error": "Required consent not granted"}
+    profile = _profile(client, sdk, token)
+    assert profile.status_code == 403
+    assert profile.json()["detail"] == "User has not granted required permissions"
+
+def test_unmapped_user_is_refused_without_consent(client, sdk):
+    stranger = register_student(client)
+    token, _ = create_access_token({"sub": stranger["email"], "aud": sdk["application"]["id"], "scopes": ["email"]})
+    assert _verify(client, sdk, token).json()["valid"] is False
+    assert _profile(client, sdk, token).status_code == 403
+
+def test_unknown_user_and_application(client, sdk):
+    token, _ = create_access_token({"sub": "ghost@example.com", "aud": sdk["application"]["id"]})
+    assert _verify(client, sdk, token).status_code == 404
+    assert _profile(client, sdk, token).status_code == 404
+
+    token, _ = create_access_token({"sub": sdk["email"], "aud": "no-such-app", "scopes": ["email"]})
+    assert _verify(client, sdk, token).json() == {"valid": False, "error": "Required consent not granted"}
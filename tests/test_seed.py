@@ -0,0 +1,38 @@
+import sqlite3
+
+from backend import database
+from backend.benchmarks.seed import bench_client_id, bench_redirect_uri, bench_user_email, seed_database
+from backend.scopes import scope_set
+
+
+def _query(info: dict, sql: str) -> list:
+    conn = sqlite3.connect(info["db_path"])
+    rows = conn.execute(sql).fetchall()
+    conn.close()
+    return rows
+
+def test_seeded_row_counts(bench_db):
+    assert _query(bench_db, "SELECT COUNT(*) FROM users WHERE email LIKE 'bench%'")[0][0] == 40
+    assert _query(bench_db, "SELECT COUNT(*) FROM applications WHERE client_id LIKE 'bench-client-%'")[0][0] == 3
+    assert _query(bench_db, "SELECT COUNT(*) FROM user_app_access WHERE user_email LIKE 'bench%'")[0][0] == 80
+    assert _query(bench_db, "SELECT COUNT(*) FROM refresh_tokens")[0][0] == 40
+    assert _query(bench_db, "SELECT COUNT(*) FROM authorization_codes WHERE used")[0][0] == 40
+
+def test_seeded_rows_match_the_returned_credentials(bench_db):
+    email = bench_user_email(0)
+    assert _query(bench_db, f"SELECT id FROM users WHERE email = '{email}'")[0][0] == bench_db["first_user_id"]
+    redirects = _query(bench_db, f"SELECT redirect_url FROM applications WHERE client_id = '{bench_client_id(0)}'")[0][0]
+    assert redirects.splitlines()[0] == bench_redirect_uri(0)
+
+def test_consent_masks_agree_with_their_scope_strings(bench_db):
+    rows = _query(bench_db, "SELECT scopes, scope_mask FROM user_consents")
+    assert rows
+    assert all(scope_set(scopes).mask == mask for scopes, mask in rows)
+
+def test_same_seed_builds_the_same_database(tmp_path, monkeypatch):
+    monkeypatch.setattr(database, "DB_FILE_PATH", database.DB_FILE_PATH)
+    first = seed_database(str(tmp_path / "a.db"), users=20, apps=2, seed=7)
+    second = seed_database(str(tmp_path / "b.db"), users=20, apps=2, seed=7)
+    assert first["app_ids"] == second["app_ids"]
+    sql = "SELECT user_id, app_id, scopes FROM user_consents ORDER BY user_id, app_id"
+    assert _query(first, sql) == _query(second, sql)
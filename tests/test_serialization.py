@@ -0,0 +1,39 @@
+import json
+
+import pytest
+
+from backend import serialization
+from backend.schemas import Application, Token, User
+from conftest import STUDENT_PASSWORD, login, register_student
+
+SAMPLE = {"name": "Zoë", "ids": [1, 2, 3], "nested": {"ok": True, "none": None}, "ratio": 0.5}
+
+
+def test_standard_encoder_is_compact_and_keeps_unicode(monkeypatch):
+    monkeypatch.setattr(serialization, "JSON_ENCODER", "json")
+    body = serialization.dumps(SAMPLE)
+    assert body == '{"name":"Zoë","ids":[1,2,3],"nested":{"ok":true,"none":null},"ratio":0.5}'.encode("utf-8")
+
+def test_orjson_encoder_produces_the_same_document(monkeypatch):
+    if serialization.orjson is None:
+        pytest.skip("orjson is not installed")
+    monkeypatch.setattr(serialization, "JSON_ENCODER", "orjson")
+    assert json.loads(serialization.dumps(SAMPLE)) == SAMPLE
+
+def test_nan_is_refused(monkeypatch):
+    monkeypatch.setattr(serialization, "JSON_ENCODER", "json")
+    with pytest.raises(ValueError):
+        serialization.dumps({"value": float("nan")})
+
+
+def test_login_body_matches_its_response_model(client):
+    student = register_student(client)
+    body = login(client, student["email"], STUDENT_PASSWORD)
+    assert Token.model_validate(body).model_dump() == body
+    assert set(body["user"]) == {"id", "name", "email", "role", "rollNo", "branch", "semester"}
+
+def test_listing_bodies_match_their_response_models(client, admin_headers):
+    users = client.get("/api/users", headers=admin_headers).json()
+    assert [User.model_validate(user).model_dump() for user in users] == users
+    applications = client.get("/api/applications", headers=admin_headers).json()
+    assert [Application.model_validate(app).model_dump() for app in applications] == applications
@@ -0,0 +1,45 @@
+import os
+
+import pytest
+import uvicorn
+
+from backend import serve
+
+
+@pytest.fixture
+def launched(monkeypatch):
+    calls = {}
+    monkeypatch.setenv("SSO_INIT_MODE", "full")
+    monkeypatch.delenv("SSO_RATE_LIMIT_STORE", raising=False)
+    monkeypatch.setattr(serve, "INIT_MODE", "full")
+    monkeypatch.setattr(serve, "init_db", lambda seed: calls.setdefault("seed", seed))
+    monkeypatch.setattr(uvicorn, "run", lambda app, **options: calls.update(app=app, **options))
+    return calls
+
+
+def test_worker_count_defaults_to_cpu_count(monkeypatch):
+    monkeypatch.setattr(os, "cpu_count", lambda: 6)
+    assert serve.worker_count(0) == 6
+    assert serve.worker_count(3) == 3
+    monkeypatch.setattr(os, "cpu_count", lambda: None)
+    assert serve.worker_count(0) == 1
+
+def test_schema_is_set_up_once_before_the_workers_start(launched):
+    serve.main(["--workers", "4", "--port", "9100"])
+    assert launched["seed"] is True
+    assert launched["app"] == "backend.main:app"
+    assert launched["workers"] == 4 and launched["port"] == 9100
+    # Workers must not run the initialisation again
+    assert os.environ["SSO_INIT_MODE"] == "skip"
+    # and must share one rate-limit store
+    assert os.environ["SSO_RATE_LIMIT_STORE"] == "sqlite"
+
+def test_no_seed_creates_only_the_schema(launched):
+    serve.main(["--workers", "1", "--no-seed"])
+    assert launched["seed"] is False
+    assert "SSO_RATE_LIMIT_STORE" not in os.environ
+
+def test_skip_mode_leaves_the_database_alone(launched, monkeypatch):
+    monkeypatch.setattr(serve, "INIT_MODE", "skip")
+    serve.main(["--workers", "2"])
+    assert "seed" not in launched
@@ -0,0 +1,73 @@
+import inspect
+
+from jose import jwt
+
+from backend import async_database, main
+from backend.config import ALGORITHM, SECRET_KEY
+from conftest import (
+    consent_decision,
+    create_application,
+    redirect_params,
+    register_student,
+    sso_login,
+)
+
+
+def _claims(token: str, application: dict) -> dict:
+    return jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM], audience=application["id"])
+
+def test_first_login_asks_for_consent_then_remembers_it(client, admin_headers):
+    application = create_application(client, admin_headers)
+    student = register_student(client)
+
+    consent_page = sso_login(client, application, student["email"], scope="profile email")
+    assert consent_page.status_code == 200
+    assert application["client_id"] in consent_page.text
+
+    token = redirect_params(consent_decision(client, consent_page))["token"]
+    claims = _claims(token, application)
+    assert claims["sub"] == student["email"]
+    assert set(claims["scopes"]) == {"profile", "email"}
+
+    again = sso_login(client, application, student["email"], scope="email profile")
+    assert _claims(redirect_params(again)["token"], application)["sub"] == student["email"]
+
+def test_denied_consent_redirects_with_access_denied(client, admin_headers):
+    application = create_application(client, admin_headers)
+    student = register_student(client)
+    consent_page = sso_login(client, application, student["email"])
+    assert redirect_params(consent_decision(client, consent_page, "deny")) == {"error": "access_denied"}
+    # Nothing was remembered
+    assert sso_login(client, application, student["email"]).status_code == 200
+
+def test_wrong_password_redirects_with_an_error(client, admin_headers):
+    application = create_application(client, admin_headers)
+    student = register_student(client)
+    response = sso_login(client, application, student["email"], password="wrong-password")
+    assert redirect_params(response) == {"error": "invalid_credentials"}
+
+def test_unknown_client_and_foreign_redirect_are_rejected(client, admin_headers):
+    application = create_application(client, admin_headers)
+    student = register_student(client)
+    unknown = sso_login(client, {**application, "client_id": "no-such-client"}, student["email"])
+    assert unknown.status_code == 400
+    foreign = sso_login(client, {**application, "redirect_uri": "http://evil.test/callback"}, student["email"])
+    assert foreign.status_code == 400
+
+def test_blocked_user_is_sent_back_with_an_error(client, admin_headers):
+    application = create_application(client, admin_headers)
+    student = register_student(client)
+    consent_decision(client, sso_login(client, application, student["email"]))
+    client.post(
+        f"/api/applications/{application['id']}/users/block",
+        json={"email": student["email"], "blocked": True},
+        headers=admin_headers,
+    )
+    assert redirect_params(sso_login(client, application, student["email"])) == {"error": "user_blocked"}
+
+def test_every_async_mirror_backs_a_route():
+    # Mirrors nothing awaits would only drift from their sync helpers
+    source = inspect.getsource(main)
+    mirrors = [name for name in vars(async_database) if name.endswith("_async")]
+    assert mirrors
+    assert [name for name in mirrors if f"{name}(" not in source] == []
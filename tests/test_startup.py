@@ -0,0 +1,30 @@
+import os
+import subprocess
+import sys
+
+import pytest
+
+from backend import database, main, manage, migrations
+
+PACKAGE_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def test_importing_the_app_does_not_touch_the_database(tmp_path):
+    db_path = tmp_path / "untouched.db"
+    env = dict(os.environ, SSO_DB_PATH=str(db_path), SSO_INIT_MODE="schema", PYTHONPATH=PACKAGE_ROOT)
+    subprocess.run([sys.executable, "-c", "import backend.main"], check=True, env=env, cwd=PACKAGE_ROOT)
+    assert not db_path.exists()
+
+def test_schema_mode_skips_migrations_when_current(monkeypatch):
+    assert migrations.schema_is_current()
+    monkeypatch.setattr(migrations, "migrate", lambda conn: pytest.fail("schema is already current"))
+    monkeypatch.setattr(database, "_seed_defaults", lambda cursor: pytest.fail("schema mode must not seed"))
+    monkeypatch.setattr(main, "INIT_MODE", "schema")
+    main.initialise()
+
+def test_seed_command_migrates_and_seeds_a_new_database(tmp_path, monkeypatch, capsys):
+    monkeypatch.setattr(database, "DB_FILE_PATH", str(tmp_path / "seeded.db"))
+    manage.main(["seed"])
+    assert "Database migrated and seeded" in capsys.readouterr().out
+    assert migrations.schema_is_current()
+    assert database.get_user_by_email("admin@example.com") is not None
@@ -0,0 +1,65 @@
+from backend import storage
+from backend.database import get_db_connection
+from backend.storage import PostgresCursor, Row, translate_sql
+
+
+def test_placeholders_become_psycopg_parameters():
+    sql, returning = translate_sql("SELECT * FROM users WHERE email = ? AND role = ?", True)
+    assert sql == "SELECT * FROM users WHERE email = %s AND role = %s"
+    assert returning is False
+
+def test_literal_percent_signs_are_escaped_only_with_parameters():
+    assert translate_sql("SELECT 1 WHERE name LIKE 'a%' AND id = ?", True)[0] == \
+        "SELECT 1 WHERE name LIKE 'a%%' AND id = %s"
+    assert translate_sql("SELECT 1 WHERE name LIKE 'a%'", False)[0] == "SELECT 1 WHERE name LIKE 'a%'"
+    # A question mark inside a string literal is data, not a placeholder
+    assert translate_sql("SELECT '?' WHERE id = ?", True)[0] == "SELECT '?' WHERE id = %s"
+
+def test_insert_or_ignore_becomes_on_conflict():
+    sql, returning = translate_sql("INSERT OR IGNORE INTO applications (id) VALUES (?)", True)
+    assert sql == "INSERT INTO applications (id) VALUES (%s) ON CONFLICT DO NOTHING"
+    assert returning is False
+
+def test_inserts_into_serial_tables_return_their_id():
+    sql, returning = translate_sql("INSERT INTO users (email) VALUES (?)\n    ", True)
+    assert sql == "INSERT INTO users (email) VALUES (%s) RETURNING id"
+    assert returning is True
+
+def test_every_sqlite_autoincrement_table_is_serial():
+    conn = get_db_connection()
+    tables = [row["name"] for row in conn.execute(
+        "SELECT name FROM sqlite_master WHERE type = 'table' AND sql LIKE '%AUTOINCREMENT%'"
+    )]
+    conn.close()
+    assert tables
+    assert set(tables) <= storage.SERIAL_TABLES
+
+def test_row_reads_by_name_and_position():
+    row = Row({"id": 0, "email": 1}, (7, "a@example.com"))
+    assert row["email"] == "a@example.com"
+    assert row[0] == 7
+    assert dict(zip(row.keys(), row)) == {"id": 7, "email": "a@example.com"}
+
+
+class _FakeCursor:
+    def __init__(self):
+        self.statements = []
+
+    def execute(self, sql, parameters):
+        self.statements.append((sql, parameters))
+
+    def executemany(self, sql, rows):
+        self.statements.append((sql, rows))
+
+    def fetchone(self):
+        return (42,)
+
+
+def test_postgres_cursor_hands_back_lastrowid_and_times_statements():
+    timings = []
+    cursor = PostgresCursor(_FakeCursor(), lambda sql, seconds: timings.append(sql))
+    cursor.execute("INSERT INTO users (email) VALUES (?)", ("a@example.com",))
+    assert cursor.lastrowid == 42
+    cursor.executemany("INSERT INTO users (email) VALUES (?)", [("b@example.com",)])
+    assert cursor._cursor.statements[-1][0] == "INSERT INTO users (email) VALUES (%s)"
+    assert len(timings) == 2
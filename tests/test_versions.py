@@ -0,0 +1,108 @@
+from jose import jwt
+
+from backend import versions
+from backend.config import ALGORITHM, SECRET_KEY
+from backend.database import get_db_connection
+from backend.security import load_current_user_row
+from backend.versions import APP, USER, bump_version, current_version, publish_version
+from conftest import (
+    consent_decision,
+    create_api_key,
+    create_application,
+    redirect_params,
+    register_student,
+    sso_login,
+    unique,
+)
+
+
+def _claims(token: str, application: dict) -> dict:
+    return jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM], audience=application["id"])
+
+def _client_token(client, application: dict) -> str:
+    response = client.post("/oauth/token", json={
+        "grant_type": "client_credentials",
+        "client_id": application["client_id"],
+        "client_secret": application["client_secret"],
+    })
+    assert response.status_code == 200, response.text
+    return response.json()["access_token"]
+
+
+def test_a_change_is_published_only_after_its_commit(client):
+    email = register_student(client)["email"]
+    assert load_current_user_row(email)["role"] == "student"
+
+    conn = get_db_connection()
+    cursor = conn.cursor()
+    cursor.execute("UPDATE users SET role = 'admin' WHERE email = ?", (email,))
+    version = bump_version(cursor, USER, email)
+    # A reader racing with the transaction still sees, and caches, the old row
+    assert current_version(USER, email) < version
+    assert load_current_user_row(email)["role"] == "student"
+    conn.commit()
+    conn.close()
+    publish_version(USER, email, version)
+
+    assert current_version(USER, email) == version
+    assert load_current_user_row(email)["role"] == "admin"
+
+def test_prune_keeps_versions_this_worker_applied(client):
+    email = register_student(client)["email"]
+    conn = get_db_connection()
+    cursor = conn.cursor()
+    version = bump_version(cursor, USER, email)
+    conn.commit()
+    publish_version(USER, email, version)
+    # Not yet visible to the rebuild's query, as with a change committed mid-prune
+    cursor.execute("DELETE FROM version_changes WHERE id = ?", (version,))
+    conn.commit()
+    conn.close()
+
+    versions.prune_version_changes()
+    assert current_version(USER, email) == version
+
+def test_blocking_an_application_moves_its_version(client, admin_headers):
+    application = create_application(client, admin_headers)
+    student = register_student(client)
+    consent_page = sso_login(client, application, student["email"], scope="profile")
+    claims = _claims(redirect_params(consent_decision(client, consent_page))["token"], application)
+    # Tokens stay free of version claims; verifiers compare their caches instead
+    assert "uv" not in claims and "av" not in claims
+
+    before = current_version(APP, application["id"])
+    blocked = client.post(f"/api/applications/{application['id']}/block", headers=admin_headers, json={"blocked": True})
+    assert blocked.status_code == 200, blocked.text
+    assert current_version(APP, application["id"]) > before
+
+def test_client_token_named_after_a_user_never_reads_as_that_user(client, admin_headers):
+    # The client_id is a registered user's email, and that user has signed in
+    # to the application, so a lookup by `sub` would find a consented user
+    email = f"{unique('student')}@example.com"
+    register_student(client, email)
+    application = create_application(client, admin_headers, client_id=email)
+    consent_page = sso_login(client, application, email, scope="profile email")
+    assert "token" in redirect_params(consent_decision(client, consent_page))
+
+    token = _client_token(client, application)
+    claims = _claims(token, application)
+    assert claims["type"] == "client" and claims["sub"] == email
+
+    api_key = create_api_key(client, admin_headers)
+    profile = client.get("/api/sdk/user-profile", params={"token": token}, headers=api_key)
+    assert profile.status_code == 401
+    assert "user" not in profile.json()
+
+    verified = client.get("/api/sdk/verify", params={"token": token}, headers=api_key).json()
+    assert verified == {"valid": True, "client_id": email, "scopes": [], "app_id": application["id"]}
+
+def test_client_token_stops_verifying_once_its_application_is_blocked(client, admin_headers):
+    application = create_application(client, admin_headers)
+    token = _client_token(client, application)
+    api_key = create_api_key(client, admin_headers)
+
+    assert client.get("/api/sdk/verify", params={"token": token}, headers=api_key).json()["valid"] is True
+    blocked = client.post(f"/api/applications/{application['id']}/block", headers=admin_headers, json={"blocked": True})
+    assert blocked.status_code == 200, blocked.text
+    verified = client.get("/api/sdk/verify", params={"token": token}, headers=api_key).json()
+    assert verified == {"valid": False, "error": "Application blocked by admin"}